@@ -0,0 +1,12 @@
+# app/cache/__init__.py
+
+from .shared import SharedCache, CacheNamespace, get_shared_cache, make_key
+from .embeddings import CachedEmbeddings
+
+__all__ = [
+    'SharedCache',
+    'CacheNamespace',
+    'CachedEmbeddings',
+    'get_shared_cache',
+    'make_key'
+]
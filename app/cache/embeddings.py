@@ -0,0 +1,90 @@
+# app/cache/embeddings.py
+
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+import asyncio
+import logging
+
+from .shared import _CACHE_ERRORS, SharedCache, make_key
+
+logger = logging.getLogger(__name__)
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that reads through the shared cache"""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache: SharedCache,
+        model: str,
+        ttl: Optional[float] = None,
+        namespace: str = "embeddings"
+    ):
+        """
+        Initialize the cached embedder
+        Args:
+            embeddings: Underlying embedding model
+            cache: Shared cache instance
+            model: Model name, part of every key so models never mix
+            ttl: TTL in seconds for cached vectors
+            namespace: Cache namespace
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def _key(self, text: str) -> str:
+        return make_key(self.model, text)
+
+    def _lookup(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vectors of texts, None for misses; a failing cache misses"""
+        try:
+            return [self.cache.get(self.namespace, self._key(text)) for text in texts]
+        except _CACHE_ERRORS as e:
+            logger.warning("Shared cache read failed in %s: %s", self.namespace, e)
+            return [None] * len(texts)
+
+    def _store(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """Cache vectors; they are returned uncached if the cache fails"""
+        try:
+            for text, vector in zip(texts, vectors):
+                self.cache.set(self.namespace, self._key(text), vector, self.ttl)
+        except _CACHE_ERRORS as e:
+            logger.warning("Shared cache write failed in %s: %s", self.namespace, e)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, only sending cache misses to the model"""
+        vectors = self._lookup(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            fresh = self.embeddings.embed_documents([texts[i] for i in missing])
+            self._store([texts[i] for i in missing], fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query"""
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents asynchronously, only sending cache misses to the model"""
+        vectors = await asyncio.to_thread(self._lookup, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            fresh = await self.embeddings.aembed_documents([texts[i] for i in missing])
+            await asyncio.to_thread(self._store, [texts[i] for i in missing], fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query asynchronously"""
+        return await self.cache.get_or_set(
+            self.namespace,
+            self._key(text),
+            lambda: self.embeddings.aembed_query(text),
+            self.ttl
+        )
@@ -0,0 +1,504 @@
+# app/cache/shared.py
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from functools import lru_cache
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from ..config import get_settings
+from ..utils.sqlite import Transaction
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Access times are only refreshed when older than this, so hot reads don't
+# turn into a write on every hit
+_TOUCH_INTERVAL_SECONDS = 30.0
+_EVICTION_BATCH = 64
+_CACHE_ERRORS = (sqlite3.Error, pickle.PickleError, TypeError, AttributeError)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+CREATE TABLE IF NOT EXISTS usage (
+    namespace TEXT PRIMARY KEY,
+    entries INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO usage (namespace, entries, bytes) VALUES (NEW.namespace, 1, NEW.size)
+    ON CONFLICT (namespace) DO UPDATE SET
+        entries = entries + 1, bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE usage SET entries = entries - 1, bytes = bytes - OLD.size
+    WHERE namespace = OLD.namespace;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE usage SET bytes = bytes - OLD.size + NEW.size
+    WHERE namespace = NEW.namespace;
+END;
+"""
+
+def make_key(*parts: Any) -> str:
+    """
+    Build a compact cache key from arbitrary parts
+    Args:
+        parts: Values identifying the cached item
+    Returns:
+        Hex digest of the joined parts
+    """
+    raw = "\x1f".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class SharedCache:
+    """
+    Cache shared by every worker process on the host
+
+    Backed by a SQLite database in WAL mode, so readers in one worker never
+    block writers in another. Values are pickled; the database file must
+    only be writable by the service itself.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        default_ttl: Optional[float] = None
+    ):
+        """
+        Initialize the shared cache
+        Args:
+            path: SQLite database file shared by the workers
+            max_bytes: Total value size before least recently used entries are evicted
+            default_ttl: TTL in seconds for entries stored without one
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, reconnecting after a fork"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self) -> Transaction:
+        """Open a write transaction that takes the database lock up front"""
+        return Transaction(self._connection())
+
+    def _count(self, namespace: str, stat: str, amount: int = 1) -> None:
+        """Increment a per-namespace counter for this process"""
+        with self._stats_lock:
+            counters = self._stats.setdefault(
+                namespace,
+                {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expired": 0}
+            )
+            counters[stat] += amount
+
+    def namespace(self, name: str, ttl: Optional[float] = None) -> "CacheNamespace":
+        """
+        Get a view of the cache scoped to one namespace
+        Args:
+            name: Namespace name, e.g. "answers" or "embeddings"
+            ttl: Default TTL in seconds for this namespace
+        """
+        return CacheNamespace(self, name, ttl if ttl is not None else self.default_ttl)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get a cached value
+        Args:
+            namespace: Cache namespace
+            key: Entry key
+        Returns:
+            Cached value, or None on a miss
+        """
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM entries "
+            "WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+
+        if row is None:
+            self._count(namespace, "misses")
+            return None
+
+        value, expires_at, accessed_at = row
+        if expires_at is not None and expires_at <= now:
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (namespace, key, now)
+            )
+            self._count(namespace, "misses")
+            self._count(namespace, "expired")
+            return None
+
+        if now - accessed_at > _TOUCH_INTERVAL_SECONDS:
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+        self._count(namespace, "hits")
+        return pickle.loads(value)
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        only_if_absent: bool = False
+    ) -> Any:
+        """
+        Store a value
+        Args:
+            namespace: Cache namespace
+            key: Entry key
+            value: Picklable value; None is never cached
+            ttl: TTL in seconds, defaults to the cache default
+            only_if_absent: Keep an existing live entry instead of replacing it
+        Returns:
+            The value now stored under the key
+        """
+        if value is None:
+            return None
+
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._transaction() as conn:
+            if only_if_absent:
+                row = conn.execute(
+                    "SELECT value FROM entries WHERE namespace = ? AND key = ? "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    (namespace, key, now)
+                ).fetchone()
+                if row is not None:
+                    return pickle.loads(row[0])
+
+            conn.execute(
+                "INSERT INTO entries (namespace, key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET "
+                "value = excluded.value, size = excluded.size, "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                (namespace, key, blob, len(blob), expires_at, now)
+            )
+            self._evict(conn, now)
+
+        self._count(namespace, "sets")
+        return value
+
+    def add(
+        self,
+        namespace: str,
+        key: str,
+        value: Any = True,
+        ttl: Optional[float] = None
+    ) -> bool:
+        """
+        Store a value only if the key is absent, e.g. for idempotency keys
+        Args:
+            namespace: Cache namespace
+            key: Entry key
+            value: Value to store
+            ttl: TTL in seconds
+        Returns:
+            True if this call stored the value, False if the key already existed
+        """
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (namespace, key, now)
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO entries "
+                "(namespace, key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, blob, len(blob), expires_at, now)
+            )
+            added = cursor.rowcount == 1
+            if added:
+                self._evict(conn, now)
+
+        self._count(namespace, "sets" if added else "hits")
+        return added
+
+    def incr(self, namespace: str, key: str, delta: int = 1) -> int:
+        """
+        Atomically increment an integer counter that never expires or is evicted
+        Args:
+            namespace: Cache namespace
+            key: Counter key
+            delta: Amount to add
+        Returns:
+            New counter value
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            current = pickle.loads(row[0]) if row else 0
+            blob = pickle.dumps(current + delta, protocol=pickle.HIGHEST_PROTOCOL)
+            conn.execute(
+                "INSERT INTO entries "
+                "(namespace, key, value, size, expires_at, accessed_at, pinned) "
+                "VALUES (?, ?, ?, ?, NULL, ?, 1) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET "
+                "value = excluded.value, size = excluded.size, "
+                "expires_at = NULL, accessed_at = excluded.accessed_at, pinned = 1",
+                (namespace, key, blob, len(blob), now)
+            )
+        return current + delta
+
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove an entry"""
+        self._connection().execute(
+            "DELETE FROM entries WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        )
+
+    def clear(self, namespace: str) -> None:
+        """Remove every entry in a namespace"""
+        self._connection().execute(
+            "DELETE FROM entries WHERE namespace = ?", (namespace,)
+        )
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones, until under budget"""
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM usage").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = conn.execute(
+            "DELETE FROM entries WHERE expires_at <= ?", (now,)
+        ).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM usage").fetchone()[0]
+
+        while total > self.max_bytes:
+            victims = conn.execute(
+                "SELECT namespace, key, size FROM entries WHERE pinned = 0 "
+                "ORDER BY accessed_at LIMIT ?",
+                (_EVICTION_BATCH,)
+            ).fetchall()
+            if not victims:
+                break
+            for namespace, key, size in victims:
+                conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                )
+                self._count(namespace, "evictions")
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+        if evicted:
+            logger.debug("Evicted %d expired cache entries", evicted)
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Get a cached value, computing and storing it on a miss
+        Concurrent callers in this process share one factory call. Across
+        workers the first stored value wins and every caller returns it.
+        Args:
+            namespace: Cache namespace
+            key: Entry key
+            factory: Coroutine function producing the value
+            ttl: TTL in seconds
+        Returns:
+            Cached or freshly computed value
+        """
+        try:
+            value = await asyncio.to_thread(self.get, namespace, key)
+        except _CACHE_ERRORS as e:
+            logger.warning("Shared cache read failed in %s: %s", namespace, e)
+            value = None
+        if value is not None:
+            return value
+
+        inflight_key = (namespace, key)
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            value = await factory()
+            try:
+                value = await asyncio.to_thread(
+                    self.set, namespace, key, value, ttl, True
+                )
+            except _CACHE_ERRORS as e:
+                logger.warning("Shared cache write failed in %s: %s", namespace, e)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve it so an unawaited future doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[inflight_key]
+
+    def preload(self, namespaces: List[str], limit: int) -> int:
+        """
+        Read the most recently used entries so their pages are in memory
+        Args:
+            namespaces: Namespaces to preload
+            limit: Maximum entries per namespace
+        Returns:
+            Number of entries read
+        """
+        conn = self._connection()
+        count = 0
+        for namespace in namespaces:
+            rows = conn.execute(
+                "SELECT value FROM entries WHERE namespace = ? "
+                "ORDER BY accessed_at DESC LIMIT ?",
+                (namespace, limit)
+            ).fetchall()
+            count += len(rows)
+        return count
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-namespace statistics
+        Returns:
+            Shared entry counts and sizes, plus this process's hit/miss counters
+        """
+        rows = self._connection().execute(
+            "SELECT namespace, entries, bytes FROM usage"
+        ).fetchall()
+        with self._stats_lock:
+            counters = {name: dict(values) for name, values in self._stats.items()}
+
+        result: Dict[str, Dict[str, Any]] = {}
+        for namespace in set(counters) | {row[0] for row in rows}:
+            stats = counters.get(namespace, {})
+            lookups = stats.get("hits", 0) + stats.get("misses", 0)
+            result[namespace] = {
+                **stats,
+                "hit_rate": stats.get("hits", 0) / lookups if lookups else 0.0
+            }
+        for namespace, entries, size in rows:
+            result[namespace].update({"entries": entries, "bytes": size})
+        return result
+
+class CacheNamespace:
+    """
+    Async view of the shared cache scoped to a single namespace
+
+    Cache failures are logged and treated as misses so a broken cache file
+    never takes the request path down with it.
+    """
+
+    def __init__(self, cache: SharedCache, name: str, ttl: Optional[float]):
+        self.cache = cache
+        self.name = name
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None on a miss"""
+        try:
+            return await asyncio.to_thread(self.cache.get, self.name, key)
+        except _CACHE_ERRORS as e:
+            logger.warning("Shared cache read failed in %s: %s", self.name, e)
+            return None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> Any:
+        """Store a value"""
+        try:
+            return await asyncio.to_thread(
+                self.cache.set, self.name, key, value, self.ttl if ttl is None else ttl
+            )
+        except _CACHE_ERRORS as e:
+            logger.warning("Shared cache write failed in %s: %s", self.name, e)
+            return value
+
+    async def add(self, key: str, value: Any = True, ttl: Optional[float] = None) -> bool:
+        """Store a value only if absent; True if this call stored it"""
+        try:
+            return await asyncio.to_thread(
+                self.cache.add, self.name, key, value, self.ttl if ttl is None else ttl
+            )
+        except _CACHE_ERRORS as e:
+            logger.warning("Shared cache write failed in %s: %s", self.name, e)
+            return True
+
+    async def incr(self, key: str, delta: int = 1) -> int:
+        """Atomically increment a counter"""
+        return await asyncio.to_thread(self.cache.incr, self.name, key, delta)
+
+    async def delete(self, key: str) -> None:
+        """Remove an entry"""
+        await asyncio.to_thread(self.cache.delete, self.name, key)
+
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """Get a cached value, computing it with factory on a miss"""
+        return await self.cache.get_or_set(
+            self.name, key, factory, self.ttl if ttl is None else ttl
+        )
+
+@lru_cache()
+def get_shared_cache() -> SharedCache:
+    """Create and cache the shared cache instance for this process"""
+    return SharedCache(
+        path=settings.SHARED_CACHE_PATH,
+        max_bytes=settings.SHARED_CACHE_MAX_BYTES,
+        default_ttl=settings.SHARED_CACHE_DEFAULT_TTL
+    )
@@ -2,7 +2,7 @@
 
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     """APPLICATION SETTINGS AND CONFIGURATION"""
@@ -11,6 +11,9 @@ class Settings(BaseSettings):
     SLACK_BOT_TOKEN: str
     SLACK_SIGNING_SECRET: str
     SLACK_APP_TOKEN: str
+    SLACK_SOCKET_MODE: bool = False  # Receive requests over websockets instead of HTTP
+    SLACK_SOCKET_MODE_CONNECTIONS: int = 2
+    SLACK_SOCKET_MODE_URL: Optional[str] = None  # Fixed websocket URL, e.g. a local stand-in
 
     # OpenAI Configuration
     OPENAI_API_KEY: str
@@ -31,12 +34,113 @@ class Settings(BaseSettings):
     APP_PORT: int = 8080
     DEBUG_MODE: bool = False
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_FILE: Optional[str] = None  # Size-rotated log file, in addition to stdout
+    LOG_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped, never waited on
+    LOG_ERROR_RATE_LIMIT: int = 10  # Identical errors logged per interval
+    LOG_ERROR_RATE_INTERVAL: int = 60
+    WARMUP_ENABLED: bool = True  # Warm connections and caches before /ready passes
+    WARMUP_STEP_TIMEOUT: float = 20.0
+    WARMUP_RETRY_INTERVAL: float = 5.0  # Between retries of failed required steps
+    WARMUP_PRELOAD_ENTRIES: int = 500
+    ADMIN_TOKEN: Optional[str] = None  # Bearer token of the /admin diagnostics; unset disables them
+    PROFILE_MAX_SECONDS: float = 60
+    MEMORY_TRACE_MAX_SECONDS: float = 900  # tracemalloc is stopped after this
 
     # RAG Settings
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     MAX_CONTEXT_CHUNKS: int = 5
     SIMILARITY_THRESHOLD: float = 0.7
+    NAMESPACE_THRESHOLDS: Dict[str, float] = {}  # Calibrated per namespace, see app.database.calibrate
+    ADAPTIVE_CONTEXT_ENABLED: bool = True  # Choose the number of chunks per question from the scores
+    MIN_CONTEXT_CHUNKS: int = 1
+    ADAPTIVE_MAX_CHUNKS: int = 8  # Replaces MAX_CONTEXT_CHUNKS when adaptive
+    CONTEXT_RELEVANCE_TARGET: float = 0.8  # Share of retrieved relevance the kept chunks must cover
+    CONTEXT_MIN_SCORE_GAP: float = 0.15  # Normalized score drop that ends the context
+    SHARED_NAMESPACE: str = "default"  # Pinecone namespace of shared documents
+    ACL_FILTERING_ENABLED: bool = False  # Filter the shared namespace by document ACLs instead of per-user namespaces
+    PERMISSION_REFRESH_SECONDS: int = 300
+    # Namespaces searched concurrently per question; {user_id}, {workspace_id}
+    # and {shared} are filled in per request, unresolvable entries are skipped
+    RETRIEVAL_NAMESPACES: List[str] = ["{user_id}", "{shared}"]
+    NAMESPACE_QUOTAS: Dict[str, int] = {}  # Most chunks per namespace entry
+    NAMESPACE_WEIGHTS: Dict[str, float] = {}  # Score multiplier per namespace entry
+
+    # FAQ Settings (answers precomputed by app.retrieval.faq_job)
+    FAQ_ENABLED: bool = True
+    FAQ_MATCH_THRESHOLD: float = 0.92  # Similarity to a centroid needed to serve its answer
+    FAQ_REFRESH_SECONDS: int = 600
+    FAQ_MAX_AGE_SECONDS: int = 7 * 24 * 3600  # Expiry even while the index version holds
+    FAQ_REQUIRE_APPROVAL: bool = False  # Serve only answers approved by hand, not just auto-vetted
+
+    # Embedding Settings
+    EMBEDDING_MODEL: str = "text-embedding-3-large"
+    EMBEDDING_DIMENSIONS: Optional[int] = None  # Matryoshka truncation; must match the Pinecone index
+    EMBEDDING_BATCH_SIZE: int = 64  # Most concurrent queries per embedding request
+    EMBEDDING_BATCH_WINDOW_MS: float = 5  # Wait for concurrent queries; 0 disables batching
+    EMBEDDING_MAX_IN_FLIGHT: int = 8  # Concurrent embedding requests per process
+
+    # Shared Cache Settings (one SQLite file shared by all workers on a host)
+    SHARED_CACHE_PATH: str = "/tmp/slack-ai-assistant/cache.sqlite3"
+    SHARED_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    SHARED_CACHE_DEFAULT_TTL: int = 3600
+    ANSWER_CACHE_TTL: int = 3600
+    RETRIEVAL_CACHE_TTL: int = 3600
+    STALE_RETRIEVAL_TTL: int = 24 * 3600  # Last good results, served while Pinecone is unavailable
+    INDEX_VERSION_CACHE_TTL: float = 5  # How long other hosts may serve results from before an index write
+    EMBEDDING_CACHE_TTL: int = 7 * 24 * 3600
+    HISTORY_CACHE_TTL: int = 600
+    USER_SETTINGS_CACHE_TTL: int = 300  # Staleness bound for updates made on other hosts
+    IDEMPOTENCY_KEY_TTL: int = 3600
+
+    # Resilience Settings (outbound calls to Pinecone and OpenAI)
+    HEDGE_ENABLED: bool = True
+    HEDGE_DEPENDENCIES: List[str] = ["vector_store", "embeddings", "llm"]  # Idempotent calls that may be duplicated
+    HEDGE_QUANTILE: float = 0.95  # Duplicate calls slower than this share of recent calls
+    HEDGE_MIN_DELAY_MS: float = 50
+    HEDGE_MIN_SAMPLES: int = 20
+    LATENCY_WINDOW: int = 200  # Recent calls the hedge delay is computed from
+    BREAKER_FAILURE_RATE: float = 0.5
+    BREAKER_MIN_CALLS: int = 10
+    BREAKER_WINDOW: int = 50
+    BREAKER_COOLDOWN_SECONDS: float = 30
+
+    # Deadline Settings
+    REQUEST_DEADLINE_SECONDS: float = 30  # Time budget of an answer, from receipt
+    DEGRADE_BELOW_SECONDS: float = 10  # Remaining budget below which answers are degraded
+    DEGRADED_MAX_CHUNKS: int = 2
+    FALLBACK_MODEL: str = "gpt-4o-mini"  # Faster model used when time runs low
+
+    # Task Queue Settings
+    TASK_QUEUE_ENABLED: bool = False  # Answer /ask in worker processes (python -m app.worker)
+    TASK_QUEUE_PATH: str = "/tmp/slack-ai-assistant/tasks.sqlite3"  # Local disk, shared with workers
+    TASK_VISIBILITY_TIMEOUT: float = 60  # Seconds before an unacknowledged task is retried
+    TASK_MAX_ATTEMPTS: int = 3
+    TASK_RETRY_BACKOFF_SECONDS: float = 5
+    WORKER_CONCURRENCY: int = 8  # Tasks a worker process runs at once
+    WORKER_POLL_INTERVAL: float = 0.5
+
+    # Usage Accounting Settings
+    USAGE_FLUSH_SECONDS: int = 60  # Totals are written to Firestore this often
+    MODEL_PRICES: Dict[str, Dict[str, float]] = {  # USD per million tokens
+        "gpt-4o": {"prompt": 2.5, "cached": 1.25, "completion": 10.0},
+        "gpt-4o-mini": {"prompt": 0.15, "cached": 0.075, "completion": 0.6},
+        "text-embedding-3-large": {"embedding": 0.13}
+    }
+
+    # Conversation Retention Settings
+    CONVERSATION_RETENTION_DAYS: int = 0  # 0 keeps conversations forever
+    DELETE_BATCH_SIZE: int = 500  # Firestore allows at most 500 writes per batch
+    DELETE_CONCURRENCY: int = 4
+
+    # Document Ingestion Settings
+    PARSE_WORKERS: int = 0  # Parser processes; 0 uses every available core
+    PARSE_TIMEOUT_SECONDS: float = 300  # Per file; 0 disables
+    PARSE_MEMORY_MB: int = 1024  # Per file; 0 disables
+    INGEST_BATCH_CHUNKS: int = 64  # Chunks embedded and upserted together
 
     # Chat Settings
     MAX_HISTORY_MESSAGES: int = 10
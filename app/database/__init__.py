@@ -1,9 +1,20 @@
 # app/database/__init__.py
 
-from .vector_store import VectorStore
+from .vector_store import NamespaceSearch, VectorStore
 from .conversation import ConversationStore
+from .local_index import LocalVectorIndex, truncate_embeddings
+from .permissions import AccessFilter, PermissionIndex
+from .user_settings import UserSettingsStore
+from .index_versions import IndexVersionStore
 
 __all__ = [
     'VectorStore',
-    'ConversationStore'
+    'NamespaceSearch',
+    'ConversationStore',
+    'LocalVectorIndex',
+    'truncate_embeddings',
+    'AccessFilter',
+    'PermissionIndex',
+    'UserSettingsStore',
+    'IndexVersionStore'
 ]
\ No newline at end of file
@@ -0,0 +1,117 @@
+# app/database/calibrate.py
+
+"""
+Calibrate per-namespace similarity thresholds from score distributions.
+
+Runs sample questions against each namespace and records the scores of the
+top `--depth` matches. Matches ranked below `--relevant-ranks` are taken as
+background: they are almost never what a question is about, so their
+distribution shows how high unrelated chunks score in that namespace. The
+threshold is the `--percentile` of the background scores, which lets
+through only chunks that beat nearly all unrelated ones.
+
+Prints NAMESPACE_THRESHOLDS as JSON, ready for the environment.
+
+    python -m app.database.calibrate --questions questions.txt --namespace default
+"""
+
+from typing import Dict, List, Sequence
+import argparse
+import asyncio
+import json
+
+import numpy as np
+
+from ..config import get_settings
+from ..utils import setup_logger, shutdown_logging
+from .vector_store import VectorStore
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+def calibrate_threshold(
+    score_lists: Sequence[Sequence[float]],
+    relevant_ranks: int,
+    percentile: float
+) -> float:
+    """
+    Threshold separating likely matches from background scores
+    Args:
+        score_lists: Scores of each question's matches, best first
+        relevant_ranks: Leading ranks that may hold real matches
+        percentile: Percentile of background scores to use
+    Returns:
+        Calibrated threshold, rounded to three decimals
+    """
+    background = [score for scores in score_lists for score in scores[relevant_ranks:]]
+    if not background:
+        raise ValueError("no background scores; increase --depth or add questions")
+    return round(float(np.percentile(background, percentile)), 3)
+
+async def _scores(
+    store: VectorStore,
+    questions: Sequence[str],
+    namespace: str,
+    depth: int
+) -> List[List[float]]:
+    """Raw scores of the top matches of every question"""
+    score_lists = []
+    for question in questions:
+        vector = await store.embeddings.aembed_query(question)
+        results = await store.vector_store.asimilarity_search_by_vector_with_score(
+            vector, k=depth, namespace=namespace
+        )
+        score_lists.append(sorted((score for _, score in results), reverse=True))
+    return score_lists
+
+async def calibrate(
+    questions: Sequence[str],
+    namespaces: Sequence[str],
+    depth: int,
+    relevant_ranks: int,
+    percentile: float
+) -> Dict[str, float]:
+    """Calibrated threshold of every namespace"""
+    store = VectorStore()
+    thresholds = {}
+    for namespace in namespaces:
+        score_lists = await _scores(store, questions, namespace, depth)
+        thresholds[namespace] = calibrate_threshold(score_lists, relevant_ranks, percentile)
+        top = [scores[0] for scores in score_lists if scores]
+        logger.info(
+            "Namespace %s: threshold %.3f, median top score %.3f over %d questions",
+            namespace,
+            thresholds[namespace],
+            float(np.median(top)) if top else 0.0,
+            len(score_lists)
+        )
+    return thresholds
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--questions", required=True, help="Text file with one sample question per line")
+    parser.add_argument(
+        "--namespace", action="append", dest="namespaces",
+        help="Namespace to calibrate; repeat for several (default: the shared namespace)"
+    )
+    parser.add_argument("--depth", type=int, default=50, help="Matches scored per question")
+    parser.add_argument("--relevant-ranks", type=int, default=10, help="Ranks excluded from the background")
+    parser.add_argument("--percentile", type=float, default=95.0)
+    args = parser.parse_args()
+
+    with open(args.questions) as f:
+        questions = [line.strip() for line in f if line.strip()]
+    try:
+        thresholds = asyncio.run(calibrate(
+            questions,
+            args.namespaces or [settings.SHARED_NAMESPACE],
+            args.depth,
+            args.relevant_ranks,
+            args.percentile
+        ))
+        print(json.dumps(thresholds))
+    finally:
+        shutdown_logging()
+
+if __name__ == "__main__":
+    main()
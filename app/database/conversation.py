@@ -1,21 +1,137 @@
 # app/database/conversation.py
 
 from google.cloud import firestore
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Set
+from datetime import datetime, timedelta, timezone
+import asyncio
 import json
 import logging
+import time
+import uuid
 
 from ..config import get_settings
+from ..cache import get_shared_cache, make_key
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Firestore rejects batched writes with more than 500 operations
+MAX_BATCH_WRITES = 500
+
+# Thread key used for messages that aren't in a thread
+MAIN_THREAD = 'main'
+
+# Called with the running total of deleted documents
+ProgressCallback = Callable[[int], None]
+
+def thread_doc_id(channel_id: str, thread_ts: Optional[str] = None) -> str:
+    """Document ID of a thread: one parent document per channel thread"""
+    return f"{channel_id}:{thread_ts or MAIN_THREAD}"
+
+def message_doc_id(seq: int) -> str:
+    """Message document IDs sort in write order, like the seq field"""
+    return f"{seq:020d}-{uuid.uuid4().hex[:8]}"
+
+class _BatchDeleter:
+    """
+    Deletes documents in batched writes with several batches in flight
+
+    References are buffered until a full batch is available; at most
+    DELETE_CONCURRENCY batches are committed at once, so callers adding
+    faster than Firestore deletes are held back instead of piling up work.
+    """
+
+    def __init__(
+        self,
+        db: firestore.Client,
+        progress: Optional[ProgressCallback] = None
+    ):
+        self.db = db
+        self.progress = progress
+        self.batch_size = max(1, min(settings.DELETE_BATCH_SIZE, MAX_BATCH_WRITES))
+        self.deleted = 0
+        self._slots = asyncio.Semaphore(max(1, settings.DELETE_CONCURRENCY))
+        self._pending: List[firestore.DocumentReference] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._errors: List[Exception] = []
+
+    async def __aenter__(self) -> '_BatchDeleter':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None and self._pending and not self._errors:
+            await self._flush(self._pending)
+            self._pending = []
+        # Wait for in-flight batches even when failing, then surface errors
+        await asyncio.gather(*self._tasks)
+        if exc_type is None and self._errors:
+            raise self._errors[0]
+
+    async def add(self, refs: List[firestore.DocumentReference]) -> None:
+        """Queue documents for deletion"""
+        if self._errors:
+            raise self._errors[0]
+        self._pending.extend(refs)
+        while len(self._pending) >= self.batch_size:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            await self._flush(batch)
+
+    async def _flush(self, refs: List[firestore.DocumentReference]) -> None:
+        """Start committing one batch once a slot is free"""
+        await self._slots.acquire()
+        task = asyncio.create_task(self._commit(refs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _commit(self, refs: List[firestore.DocumentReference]) -> None:
+        def commit() -> None:
+            batch = self.db.batch()
+            for ref in refs:
+                batch.delete(ref)
+            batch.commit()
+
+        try:
+            await asyncio.to_thread(commit)
+        except Exception as e:
+            self._errors.append(e)
+            return
+        finally:
+            self._slots.release()
+        self.deleted += len(refs)
+        if self.progress:
+            self.progress(self.deleted)
+
 class ConversationStore:
+    """
+    Conversation history in Firestore
+
+    Each channel thread is a parent document in `threads` (ID
+    `{channel_id}:{thread_ts}`, or `{channel_id}:main` outside threads)
+    holding denormalized counters, with an append-only `messages`
+    subcollection ordered by a client-assigned `seq`. Reading history is
+    a single ordered, limited read of one subcollection.
+    """
+
     def __init__(self):
         """Initialize Firestore for conversation storage"""
         self.db = firestore.Client(project=settings.PROJECT_ID)
-        self.collection = self.db.collection('conversations')
+        self.threads = self.db.collection('threads')
+
+        # History reads are cached per thread state: the thread document's
+        # last_seq and message_count change with every write from any host
+        self.history_cache = get_shared_cache().namespace('history', ttl=settings.HISTORY_CACHE_TTL)
+
+    def _thread_ref(
+        self,
+        channel_id: str,
+        thread_ts: Optional[str] = None
+    ) -> firestore.DocumentReference:
+        return self.threads.document(thread_doc_id(channel_id, thread_ts))
+
+    async def warmup(self) -> None:
+        """Open the Firestore channel with a one-document read"""
+        await asyncio.to_thread(lambda: list(self.threads.limit(1).stream()))
 
     async def save_message(
         self,
@@ -27,7 +143,7 @@ class ConversationStore:
         metadata: Optional[Dict[str, Any]] = None
     ) -> str:
         """
-        Save a conversation message
+        Append a message to its thread
         Args:
             channel_id: Slack channel ID
             user_id: User ID
@@ -35,8 +151,11 @@ class ConversationStore:
             content: Message content
             thread_ts: Thread timestamp if in thread
             metadata: Additional metadata
+        Returns:
+            Message document ID
         """
         try:
+            seq = time.time_ns()
             message_data = {
                 'channel_id': channel_id,
                 'user_id': user_id,
@@ -44,20 +163,29 @@ class ConversationStore:
                 'content': content,
                 'thread_ts': thread_ts,
                 'metadata': metadata or {},
+                'seq': seq,
                 'timestamp': firestore.SERVER_TIMESTAMP
             }
-            
-            # Use thread_ts as document ID if available, else generate new
-            doc_id = thread_ts or f"{channel_id}-{datetime.utcnow().timestamp()}"
-            
-            # Save to Firestore
-            doc_ref = self.collection.document(doc_id)
-            doc_ref.set(message_data)
-            
+            thread_ref = self._thread_ref(channel_id, thread_ts)
+            doc_id = message_doc_id(seq)
+
+            # The message and the thread counters are written atomically
+            batch = self.db.batch()
+            batch.set(thread_ref.collection('messages').document(doc_id), message_data)
+            batch.set(thread_ref, {
+                'channel_id': channel_id,
+                'thread_ts': thread_ts,
+                'message_count': firestore.Increment(1),
+                'participants': firestore.ArrayUnion([user_id]),
+                'last_seq': seq,
+                'last_message_at': firestore.SERVER_TIMESTAMP
+            }, merge=True)
+            await asyncio.to_thread(batch.commit)
+
             return doc_id
-            
+
         except Exception as e:
-            logger.error(f"Error saving message: {str(e)}")
+            logger.error("Error saving message: %s", e)
             raise
 
     async def get_conversation_history(
@@ -67,59 +195,182 @@ class ConversationStore:
         limit: int = 10
     ) -> List[Dict[str, Any]]:
         """
-        Get conversation history
+        Get the most recent messages of a thread
         Args:
             channel_id: Slack channel ID
             thread_ts: Thread timestamp if in thread
             limit: Maximum number of messages to return
+        Returns:
+            Messages in chronological order
         """
         try:
-            # Build query
-            query = self.collection.where('channel_id', '==', channel_id)
-            
-            if thread_ts:
-                query = query.where('thread_ts', '==', thread_ts)
-            
-            # Execute query
-            docs = query.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit).stream()
-            
-            # Format results
+            # One small read of the thread document versions the cached
+            # history, so a write on any host is seen at once
+            thread_ref = self._thread_ref(channel_id, thread_ts)
+            thread = await asyncio.to_thread(
+                thread_ref.get, ['last_seq', 'message_count']
+            )
+            if not thread.exists:
+                return []
+            state = thread.to_dict() or {}
+            cache_key = make_key(
+                thread_ref.id, state.get('last_seq'), state.get('message_count'), limit
+            )
+            cached = await self.history_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            # Newest `limit` messages of this thread only
+            query = (
+                thread_ref
+                .collection('messages')
+                .order_by('seq', direction=firestore.Query.DESCENDING)
+                .limit(limit)
+            )
+            docs = await asyncio.to_thread(query.get)
+
+            # Format results, oldest first
             messages = []
-            for doc in docs:
+            for doc in reversed(docs):
                 message_data = doc.to_dict()
                 message_data['id'] = doc.id
                 messages.append(message_data)
-            
+
+            await self.history_cache.set(cache_key, messages)
             return messages
-            
+
         except Exception as e:
-            logger.error(f"Error getting conversation history: {str(e)}")
+            logger.error("Error getting conversation history: %s", e)
             return []
 
+    async def _pages(
+        self,
+        query: firestore.Query,
+        page_size: int
+    ) -> AsyncIterator[List[firestore.DocumentSnapshot]]:
+        """
+        Page through an ordered query with cursors
+        Args:
+            query: Query with an order_by; its projection must include the ordering fields
+            page_size: Documents per page
+        Yields:
+            Pages of document snapshots
+        """
+        cursor = None
+        while True:
+            current = query.limit(page_size)
+            if cursor is not None:
+                current = current.start_after(cursor)
+            docs = await asyncio.to_thread(current.get)
+            if docs:
+                yield docs
+            if len(docs) < page_size:
+                return
+            cursor = docs[-1]
+
+    async def iter_messages(
+        self,
+        after_seq: Optional[int] = None,
+        after_path: Optional[str] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[List[firestore.DocumentSnapshot]]:
+        """
+        Page through the messages of every thread in write order
+        Args:
+            after_seq: Only messages with a later seq
+            after_path: With after_seq, the document path of the last message
+                already read, to resume between messages with the same seq
+            page_size: Messages per page
+        Yields:
+            Pages of message snapshots, ordered by seq and document path
+        """
+        query = self.db.collection_group('messages').order_by('seq').order_by('__name__')
+        if after_seq is not None:
+            cursor: Dict[str, Any] = {'seq': after_seq}
+            if after_path:
+                cursor['__name__'] = self.db.document(after_path)
+            query = query.start_after(cursor)
+        async for page in self._pages(query, page_size):
+            yield page
+
+    async def _delete_threads(
+        self,
+        query: firestore.Query,
+        progress: Optional[ProgressCallback] = None
+    ) -> int:
+        """
+        Delete threads matching a query, messages first
+        Messages of a page of threads are listed concurrently and deleted
+        through one batch deleter, so small threads share batched writes.
+        Args:
+            query: Ordered query over `threads`, projecting the ordering fields
+            progress: Called with the running total after each batch
+        Returns:
+            Number of deleted documents
+        """
+        async with _BatchDeleter(self.db, progress) as deleter:
+            async def delete_messages(thread: firestore.DocumentSnapshot) -> None:
+                messages = thread.reference.collection('messages').select(['seq']).order_by('seq')
+                async for page in self._pages(messages, deleter.batch_size):
+                    await deleter.add([doc.reference for doc in page])
+
+            async for threads in self._pages(query, deleter.batch_size):
+                await asyncio.gather(*(delete_messages(thread) for thread in threads))
+                # Parents are queued after their messages
+                await deleter.add([thread.reference for thread in threads])
+        return deleter.deleted
+
     async def delete_conversation(
         self,
         channel_id: str,
-        thread_ts: Optional[str] = None
+        thread_ts: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
     ) -> bool:
         """
         Delete conversation history
         Args:
             channel_id: Slack channel ID
-            thread_ts: Thread timestamp if in thread
+            thread_ts: Thread timestamp if in thread; otherwise the whole channel
+            progress: Called with the number of documents deleted so far
         """
         try:
-            query = self.collection.where('channel_id', '==', channel_id)
-            
             if thread_ts:
-                query = query.where('thread_ts', '==', thread_ts)
-            
-            # Delete documents
-            docs = query.stream()
-            for doc in docs:
-                doc.reference.delete()
-            
+                query = self.threads.where(
+                    '__name__', '==', self._thread_ref(channel_id, thread_ts)
+                )
+            else:
+                query = self.threads.where('channel_id', '==', channel_id)
+
+            # Delete documents in parallel batches
+            deleted = await self._delete_threads(
+                query.select(['channel_id']).order_by('__name__'),
+                progress
+            )
+            logger.info("Deleted %s conversation documents from %s", deleted, channel_id)
             return True
-            
+
         except Exception as e:
-            logger.error(f"Error deleting conversation: {str(e)}")
-            return False
\ No newline at end of file
+            logger.error("Error deleting conversation: %s", e)
+            return False
+
+    async def delete_older_than(
+        self,
+        max_age: timedelta,
+        progress: Optional[ProgressCallback] = None
+    ) -> int:
+        """
+        Expire threads with no messages since a cutoff
+        Args:
+            max_age: Threads idle for longer than this are deleted
+            progress: Called with the number of documents deleted so far
+        Returns:
+            Number of deleted documents
+        """
+        cutoff = datetime.now(timezone.utc) - max_age
+        query = (
+            self.threads.where('last_message_at', '<', cutoff)
+            .select(['channel_id', 'last_message_at'])
+            .order_by('last_message_at')
+        )
+        deleted = await self._delete_threads(query, progress)
+        return deleted
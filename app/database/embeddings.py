@@ -0,0 +1,139 @@
+# app/database/embeddings.py
+
+from typing import List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+import asyncio
+import logging
+import time
+
+from ..config import get_settings
+from ..utils.metrics import get_metrics
+from ..utils.usage import count_tokens, get_usage_tracker
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+batch_size = get_metrics().histogram(
+    "embedding_batch_size",
+    "Queries sent per batched embedding request",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+batch_wait = get_metrics().histogram(
+    "embedding_batch_wait_seconds",
+    "Time the first query of a batch waited for the batch to be sent",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05)
+)
+
+embedding_tokens = get_metrics().counter(
+    "embedding_tokens_total",
+    "Tokens sent to the embedding model",
+    labels=("model",)
+)
+
+_Waiter = Tuple[str, asyncio.Future]
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that sends concurrent queries as one request
+
+    While a request is in flight, further aembed_query calls are collected
+    for up to `window_ms` or until `max_batch` are waiting, then embedded
+    with a single aembed_documents call and handed back to their callers.
+    A query arriving while nothing is in flight is sent at once, so a lone
+    question never waits for the window. With `max_in_flight` requests out,
+    queries wait for one to return instead, so batches grow with load
+    rather than the request rate.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch: int = settings.EMBEDDING_BATCH_SIZE,
+        window_ms: float = settings.EMBEDDING_BATCH_WINDOW_MS,
+        max_in_flight: int = settings.EMBEDDING_MAX_IN_FLIGHT
+    ):
+        """
+        Initialize the batching embedder
+        Args:
+            embeddings: Underlying embedding model
+            max_batch: Most queries per request
+            window_ms: Longest a query waits for others to join its batch
+            max_in_flight: Most concurrent batched requests
+        """
+        self.embeddings = embeddings
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000
+        self.max_in_flight = max(1, max_in_flight)
+        self.model = getattr(embeddings, "model", None) or settings.EMBEDDING_MODEL
+        self._waiting: List[_Waiter] = []
+        self._first_at = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def _record_tokens(self, texts: List[str]) -> None:
+        """Count tokens against the request that needed them"""
+        tokens = sum(count_tokens(text) for text in texts)
+        embedding_tokens.inc(tokens, model=self.model)
+        get_usage_tracker().record(self.model, embedding_tokens=tokens)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Documents already come in batches and are sent as they are"""
+        self._record_tokens(texts)
+        return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query, batched with concurrent ones"""
+        self._record_tokens([text])
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._waiting:
+            self._first_at = time.perf_counter()
+        self._waiting.append((text, future))
+
+        if self._in_flight == 0 or len(self._waiting) >= self.max_batch or self.window <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        # Shielded so one caller's cancellation doesn't fail the batch
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        """Send the waiting queries, as many requests as slots allow"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiting and self._in_flight < self.max_in_flight:
+            waiting = self._waiting[:self.max_batch]
+            del self._waiting[:self.max_batch]
+            now = time.perf_counter()
+            batch_size.observe(len(waiting))
+            batch_wait.observe(now - self._first_at)
+            self._first_at = now
+            self._in_flight += 1
+            asyncio.ensure_future(self._send(waiting))
+
+    async def _send(self, waiting: List[_Waiter]) -> None:
+        # Identical queries in a batch are embedded once
+        texts = list(dict.fromkeys(text for text, _ in waiting))
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._in_flight -= 1
+            # Queries that gathered while requests were out go next
+            if self._waiting:
+                self._flush()
+        by_text = dict(zip(texts, vectors))
+        for text, future in waiting:
+            if not future.done():
+                future.set_result(by_text[text])
@@ -0,0 +1,324 @@
+# app/database/export.py
+
+"""
+Export conversation messages to compressed files for analytics.
+
+Pages through the messages of every thread in write order and streams them
+into numbered part files in the output directory, gzipped JSON Lines or
+Parquet. The next page is fetched while the current one is written, and at
+most `--prefetch` pages are held in memory, so memory stays flat however
+many messages are exported.
+
+A part file only appears once it is complete; `_checkpoint.json` then
+records the last exported message. Re-running with the same directory
+resumes after an interruption and, once caught up, exports only the
+messages written since the last run. `seq` is assigned before a message
+is committed, so a run re-reads the last `--overlap` seconds before the
+checkpoint and skips the messages it lists as already exported; messages
+committed late within that window are not missed.
+
+    python -m app.database.export --out exports/messages
+    python -m app.database.export --out exports/messages --format parquet --since 2024-01-01
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import glob
+import gzip
+import json
+import os
+import time
+
+from ..config import get_settings
+from ..utils import setup_logger, shutdown_logging
+from .conversation import ConversationStore
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+CHECKPOINT_FILE = '_checkpoint.json'
+FORMATS = {'jsonl': 'jsonl.gz', 'parquet': 'parquet'}
+# Parquet row groups; smaller groups compress and scan worse
+PARQUET_ROW_GROUP = 10_000
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    """Firestore timestamp as an aware UTC datetime"""
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def message_record(doc: Any) -> Dict[str, Any]:
+    """
+    Flat export row for a message snapshot
+    Metadata is serialized to a JSON string so every row has the same columns.
+    """
+    data = doc.to_dict() or {}
+    return {
+        'path': doc.reference.path,
+        'thread_id': doc.reference.parent.parent.id,
+        'channel_id': data.get('channel_id'),
+        'thread_ts': data.get('thread_ts'),
+        'user_id': data.get('user_id'),
+        'message_type': data.get('message_type'),
+        'content': data.get('content'),
+        'seq': data.get('seq'),
+        'timestamp': _timestamp(data.get('timestamp')),
+        'metadata': json.dumps(data.get('metadata') or {}, default=str)
+    }
+
+def _fsync(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class _JsonlPart:
+    """Gzipped JSON Lines part file, written to a temporary name until closed"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self._file = gzip.open(self.tmp_path, 'wt', encoding='utf-8')
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            if record['timestamp'] is not None:
+                record = {**record, 'timestamp': record['timestamp'].isoformat()}
+            self._file.write(json.dumps(record, ensure_ascii=False))
+            self._file.write('\n')
+
+    def close(self) -> None:
+        self._file.close()
+        _fsync(self.tmp_path)
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        os.remove(self.tmp_path)
+
+class _ParquetPart:
+    """Parquet part file with one row group per PARQUET_ROW_GROUP messages"""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from None
+        self._pa = pa
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.schema = pa.schema([
+            ('path', pa.string()),
+            ('thread_id', pa.string()),
+            ('channel_id', pa.string()),
+            ('thread_ts', pa.string()),
+            ('user_id', pa.string()),
+            ('message_type', pa.string()),
+            ('content', pa.string()),
+            ('seq', pa.int64()),
+            ('timestamp', pa.timestamp('us', tz='UTC')),
+            ('metadata', pa.string())
+        ])
+        self._writer = pq.ParquetWriter(self.tmp_path, self.schema, compression='zstd')
+        self._rows: List[Dict[str, Any]] = []
+
+    def _flush(self) -> None:
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self._rows.extend(records)
+        if len(self._rows) >= PARQUET_ROW_GROUP:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+        _fsync(self.tmp_path)
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._writer.close()
+        os.remove(self.tmp_path)
+
+def load_checkpoint(out_dir: str) -> Dict[str, Any]:
+    """Progress of earlier runs into a directory; empty for a new export"""
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoint(out_dir: str, checkpoint: Dict[str, Any]) -> None:
+    """Replace the checkpoint atomically, so a crash leaves the previous one"""
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(f"{path}.tmp", path)
+
+async def export_messages(
+    store: ConversationStore,
+    out_dir: str,
+    file_format: str = 'jsonl',
+    page_size: int = 500,
+    part_size: int = 100_000,
+    prefetch: int = 4,
+    since: Optional[datetime] = None,
+    overlap: float = 300
+) -> int:
+    """
+    Export messages written after the last checkpoint
+    Args:
+        store: Conversation store to read
+        out_dir: Directory for part files and the checkpoint
+        file_format: 'jsonl' or 'parquet'
+        page_size: Messages per Firestore page
+        part_size: Messages per part file
+        prefetch: Pages fetched ahead of the writer
+        since: Start of a new export; ignored once a checkpoint exists
+        overlap: Seconds before the checkpoint read again for late commits
+    Returns:
+        Number of messages exported by this run
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # Parts left unfinished by an interrupted run are exported again
+    for stale in glob.glob(os.path.join(out_dir, '*.tmp')):
+        os.remove(stale)
+
+    checkpoint = load_checkpoint(out_dir)
+    if checkpoint and checkpoint.get('format', file_format) != file_format:
+        raise ValueError(f"{out_dir} holds a {checkpoint['format']} export")
+    after_seq = checkpoint.get('after_seq')
+    after_path = checkpoint.get('after_path')
+    # Paths and seqs of messages exported within `overlap` of the checkpoint
+    recent: Dict[str, int] = dict(checkpoint.get('recent') or {})
+    window = int(overlap * 1_000_000_000)
+    if after_seq is not None and window > 0 and 'recent' in checkpoint:
+        # Messages committed after the checkpoint with an earlier seq are
+        # picked up here; those already exported are skipped below
+        after_seq, after_path = after_seq - window, None
+    elif after_seq is None and since is not None:
+        # seq is the write time in nanoseconds
+        after_seq = int(since.timestamp() * 1_000_000_000) - 1
+    part_class = _ParquetPart if file_format == 'parquet' else _JsonlPart
+
+    # Fetching runs ahead of writing, bounded by the queue
+    pages: asyncio.Queue = asyncio.Queue(maxsize=max(1, prefetch))
+
+    async def fetch() -> None:
+        try:
+            async for page in store.iter_messages(after_seq, after_path, page_size):
+                await pages.put([message_record(doc) for doc in page])
+        except Exception as e:
+            await pages.put(e)
+            return
+        await pages.put(None)
+
+    fetcher = asyncio.create_task(fetch())
+    part_number = checkpoint.get('parts', 0)
+    part = None
+    in_part = 0
+    exported = 0
+    last: Optional[Dict[str, Any]] = None
+    started = time.monotonic()
+
+    async def finish_part() -> None:
+        nonlocal part, in_part
+        await asyncio.to_thread(part.close)
+        # The part is complete; nothing is left to abort if the checkpoint fails
+        part, in_part = None, 0
+        for path in [path for path, seq in recent.items() if seq <= last['seq'] - window]:
+            del recent[path]
+        save_checkpoint(out_dir, {
+            'format': file_format,
+            'after_seq': last['seq'],
+            'after_path': last['path'],
+            'recent': recent,
+            'parts': part_number,
+            'exported': checkpoint.get('exported', 0) + exported,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        })
+        elapsed = max(time.monotonic() - started, 1e-9)
+        logger.info(
+            "Exported %s messages in %s parts (%.0f/s, last seq %s)",
+            exported, part_number - checkpoint.get('parts', 0), exported / elapsed, last['seq']
+        )
+
+    try:
+        while True:
+            records = await pages.get()
+            if records is None:
+                break
+            if isinstance(records, Exception):
+                raise records
+            records = [record for record in records if record['path'] not in recent]
+            while records:
+                if part is None:
+                    part_number += 1
+                    name = f"messages-{part_number:06d}.{FORMATS[file_format]}"
+                    part = part_class(os.path.join(out_dir, name))
+                chunk = records[:part_size - in_part]
+                records = records[len(chunk):]
+                # Compression runs off the event loop, overlapping the next fetch
+                await asyncio.to_thread(part.write, chunk)
+                in_part += len(chunk)
+                exported += len(chunk)
+                last = chunk[-1]
+                if window > 0:
+                    recent.update((record['path'], record['seq']) for record in chunk)
+                if in_part >= part_size:
+                    await finish_part()
+        if part is not None:
+            await finish_part()
+    finally:
+        fetcher.cancel()
+        if part is not None:
+            part.abort()
+
+    return exported
+
+def _parse_since(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--out", required=True, help="Output directory; reuse it to resume or continue")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl", dest="file_format")
+    parser.add_argument("--page-size", type=int, default=500, help="Messages per Firestore page")
+    parser.add_argument("--part-size", type=int, default=100_000, help="Messages per part file")
+    parser.add_argument("--prefetch", type=int, default=4, help="Pages fetched ahead of the writer")
+    parser.add_argument(
+        "--overlap", type=float, default=300,
+        help="Seconds before the checkpoint read again for messages committed late"
+    )
+    parser.add_argument(
+        "--since", type=_parse_since,
+        help="ISO date or time to start a new export from (default: everything)"
+    )
+    args = parser.parse_args()
+
+    try:
+        exported = asyncio.run(export_messages(
+            ConversationStore(),
+            args.out,
+            file_format=args.file_format,
+            page_size=args.page_size,
+            part_size=args.part_size,
+            prefetch=args.prefetch,
+            since=args.since,
+            overlap=args.overlap
+        ))
+        logger.info("Export finished: %s new messages in %s", exported, args.out)
+    finally:
+        shutdown_logging()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# app/database/index_versions.py
+
+from google.cloud import firestore
+from typing import Optional
+import asyncio
+import logging
+
+from ..config import get_settings
+from ..cache import SharedCache, get_shared_cache
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+INDEX_VERSION_COLLECTION = 'index_versions'
+
+class IndexVersionStore:
+    """
+    Per-namespace index versions in Firestore, read through the shared cache
+
+    One document per namespace in `index_versions`, incremented by every
+    write to the namespace from any host. Reads are served from the host's
+    shared cache for INDEX_VERSION_CACHE_TTL seconds, so other hosts see a
+    bump within that window; bumps invalidate the entry on the bumping host
+    at once. Versions of a local store (e.g. an offline fixture) are kept
+    only in the host cache.
+    """
+
+    def __init__(self, cache: Optional[SharedCache] = None, local: bool = False):
+        """
+        Initialize the store; Firestore is opened on the first cache miss
+        Args:
+            cache: Cache for the versions instead of the shared cache
+            local: Keep versions in the host cache only, without Firestore
+        """
+        cache = cache or get_shared_cache()
+        self.local = local
+        self._db: Optional[firestore.Client] = None
+        if local:
+            self.cache = cache.namespace(INDEX_VERSION_COLLECTION)
+        else:
+            self.cache = cache.namespace(
+                INDEX_VERSION_COLLECTION, ttl=settings.INDEX_VERSION_CACHE_TTL
+            )
+
+    def _doc(self, namespace: str) -> firestore.DocumentReference:
+        if self._db is None:
+            self._db = firestore.Client(project=settings.PROJECT_ID)
+        return self._db.collection(INDEX_VERSION_COLLECTION).document(namespace)
+
+    async def _load(self, namespace: str) -> int:
+        """Read a namespace's version from Firestore"""
+        snapshot = await asyncio.to_thread(self._doc(namespace).get)
+        data = snapshot.to_dict() if snapshot.exists else None
+        return int((data or {}).get('version') or 0)
+
+    async def get(self, namespace: str) -> Optional[int]:
+        """
+        Get the current version of a namespace
+        Args:
+            namespace: Namespace
+        Returns:
+            The version, 0 if never written, or None if it can't be read;
+            results must not be cached or reused without a version
+        """
+        if self.local:
+            return await self.cache.get(namespace) or 0
+        try:
+            return await self.cache.get_or_set(namespace, lambda: self._load(namespace))
+        except Exception as e:
+            logger.error("Error loading index version of namespace %s: %s", namespace, e)
+            return None
+
+    async def bump(self, namespace: str) -> int:
+        """
+        Increment the version of a namespace
+        Args:
+            namespace: Namespace that was written to
+        Returns:
+            New version
+        """
+        if self.local:
+            return await self.cache.incr(namespace)
+        doc = self._doc(namespace)
+        await asyncio.to_thread(
+            doc.set, {'version': firestore.Increment(1)}, merge=True
+        )
+        await self.cache.delete(namespace)
+        return await self._load(namespace)
@@ -0,0 +1,225 @@
+# app/database/local_index.py
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("float32", "int8", "binary")
+
+# Quantized rows are scored in cache-sized blocks, so search never
+# materializes a full float32 copy of the index
+_BLOCK_BYTES = 256 * 1024
+
+# Set bits per byte value, for Hamming distances over packed bits
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+_bitwise_count = getattr(np, "bitwise_count", None)  # numpy >= 2.0
+
+def truncate_embeddings(
+    vectors: Any,
+    dimensions: Optional[int] = None
+) -> np.ndarray:
+    """
+    Matryoshka-style truncation: keep the leading dimensions, renormalize
+    Args:
+        vectors: Embeddings, one per row (or a single vector)
+        dimensions: Dimensions to keep; None or 0 keeps all
+    Returns:
+        Unit-length float32 vectors
+    """
+    array = np.asarray(vectors, dtype=np.float32)
+    if dimensions and dimensions < array.shape[-1]:
+        array = array[..., :dimensions]
+    norms = np.linalg.norm(array, axis=-1, keepdims=True)
+    return array / np.maximum(norms, 1e-12)
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-vector int8 quantization
+    Args:
+        vectors: float32 vectors, one per row
+    Returns:
+        int8 codes and the float32 scale of each row
+    """
+    scales = np.abs(vectors).max(axis=-1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """
+    Sign-bit quantization, eight dimensions per byte
+    Args:
+        vectors: float32 vectors, one per row
+    Returns:
+        Packed uint8 bit codes
+    """
+    return np.packbits(vectors > 0, axis=-1)
+
+class LocalVectorIndex:
+    """
+    In-process vector index with optional quantization
+
+    Used by the benchmarks and offline fixtures to compare embedding sizes
+    and precisions; the service itself searches Pinecone. Vectors are
+    truncated to `dimensions` and renormalized, then stored as float32,
+    int8 (4x smaller) or sign bits (32x smaller). Quantized searches take
+    the best `k * rescore_factor` candidates and rescore them with
+    full-precision vectors. Those live in a memory-mapped file when
+    `full_precision_path` is given, so only the candidates' rows are read
+    into memory; otherwise they stay resident and count in memory_bytes().
+    """
+
+    def __init__(
+        self,
+        dimensions: Optional[int] = None,
+        precision: str = "float32",
+        rescore_factor: int = 4,
+        full_precision_path: Optional[str] = None
+    ):
+        """
+        Initialize the index
+        Args:
+            dimensions: Leading embedding dimensions to keep; None keeps all
+            precision: One of float32, int8 or binary
+            rescore_factor: Candidates rescored per requested result
+            full_precision_path: .npy file to memory-map rescoring vectors
+                from; None keeps them in memory
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {', '.join(PRECISIONS)}")
+        self.dimensions = dimensions or None
+        self.precision = precision
+        self.rescore_factor = max(1, rescore_factor)
+        self.full_precision_path = full_precision_path
+
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._pending: List[np.ndarray] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(
+        self,
+        ids: Sequence[str],
+        vectors: Any,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Add vectors to the index
+        Args:
+            ids: Vector IDs
+            vectors: Embeddings, one per row, at any dimension >= `dimensions`
+            metadatas: Metadata for each vector
+        """
+        array = truncate_embeddings(vectors, self.dimensions)
+        if array.ndim != 2 or len(array) != len(ids):
+            raise ValueError("expected one vector per id")
+        self.ids.extend(ids)
+        self.metadatas.extend(metadatas or [{} for _ in ids])
+        self._pending.append(array)
+
+    def _compact(self) -> None:
+        """Fold pending vectors into the stored arrays and re-quantize"""
+        if not self._pending:
+            return
+        parts = ([np.asarray(self._vectors)] if self._vectors is not None else []) + self._pending
+        vectors = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        self._pending = []
+
+        if self.precision == "int8":
+            self._codes, self._scales = quantize_int8(vectors)
+        elif self.precision == "binary":
+            self._codes = quantize_binary(vectors)
+
+        if self.precision != "float32" and self.full_precision_path:
+            # Keep rescoring vectors on disk; the page cache holds hot rows
+            directory = os.path.dirname(self.full_precision_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Write aside and swap, so a mapping of the old file stays valid
+            temp_path = f"{self.full_precision_path}.{os.getpid()}.tmp.npy"
+            np.save(temp_path, vectors)
+            os.replace(temp_path, self.full_precision_path)
+            vectors = np.load(self.full_precision_path, mmap_mode="r")
+        self._vectors = vectors
+
+    def memory_bytes(self) -> int:
+        """Resident size of the searchable vectors, excluding memory-mapped rows"""
+        self._compact()
+        if self._vectors is None:
+            return 0
+        total = 0
+        if self._codes is not None:
+            total += self._codes.nbytes
+        if self._scales is not None:
+            total += self._scales.nbytes
+        if not isinstance(self._vectors, np.memmap):
+            total += self._vectors.nbytes
+        return total
+
+    def _coarse_scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate similarity of the query to every stored vector"""
+        if self.precision == "float32":
+            return self._vectors @ query
+
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        if self.precision == "int8":
+            # Asymmetric: the query stays float32, rows are dequantized per block
+            step = max(1, _BLOCK_BYTES // (4 * self._codes.shape[1]))
+            for start in range(0, len(scores), step):
+                block = self._codes[start:start + step].astype(np.float32)
+                np.multiply(block @ query, self._scales[start:start + step], out=scores[start:start + step])
+        else:
+            bits = quantize_binary(query[None, :])[0]
+            step = max(1, _BLOCK_BYTES // self._codes.shape[1])
+            for start in range(0, len(scores), step):
+                block = np.bitwise_xor(self._codes[start:start + step], bits)
+                counts = _bitwise_count(block) if _bitwise_count else _POPCOUNT[block]
+                # Fewer differing sign bits means more similar
+                scores[start:start + step] = -counts.sum(axis=1, dtype=np.int32)
+        return scores
+
+    def search(self, query: Any, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find the stored vectors most similar to a query
+        Args:
+            query: Query embedding
+            k: Number of results
+        Returns:
+            Results with id, cosine score and metadata, best first
+        """
+        self._compact()
+        if not self.ids or k <= 0:
+            return []
+        query = truncate_embeddings(query, self.dimensions).reshape(-1)
+        k = min(k, len(self.ids))
+
+        scores = self._coarse_scores(query)
+        candidates = min(len(scores), k if self.precision == "float32" else k * self.rescore_factor)
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+
+        if self.precision == "float32":
+            exact = scores[top]
+        else:
+            # Full-precision rescore of the candidates only; sorted rows read
+            # a memory-mapped file front to back
+            top = np.sort(top)
+            exact = np.asarray(self._vectors[top]) @ query
+
+        best = np.argsort(-exact, kind="stable")[:k]
+        return [
+            {
+                "id": self.ids[top[i]],
+                "score": float(exact[i]),
+                "metadata": self.metadatas[top[i]]
+            }
+            for i in best
+        ]
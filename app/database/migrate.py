@@ -0,0 +1,145 @@
+# app/database/migrate.py
+
+"""
+Migrate conversations from the flat `conversations` collection to the
+per-thread layout: `threads/{channel_id}:{thread_ts}/messages/{seq}`.
+
+The migration is idempotent: message IDs are derived from the source
+document, and thread counters are recomputed from the migrated messages,
+so it can be re-run or resumed after a failure.
+
+    python -m app.database.migrate [--dry-run] [--delete-source]
+"""
+
+from google.cloud import firestore
+from typing import Any, Dict, Optional, Set
+import argparse
+import time
+
+from ..config import get_settings
+from ..utils import setup_logger, shutdown_logging
+from .conversation import MAX_BATCH_WRITES, thread_doc_id
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+def _seq(data: Dict[str, Any]) -> int:
+    """Sequence number of a source document, from its write time"""
+    timestamp = data.get('timestamp')
+    if hasattr(timestamp, 'timestamp'):
+        return int(timestamp.timestamp() * 1_000_000_000)
+    return 0
+
+def _recount_thread(thread_ref: firestore.DocumentReference) -> None:
+    """Recompute a thread's counters from its messages"""
+    messages = thread_ref.collection('messages')
+    count = messages.count().get()[0][0].value
+    latest = messages.order_by('seq', direction=firestore.Query.DESCENDING).limit(1).get()
+    update: Dict[str, Any] = {'message_count': count}
+    if latest:
+        last = latest[0].to_dict()
+        update['last_seq'] = last.get('seq', 0)
+        update['last_message_at'] = last.get('timestamp')
+    thread_ref.set(update, merge=True)
+
+def migrate(
+    db: firestore.Client,
+    page_size: int = 250,
+    dry_run: bool = False,
+    delete_source: bool = False,
+    start_after: Optional[str] = None
+) -> int:
+    """
+    Copy every source document into its thread's messages subcollection
+    Args:
+        db: Firestore client
+        page_size: Source documents per batched write (two writes each)
+        dry_run: Only count the documents that would be migrated
+        delete_source: Delete source documents once copied
+        start_after: Resume after this source document ID
+    Returns:
+        Number of migrated documents
+    """
+    source = db.collection('conversations')
+    threads = db.collection('threads')
+    # Each document takes two writes, three when the source is deleted
+    writes_per_doc = 3 if delete_source else 2
+    page_size = max(1, min(page_size, MAX_BATCH_WRITES // writes_per_doc))
+
+    query = source.order_by('__name__').limit(page_size)
+    cursor = {'__name__': start_after} if start_after else None
+    touched: Set[str] = set()
+    migrated = 0
+    started = time.monotonic()
+
+    while True:
+        page = (query.start_after(cursor) if cursor else query).get()
+        if not page:
+            break
+
+        batch = db.batch()
+        for doc in page:
+            data = doc.to_dict()
+            channel_id = data.get('channel_id')
+            if not channel_id:
+                logger.warning("Skipping %s: no channel_id", doc.id)
+                continue
+            thread_id = thread_doc_id(channel_id, data.get('thread_ts'))
+            thread_ref = threads.document(thread_id)
+            seq = _seq(data)
+
+            batch.set(
+                thread_ref.collection('messages').document(f"{seq:020d}-{doc.id}"),
+                {**data, 'seq': seq}
+            )
+            thread_fields: Dict[str, Any] = {
+                'channel_id': channel_id,
+                'thread_ts': data.get('thread_ts')
+            }
+            if data.get('user_id'):
+                thread_fields['participants'] = firestore.ArrayUnion([data['user_id']])
+            batch.set(thread_ref, thread_fields, merge=True)
+            if delete_source:
+                batch.delete(doc.reference)
+            touched.add(thread_id)
+            migrated += 1
+
+        if not dry_run:
+            batch.commit()
+        cursor = {'__name__': page[-1].id}
+        logger.info(
+            "Migrated %s documents into %s threads (last: %s, %.0fs)",
+            migrated, len(touched), page[-1].id, time.monotonic() - started
+        )
+        if len(page) < page_size:
+            break
+
+    if not dry_run:
+        for thread_id in touched:
+            _recount_thread(threads.document(thread_id))
+        logger.info("Recomputed counters of %s threads", len(touched))
+    return migrated
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--page-size", type=int, default=250, help="Source documents per batch")
+    parser.add_argument("--dry-run", action="store_true", help="Count documents without writing")
+    parser.add_argument("--delete-source", action="store_true", help="Delete source documents once copied")
+    parser.add_argument("--start-after", help="Resume after this source document ID")
+    args = parser.parse_args()
+
+    try:
+        db = firestore.Client(project=settings.PROJECT_ID)
+        migrated = migrate(
+            db,
+            page_size=args.page_size,
+            dry_run=args.dry_run,
+            delete_source=args.delete_source,
+            start_after=args.start_after
+        )
+        logger.info("Migration %sfinished: %s documents", 'dry run ' if args.dry_run else '', migrated)
+    finally:
+        shutdown_logging()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# app/database/permissions.py
+
+from google.cloud import firestore
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+import asyncio
+import logging
+
+from ..config import get_settings
+from ..models.metadata import PUBLIC_PRINCIPAL, group_principal, user_principal
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+class AccessFilter(NamedTuple):
+    """What a user may read: their workspace and the ACL principals they hold"""
+    workspace_id: Optional[str]
+    principals: FrozenSet[str]
+
+    def to_metadata_filter(self) -> Dict[str, Any]:
+        """
+        Pinecone metadata filter for this access
+        A vector matches when its `acl` list shares a principal with the
+        user and, if the user's workspace is known, its `workspace_id` matches.
+        """
+        conditions: Dict[str, Any] = {"acl": {"$in": sorted(self.principals)}}
+        if self.workspace_id:
+            conditions["workspace_id"] = {"$eq": self.workspace_id}
+        return conditions
+
+class _UserEntry(NamedTuple):
+    workspace_id: Optional[str]
+    groups: FrozenSet[str]
+
+class PermissionIndex:
+    """
+    In-memory map from Slack user to workspace and groups
+
+    Loaded from the `users` collection (`slack_id`, `workspace_id` and
+    `groups` of each User) and refreshed in the background, so resolving a
+    user's access filter is a dictionary lookup. Filters are memoized per
+    user until the next refresh.
+    """
+
+    def __init__(self, refresh_interval: float = settings.PERMISSION_REFRESH_SECONDS):
+        """
+        Initialize the index
+        Args:
+            refresh_interval: Seconds between reloads from Firestore
+        """
+        self.refresh_interval = refresh_interval
+        self._users: Dict[str, _UserEntry] = {}
+        self._filters: Dict[str, Dict[str, Any]] = {}
+        self._db: Optional[firestore.Client] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, users: Iterable[Dict[str, Any]]) -> None:
+        """
+        Replace the index contents
+        Args:
+            users: User records with slack_id, workspace_id and groups
+        """
+        entries = {
+            user['slack_id']: _UserEntry(
+                user.get('workspace_id'),
+                frozenset(user.get('groups') or ())
+            )
+            for user in users
+            if user.get('slack_id')
+        }
+        # Swap whole dicts so concurrent lookups never see a partial index
+        self._users = entries
+        self._filters = {}
+
+    async def refresh(self) -> int:
+        """
+        Reload the index from Firestore
+        Returns:
+            Number of users indexed
+        """
+        if self._db is None:
+            self._db = firestore.Client(project=settings.PROJECT_ID)
+        query = self._db.collection('users').select(['slack_id', 'workspace_id', 'groups'])
+        docs = await asyncio.to_thread(query.get)
+        self.load(doc.to_dict() for doc in docs)
+        logger.info("Permission index loaded for %s users", len(self._users))
+        return len(self._users)
+
+    def access_for(self, user_id: str) -> AccessFilter:
+        """
+        Resolve what a user may read
+        Args:
+            user_id: Slack user ID
+        Returns:
+            Workspace and ACL principals. Public documents are only readable
+            within a known workspace, since the filter can't scope them
+            otherwise; users missing from the index or without a workspace
+            only get documents shared with them or their groups.
+        """
+        entry = self._users.get(user_id)
+        if entry is None:
+            return AccessFilter(None, frozenset([user_principal(user_id)]))
+        principals: List[str] = [user_principal(user_id)]
+        if entry.workspace_id:
+            principals.append(PUBLIC_PRINCIPAL)
+        principals.extend(group_principal(group) for group in entry.groups)
+        return AccessFilter(entry.workspace_id, frozenset(principals))
+
+    def filter_for(self, user_id: str) -> Dict[str, Any]:
+        """Metadata filter restricting retrieval to what a user may read"""
+        metadata_filter = self._filters.get(user_id)
+        if metadata_filter is None:
+            metadata_filter = self.access_for(user_id).to_metadata_filter()
+            self._filters[user_id] = metadata_filter
+        return metadata_filter
+
+    async def _run(self) -> None:
+        """Refresh until cancelled"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Error refreshing permission index: %s", e)
+
+    def start(self) -> None:
+        """Start refreshing in the background"""
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop background refreshes"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,63 @@
+# app/database/retention.py
+
+"""
+Expire conversations with no messages for the retention period.
+
+Runs one pass and exits. Schedule it as a single job (cron, a Kubernetes
+CronJob or Cloud Scheduler) rather than in the web or worker processes, so
+exactly one purge runs however many replicas are deployed. Nothing is
+deleted while CONVERSATION_RETENTION_DAYS is 0, unless --days is given.
+
+    python -m app.database.retention
+    python -m app.database.retention --days 90
+"""
+
+from datetime import timedelta
+import argparse
+import asyncio
+import time
+
+from ..config import get_settings
+from ..utils import setup_logger, shutdown_logging
+from .conversation import ConversationStore
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+async def expire_conversations(store: ConversationStore, retention_days: int) -> int:
+    """
+    Delete the threads idle for longer than the retention period
+    Args:
+        store: Conversation store to purge
+        retention_days: Age in days after which conversations expire; 0 or less disables retention
+    Returns:
+        Number of deleted documents
+    """
+    if retention_days <= 0:
+        logger.info("Conversation retention is disabled; nothing deleted")
+        return 0
+
+    started = time.monotonic()
+
+    def report(deleted: int) -> None:
+        logger.info("Retention: %s expired conversation documents deleted", deleted)
+
+    deleted = await store.delete_older_than(timedelta(days=retention_days), progress=report)
+    logger.info("Retention run finished: %s documents deleted in %.1fs", deleted, time.monotonic() - started)
+    return deleted
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--days", type=int, default=settings.CONVERSATION_RETENTION_DAYS,
+        help="Delete threads idle for longer than this (default: CONVERSATION_RETENTION_DAYS)"
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(expire_conversations(ConversationStore(), args.days))
+    finally:
+        shutdown_logging()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# app/database/user_settings.py
+
+from google.cloud import firestore
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+
+from ..config import get_settings
+from ..cache import get_shared_cache
+from ..models import UserSettings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+class UserSettingsStore:
+    """
+    Per-user preferences in Firestore, read through the shared cache
+
+    One document per Slack user in `user_settings`. Reads are served from
+    the host's shared cache, so only the first request of a user per TTL
+    reaches Firestore; users without a document are cached with defaults
+    too. Updates invalidate the cached entry on this host; other hosts pick
+    them up when their entry expires.
+    """
+
+    def __init__(self):
+        """Initialize the store; Firestore is opened on the first cache miss"""
+        self._db: Optional[firestore.Client] = None
+        self.cache = get_shared_cache().namespace(
+            'user_settings', ttl=settings.USER_SETTINGS_CACHE_TTL
+        )
+
+    def _doc(self, user_id: str) -> firestore.DocumentReference:
+        if self._db is None:
+            self._db = firestore.Client(project=settings.PROJECT_ID)
+        return self._db.collection('user_settings').document(user_id)
+
+    async def _load(self, user_id: str) -> Dict[str, Any]:
+        """Read a user's settings from Firestore"""
+        snapshot = await asyncio.to_thread(self._doc(user_id).get)
+        data = snapshot.to_dict() if snapshot.exists else {}
+        # Validate once on the way into the cache; unknown fields are dropped
+        return UserSettings(**(data or {})).model_dump()
+
+    async def get(self, user_id: Optional[str]) -> UserSettings:
+        """
+        Get a user's settings
+        Args:
+            user_id: Slack user ID
+        Returns:
+            The user's settings, or defaults if unknown or unavailable
+        """
+        if not user_id:
+            return UserSettings()
+        try:
+            data = await self.cache.get_or_set(user_id, lambda: self._load(user_id))
+            return UserSettings.model_construct(**data)
+        except Exception as e:
+            logger.error("Error loading settings for user %s: %s", user_id, e)
+            return UserSettings()
+
+    async def update(self, user_id: str, **changes: Any) -> UserSettings:
+        """
+        Change some of a user's settings
+        Args:
+            user_id: Slack user ID
+            changes: Settings fields and their new values
+        Returns:
+            The user's settings after the update
+        """
+        current = await self.get(user_id)
+        updated = UserSettings(**{**current.model_dump(), **changes})
+        await asyncio.to_thread(
+            self._doc(user_id).set,
+            updated.model_dump(include=set(changes)),
+            merge=True
+        )
+        await self.cache.delete(user_id)
+        return updated
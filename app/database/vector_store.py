@@ -1,67 +1,348 @@
-# app/database/vector_store.
+# app/database/vector_store.py
 
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as BaseVectorStore
 from langchain_pinecone import PineconeVectorStore
 from langchain_openai import OpenAIEmbeddings
 from pinecone import Pinecone as PineconeClient
-from typing import List, Dict, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import asyncio
+import json
 import logging
 
 from ..config import get_settings
+from ..cache import CachedEmbeddings, SharedCache, get_shared_cache, make_key
+from ..utils.helpers import normalize_query
+from ..utils.metrics import get_metrics
+from ..utils.resilience import get_dependency
+from .embeddings import BatchingEmbeddings
+from .index_versions import IndexVersionStore
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+context_chunks = get_metrics().histogram(
+    "rag_context_chunks",
+    "Context chunks selected per question",
+    buckets=range(11)
+)
+context_cutoffs = get_metrics().counter(
+    "rag_context_cutoffs_total",
+    "Why adaptive context selection stopped",
+    labels=("reason",)
+)
+
+def adaptive_cutoff(
+    scores: Sequence[float],
+    min_k: int,
+    max_k: int,
+    relevance_target: float,
+    min_gap: float
+) -> Tuple[int, str]:
+    """
+    Decide how many of the best-first results to keep
+    Cuts at the largest drop between consecutive scores, if it is at least
+    `min_gap`, or once the kept results hold `relevance_target` of the
+    candidates' total relevance, whichever keeps fewer.
+    Args:
+        scores: Normalized scores, best first; one past max_k shows the gap after the last
+        min_k: Fewest results to keep
+        max_k: Most results to keep
+        relevance_target: Share of total relevance to cover, in (0, 1]
+        min_gap: Smallest score drop treated as a cliff
+    Returns:
+        Number of results to keep and why selection stopped
+    """
+    available = min(len(scores), max_k)
+    if available <= min_k:
+        return available, "min"
+    cut, reason = available, "max" if len(scores) > max_k else "exhausted"
+
+    relevance = [max(score, 0.0) for score in scores[:available]]
+    total = sum(relevance)
+    if relevance_target < 1.0 and total > 0:
+        covered = 0.0
+        for i, value in enumerate(relevance):
+            covered += value
+            if covered >= relevance_target * total:
+                if max(i + 1, min_k) < cut:
+                    cut, reason = max(i + 1, min_k), "target"
+                break
+
+    # Gap before position i, for every cut that keeps between min_k and max_k
+    best_gap, gap_at = 0.0, None
+    for i in range(min_k, min(len(scores), max_k + 1)):
+        gap = scores[i - 1] - scores[i]
+        if gap > best_gap:
+            best_gap, gap_at = gap, i
+    if gap_at is not None and best_gap >= min_gap and gap_at < cut:
+        cut, reason = gap_at, "gap"
+    return cut, reason
+
+class NamespaceSearch(NamedTuple):
+    """One namespace of a fan-out search"""
+    namespace: Optional[str]
+    filter: Optional[Dict[str, Any]] = None
+    quota: Optional[int] = None  # Most results this namespace may contribute
+    weight: float = 1.0  # Multiplier on normalized scores
+    threshold: Optional[float] = None  # Overrides the search-wide threshold
+
 class VectorStore:
-    def __init__(self):
-        """Initialize vector store with Pinecone"""
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        vector_store: Optional[BaseVectorStore] = None,
+        cache: Optional[SharedCache] = None,
+        index_versions: Optional[IndexVersionStore] = None
+    ):
+        """
+        Initialize vector store with Pinecone
+        Args:
+            embeddings: Embedding model to use instead of OpenAI
+            vector_store: Store to search instead of Pinecone, e.g. an offline fixture
+            cache: Cache for embeddings and results instead of the shared cache
+            index_versions: Store of namespace index versions; Firestore for
+                Pinecone, the cache only for a store passed in
+        """
         try:
-            # Initialize embeddings
-            self.embeddings = OpenAIEmbeddings(
-                model="text-embedding-3-large",
-                openai_api_key=settings.OPENAI_API_KEY
+            cache = cache or get_shared_cache()
+            self.default_namespace = settings.SHARED_NAMESPACE
+
+            if embeddings is None:
+                # Initialize embeddings, shared across workers through the cache;
+                # concurrent cache misses are sent to OpenAI in batches
+                # Shortened embeddings are truncated and renormalized by the API
+                embeddings = CachedEmbeddings(
+                    BatchingEmbeddings(OpenAIEmbeddings(
+                        model=settings.EMBEDDING_MODEL,
+                        dimensions=settings.EMBEDDING_DIMENSIONS,
+                        openai_api_key=settings.OPENAI_API_KEY
+                    )),
+                    cache=cache,
+                    model=f"{settings.EMBEDDING_MODEL}:{settings.EMBEDDING_DIMENSIONS or 'full'}",
+                    ttl=settings.EMBEDDING_CACHE_TTL
+                )
+            self.embeddings = embeddings
+
+            if vector_store is None:
+                # Initialize Pinecone
+                self.pc = PineconeClient(api_key=settings.PINECONE_API_KEY)
+                self.index = self.pc.Index(settings.PINECONE_INDEX_NAME)
+                vector_store = PineconeVectorStore(
+                    index=self.index,
+                    embedding=self.embeddings,
+                    text_key="text",
+                    namespace=self.default_namespace
+                )
+            else:
+                self.pc = None
+                self.index = None
+            self.vector_store = vector_store
+            if index_versions is None:
+                index_versions = IndexVersionStore(cache, local=self.index is None)
+            self.index_versions = index_versions
+
+            # Search results are cached per namespace index version; any
+            # write to a namespace, from any host, bumps its version, so
+            # cached results never outlive the index contents they came from
+            self.retrieval_cache = cache.namespace(
+                "retrieval", ttl=settings.RETRIEVAL_CACHE_TTL
             )
-            
-            # Initialize Pinecone
-            self.pc = PineconeClient(api_key=settings.PINECONE_API_KEY)
-            self.index = self.pc.Index(settings.PINECONE_INDEX_NAME)
-            
-            # Initialize vector store
-            self.vector_store = PineconeVectorStore(
-                index=self.index,
-                embedding=self.embeddings,
-                text_key="text",
-                namespace="default"
+            # Last good results regardless of index version, for failover
+            self.stale_results = cache.namespace(
+                "retrieval_stale", ttl=settings.STALE_RETRIEVAL_TTL
             )
+
+            # Outbound calls are hedged and guarded by circuit breakers
+            self.search_dependency = get_dependency("vector_store")
+            self.embedding_dependency = get_dependency("embeddings")
             
             logger.info("Vector store initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize vector store: {str(e)}")
+            logger.error("Failed to initialize vector store: %s", e)
             raise
 
-    async def similarity_search(
-        self, 
-        query: str, 
-        k: int = 3,
-        threshold: float = 0.7,
-        namespace: Optional[str] = None
+    async def warmup(self) -> Dict[str, Any]:
+        """Open Pinecone and OpenAI connections and fetch index metadata"""
+        stats = await asyncio.to_thread(self.index.describe_index_stats)
+        # Bypass the embedding cache so the OpenAI connection is really opened
+        vector = await self.embeddings.embeddings.aembed_query("warmup")
+        await self.vector_store.asimilarity_search_by_vector_with_score(vector, k=1)
+        return {"total_vector_count": stats.total_vector_count}
+
+    def threshold_for(self, namespace: Optional[str] = None, default: Optional[float] = None) -> float:
+        """
+        Similarity threshold of a namespace
+        Args:
+            namespace: Namespace, defaults to the default namespace
+            default: Threshold for namespaces without a calibrated one
+        Returns:
+            The calibrated threshold from NAMESPACE_THRESHOLDS, else the default
+        """
+        if default is None:
+            default = settings.SIMILARITY_THRESHOLD
+        return settings.NAMESPACE_THRESHOLDS.get(namespace or self.default_namespace, default)
+
+    def _select(
+        self,
+        results: List[Dict[str, Any]],
+        k: int,
+        threshold: float = 0.0,
+        score_key: str = "score"
     ) -> List[Dict[str, Any]]:
+        """Adaptively cut over-fetched results, best first"""
+        scale = 1.0 / max(1.0 - threshold, 1e-6)
+        keep, reason = adaptive_cutoff(
+            [(result[score_key] - threshold) * scale for result in results],
+            min_k=min(settings.MIN_CONTEXT_CHUNKS, k),
+            max_k=k,
+            relevance_target=settings.CONTEXT_RELEVANCE_TARGET,
+            min_gap=settings.CONTEXT_MIN_SCORE_GAP
+        )
+        context_cutoffs.inc(reason=reason)
+        return results[:keep]
+
+    async def index_version(self, namespace: Optional[str] = None) -> Optional[int]:
         """
-        Search for similar documents
+        Get the current index version of a namespace
         Args:
-            query: Search query
-            k: Number of results to return
-            threshold: Similarity threshold
-            namespace: Optional namespace for scoping results
+            namespace: Namespace, defaults to the default namespace
+        Returns:
+            The version, or None if it is unavailable and nothing derived
+            from the namespace may be served from cache
+        """
+        return await self.index_versions.get(namespace or self.default_namespace)
+
+    async def bump_index_version(self, namespace: Optional[str] = None) -> int:
+        """
+        Invalidate cached retrieval results for a namespace
+        Call this after writing to the namespace outside of this class.
+        Args:
+            namespace: Namespace that was written to
+        Returns:
+            New index version
+        """
+        namespace = namespace or self.default_namespace
+        version = await self.index_versions.bump(namespace)
+        logger.info("Index version of namespace %s is now %d", namespace, version)
+        return version
+
+    async def add_texts(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: Optional[str] = None
+    ) -> List[str]:
+        """
+        Embed and upsert texts into a namespace
+        Args:
+            texts: Texts to index
+            metadatas: Metadata for each text
+            ids: Vector IDs, generated if not given
+            namespace: Target namespace
+        Returns:
+            IDs of the upserted vectors
         """
         try:
-            results = await self.vector_store.asimilarity_search_with_score(
-                query, 
-                k=k,
-                namespace=namespace
+            result = await self.vector_store.aadd_texts(
+                texts,
+                metadatas=metadatas,
+                ids=ids,
+                namespace=namespace or self.default_namespace
+            )
+            return result
+        finally:
+            # Bump even on partial failure; some vectors may have been written
+            await self.bump_index_version(namespace)
+
+    async def delete(
+        self,
+        ids: List[str],
+        namespace: Optional[str] = None
+    ) -> None:
+        """
+        Delete vectors from a namespace
+        Args:
+            ids: Vector IDs to delete
+            namespace: Namespace holding the vectors
+        """
+        try:
+            await self.vector_store.adelete(
+                ids=ids,
+                namespace=namespace or self.default_namespace
+            )
+        finally:
+            await self.bump_index_version(namespace)
+
+    async def list_ids(self, prefix: str, namespace: Optional[str] = None) -> List[str]:
+        """
+        IDs of the vectors in a namespace that start with a prefix
+        Listing needs a serverless Pinecone index; a store passed in lists nothing.
+        Args:
+            prefix: ID prefix, e.g. a document ID and separator
+            namespace: Namespace holding the vectors
+        """
+        if self.index is None:
+            return []
+
+        def list_all() -> List[str]:
+            return [
+                vector_id
+                for page in self.index.list(prefix=prefix, namespace=namespace or self.default_namespace)
+                for vector_id in page
+            ]
+
+        return await asyncio.to_thread(list_all)
+
+    def _embed_once(self, query: str) -> Callable[[], Awaitable[List[float]]]:
+        """Embed a query at most once, on the first search that misses the cache"""
+        task: Optional[asyncio.Future] = None
+
+        async def embed() -> List[float]:
+            nonlocal task
+            if task is None:
+                task = asyncio.ensure_future(self.embedding_dependency.call(
+                    lambda: self.embeddings.aembed_query(query)
+                ))
+            return await asyncio.shield(task)
+
+        return embed
+
+    async def _search(
+        self,
+        query: str,
+        embed: Callable[[], Awaitable[List[float]]],
+        k: int,
+        threshold: float,
+        namespace: Optional[str],
+        filter: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Cached search of one namespace"""
+        version = await self.index_version(namespace)
+        search_key = (
+            namespace or self.default_namespace,
+            normalize_query(query),
+            k,
+            threshold,
+            json.dumps(filter, sort_keys=True) if filter else None
+        )
+        stale_key = make_key(*search_key)
+
+        async def search() -> List[Dict[str, Any]]:
+            vector = await embed()
+            # The filter is pushed down, so k counts only permitted matches
+            results = await self.search_dependency.call(
+                lambda: self.vector_store.asimilarity_search_by_vector_with_score(
+                    vector,
+                    k=k,
+                    filter=filter,
+                    namespace=namespace
+                )
             )
             
             # Filter by threshold and format results
-            filtered_results = [
+            formatted = [
                 {
                     "content": doc.page_content,
                     "metadata": doc.metadata,
@@ -70,18 +351,193 @@ class VectorStore:
                 for doc, score in results
                 if score >= threshold
             ]
-            
-            return filtered_results
-            
+            await self.stale_results.set(stale_key, formatted)
+            return formatted
+
+        try:
+            if version is None:
+                return await search()
+            return await self.retrieval_cache.get_or_set(make_key(version, *search_key), search)
         except Exception as e:
-            logger.error(f"Error during similarity search: {str(e)}")
+            # Results from before the last index change beat no context at
+            # all; they aren't cached under the current version
+            stale = await self.stale_results.get(stale_key)
+            if stale is None:
+                raise
+            logger.warning("Serving stale results for namespace %s: %s", search_key[0], e)
+            return stale
+
+    async def similarity_search(
+        self, 
+        query: str, 
+        k: int = 3,
+        threshold: Optional[float] = None,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        adaptive: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for similar documents
+        Args:
+            query: Search query
+            k: Number of results to return, the most when adaptive
+            threshold: Similarity threshold, defaults to the namespace's
+            namespace: Optional namespace for scoping results
+            filter: Metadata filter applied by Pinecone during the search
+            adaptive: Over-fetch and cut at a score cliff or relevance target
+        """
+        try:
+            threshold = self.threshold_for(namespace, threshold)
+            results = await self._search(
+                query,
+                self._embed_once(query),
+                k + 1 if adaptive else k,
+                threshold,
+                namespace,
+                filter
+            )
+            if adaptive:
+                return self._select(results, k, threshold)
+            return results
+        except Exception as e:
+            logger.error("Error during similarity search: %s", e)
             raise
 
+    async def multi_namespace_search(
+        self,
+        query: str,
+        searches: Sequence[NamespaceSearch],
+        k: int = 5,
+        threshold: Optional[float] = None,
+        adaptive: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Search several namespaces concurrently and merge into one top-k
+        The query is embedded once and every namespace is queried at the
+        same time, so latency tracks the slowest namespace. Scores are
+        rescaled per namespace from [threshold, 1] to [0, 1] and weighted
+        before merging; a namespace contributes at most its quota.
+        Args:
+            query: Search query
+            searches: Namespaces to search, with filters, quotas and weights
+            k: Number of results to return, the most when adaptive
+            threshold: Similarity threshold for namespaces without their own
+            adaptive: Over-fetch and cut at a score cliff or relevance target
+        Returns:
+            Results best first, each with its namespace and normalized score
+        """
+        floors = [
+            self.threshold_for(search.namespace, threshold)
+            if search.threshold is None else search.threshold
+            for search in searches
+        ]
+        fetch = k + 1 if adaptive else k
+        embed = self._embed_once(query)
+        outcomes = await asyncio.gather(
+            *(
+                self._search(
+                    query,
+                    embed,
+                    min(fetch, search.quota) if search.quota else fetch,
+                    floor,
+                    search.namespace,
+                    search.filter
+                )
+                for search, floor in zip(searches, floors)
+            ),
+            return_exceptions=True
+        )
+
+        merged: List[Dict[str, Any]] = []
+        errors = []
+        for search, floor, outcome in zip(searches, floors, outcomes):
+            if isinstance(outcome, BaseException):
+                # One unavailable namespace shouldn't sink the whole answer
+                logger.error("Error searching namespace %s: %s", search.namespace, outcome)
+                errors.append(outcome)
+                continue
+            scale = search.weight / max(1.0 - floor, 1e-6)
+            for result in outcome:
+                merged.append({
+                    **result,
+                    "namespace": search.namespace or self.default_namespace,
+                    "normalized_score": (result["score"] - floor) * scale
+                })
+        if errors and len(errors) == len(searches):
+            raise errors[0]
+
+        merged.sort(key=lambda result: result["normalized_score"], reverse=True)
+        # The same chunk may be indexed in more than one namespace
+        seen = set()
+        top = []
+        for result in merged:
+            if result["content"] in seen:
+                continue
+            seen.add(result["content"])
+            top.append(result)
+            if len(top) == fetch:
+                break
+        if adaptive:
+            return self._select(top, k, score_key="normalized_score")
+        return top[:k]
+
+    def format_context(self, results: List[Dict[str, Any]]) -> str:
+        """Concatenate search results with their sources"""
+        contexts = []
+        for result in results:
+            content = result["content"]
+            metadata = result["metadata"]
+            source = metadata.get("source", "Unknown")
+            contexts.append(f"Source: {source}\nContent: {content}\n")
+        return "\n".join(contexts)
+
+    async def get_relevant_results(
+        self,
+        query: str,
+        max_chunks: int = 5,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        searches: Optional[Sequence[NamespaceSearch]] = None,
+        adaptive: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the chunks to use as context for a query
+        Args:
+            query: Search query
+            max_chunks: Maximum number of chunks to return
+            namespace: Optional namespace for scoping results
+            filter: Metadata filter, e.g. a user's access filter
+            searches: Namespaces to fan out to instead of a single namespace
+            adaptive: Select between MIN_CONTEXT_CHUNKS and max_chunks by score
+        Returns:
+            Search results, best first
+        """
+        if searches:
+            results = await self.multi_namespace_search(
+                query,
+                searches,
+                k=max_chunks,
+                adaptive=adaptive
+            )
+        else:
+            results = await self.similarity_search(
+                query,
+                k=max_chunks,
+                namespace=namespace,
+                filter=filter,
+                adaptive=adaptive
+            )
+        context_chunks.observe(len(results))
+        return results
+
     async def get_relevant_context(
         self, 
         query: str, 
         max_chunks: int = 5,
-        namespace: Optional[str] = None
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        searches: Optional[Sequence[NamespaceSearch]] = None,
+        adaptive: bool = False
     ) -> str:
         """
         Get relevant context for a query
@@ -89,27 +545,20 @@ class VectorStore:
             query: Search query
             max_chunks: Maximum number of chunks to return
             namespace: Optional namespace for scoping results
+            filter: Metadata filter, e.g. a user's access filter
+            searches: Namespaces to fan out to instead of a single namespace
+            adaptive: Select between MIN_CONTEXT_CHUNKS and max_chunks by score
         """
         try:
-            results = await self.similarity_search(
-                query,
-                k=max_chunks,
-                namespace=namespace
+            results = await self.get_relevant_results(
+                query, max_chunks, namespace, filter, searches, adaptive
             )
             
             if not results:
                 return ""
             
-            # Concatenate contexts with metadata
-            contexts = []
-            for result in results:
-                content = result["content"]
-                metadata = result["metadata"]
-                source = metadata.get("source", "Unknown")
-                contexts.append(f"Source: {source}\nContent: {content}\n")
-            
-            return "\n".join(contexts)
+            return self.format_context(results)
             
         except Exception as e:
-            logger.error(f"Error getting relevant context: {str(e)}")
-            return ""
\ No newline at end of file
+            logger.error("Error getting relevant context: %s", e)
+            return ""
@@ -0,0 +1,15 @@
+# app/ingest/__init__.py
+
+from .parsers import file_type_for
+from .pool import DocumentParser, ParseError, ParseStream
+from .pipeline import index_file, index_files, iter_chunks
+
+__all__ = [
+    'DocumentParser',
+    'ParseError',
+    'ParseStream',
+    'file_type_for',
+    'index_file',
+    'index_files',
+    'iter_chunks'
+]
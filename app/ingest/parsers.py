@@ -0,0 +1,169 @@
+# app/ingest/parsers.py
+
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+import codecs
+import io
+import os
+import zipfile
+
+# Parsers read the file through a buffer (a memory map) and yield text as
+# they go, filling `info` with document properties such as the title.
+Parser = Callable[[Any, Dict[str, Any]], Iterator[str]]
+
+# Bytes decoded per step when reading text formats
+_READ_BYTES = 1024 * 1024
+
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_DC_TITLE = '{http://purl.org/dc/elements/1.1/}title'
+
+FILE_TYPES = {
+    '.pdf': 'pdf',
+    '.docx': 'docx',
+    '.html': 'html',
+    '.htm': 'html',
+    '.txt': 'text',
+    '.md': 'text'
+}
+
+def file_type_for(path: str) -> Optional[str]:
+    """Parser name for a file, by extension; None if unsupported"""
+    return FILE_TYPES.get(os.path.splitext(path)[1].lower())
+
+class _MappedFile(io.RawIOBase):
+    """Seekable file over a memory map, for readers that need a file object"""
+
+    def __init__(self, buf: Any):
+        self._buf = buf
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target: Any) -> int:
+        data = self._buf[self._pos:self._pos + len(target)]
+        target[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._buf)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+def _decoded(buf: Any) -> Iterator[str]:
+    """UTF-8 text of a buffer, decoded a slice at a time"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for start in range(0, len(buf), _READ_BYTES):
+        text = decoder.decode(buf[start:start + _READ_BYTES])
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def parse_text(buf: Any, info: Dict[str, Any]) -> Iterator[str]:
+    """Plain text and Markdown"""
+    yield from _decoded(buf)
+
+class _HTMLText(HTMLParser):
+    """Collects visible text, with line breaks at block elements"""
+
+    BLOCKS = frozenset(
+        'address article aside blockquote br dd div dl dt figcaption footer form '
+        'h1 h2 h3 h4 h5 h6 header hr li main nav ol p pre section table td th tr ul'.split()
+    )
+    SKIP = frozenset(('script', 'style', 'noscript', 'template'))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title: Optional[str] = None
+        self._skipping = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag == 'title':
+            self._in_title = True
+        elif tag in self.BLOCKS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag == 'title':
+            self._in_title = False
+        elif tag in self.BLOCKS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title = ((self.title or '') + data).strip()
+        elif not self._skipping:
+            self.parts.append(data)
+
+    def take(self) -> str:
+        text = ''.join(self.parts)
+        self.parts = []
+        return text
+
+def parse_html(buf: Any, info: Dict[str, Any]) -> Iterator[str]:
+    """HTML, without scripts and styles"""
+    parser = _HTMLText()
+    for text in _decoded(buf):
+        parser.feed(text)
+        if parser.title:
+            info.setdefault('title', parser.title)
+        chunk = parser.take()
+        if chunk.strip():
+            yield chunk
+    parser.close()
+    chunk = parser.take()
+    if chunk.strip():
+        yield chunk
+
+def parse_docx(buf: Any, info: Dict[str, Any]) -> Iterator[str]:
+    """Word documents, paragraph by paragraph, without loading the whole XML"""
+    with zipfile.ZipFile(_MappedFile(buf)) as archive:
+        if 'docProps/core.xml' in archive.namelist():
+            title = ElementTree.fromstring(archive.read('docProps/core.xml')).findtext(_DC_TITLE)
+            if title:
+                info['title'] = title.strip()
+        with archive.open('word/document.xml') as xml:
+            for _, element in ElementTree.iterparse(xml):
+                if element.tag == f'{_WORD_NS}p':
+                    text = ''.join(node.text or '' for node in element.iter(f'{_WORD_NS}t'))
+                    # Free parsed paragraphs; the body element would keep them all
+                    element.clear()
+                    if text:
+                        yield text + '\n'
+
+def parse_pdf(buf: Any, info: Dict[str, Any]) -> Iterator[str]:
+    """PDF text, page by page"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(_MappedFile(buf))
+    info['pages'] = len(reader.pages)
+    title = reader.metadata.title if reader.metadata else None
+    if title:
+        info['title'] = str(title).strip()
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        if text.strip():
+            yield text + '\n'
+
+PARSERS: Dict[str, Parser] = {
+    'pdf': parse_pdf,
+    'docx': parse_docx,
+    'html': parse_html,
+    'text': parse_text
+}
@@ -0,0 +1,181 @@
+# app/ingest/pipeline.py
+
+"""
+Parse documents and index them into the vector store.
+
+Files are parsed in a process pool; their text is chunked and embedded as
+it streams in, so indexing a large file starts before it is fully parsed
+and files are indexed concurrently, up to one per parser worker.
+
+    python -m app.ingest.pipeline docs/*.pdf --workspace-id T123 --public
+"""
+
+from typing import Any, AsyncIterable, AsyncIterator, List, Optional, Sequence
+import argparse
+import asyncio
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from ..config import get_settings
+from ..database import VectorStore
+from ..models import DocumentMetadata, ProcessingStatus
+from ..utils import setup_logger, shutdown_logging
+from .pool import DocumentParser, ParseError
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+async def iter_chunks(
+    segments: AsyncIterable[str],
+    splitter: RecursiveCharacterTextSplitter
+) -> AsyncIterator[str]:
+    """
+    Chunk streamed text as it arrives
+    The last chunk of the text so far is held back and re-split with the
+    next segment, so chunks continue and overlap across segment boundaries.
+    """
+    buffer = ''
+    async for segment in segments:
+        buffer += segment
+        # Split once a few chunks are buffered rather than on every segment
+        if len(buffer) < 4 * settings.CHUNK_SIZE:
+            continue
+        chunks = splitter.split_text(buffer)
+        for chunk in chunks[:-1]:
+            yield chunk
+        buffer = chunks[-1] if chunks else ''
+    for chunk in splitter.split_text(buffer):
+        yield chunk
+
+async def index_file(
+    parser: DocumentParser,
+    store: VectorStore,
+    path: str,
+    namespace: Optional[str] = None,
+    **document: Any
+) -> DocumentMetadata:
+    """
+    Parse, chunk and index one file
+    Chunks are stored as `<document id>#<n>`; chunks left from a longer
+    earlier version of the file are deleted once the new ones are stored,
+    or once indexing fails after overwriting some of them, so the index
+    never mixes two versions of a file.
+    Args:
+        parser: Parser pool
+        store: Vector store to index into
+        path: File to index
+        namespace: Target namespace
+        document: Owner, workspace and permissions, see DocumentParser.parse
+    Returns:
+        The document's metadata, with its status and chunk count
+    """
+    stream = parser.parse(path, **document)
+    metadata = stream.metadata
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP
+    )
+    batch: List[str] = []
+    count = 0
+
+    async def flush() -> None:
+        nonlocal batch, count
+        # Built per batch, as the parsed title arrives with the text
+        vector_metadata = metadata.to_vector_metadata()
+        await store.add_texts(
+            batch,
+            metadatas=[{**vector_metadata, 'chunk': count + i} for i in range(len(batch))],
+            ids=[f"{metadata.id}#{count + i}" for i in range(len(batch))],
+            namespace=namespace
+        )
+        count += len(batch)
+        batch = []
+
+    async def delete_stale() -> None:
+        """Delete the chunks past the ones written by this run"""
+        stale = [
+            vector_id for vector_id in await store.list_ids(f"{metadata.id}#", namespace)
+            if int(vector_id.rpartition('#')[2]) >= count
+        ]
+        if stale:
+            await store.delete(stale, namespace)
+
+    try:
+        async for chunk in iter_chunks(stream, splitter):
+            batch.append(chunk)
+            if len(batch) >= settings.INGEST_BATCH_CHUNKS:
+                await flush()
+        if batch:
+            await flush()
+        await delete_stale()
+    except Exception as e:
+        logger.error("Error indexing %s: %s", path, e)
+        if metadata.status != ProcessingStatus.FAILED:
+            metadata.update_status(ProcessingStatus.FAILED, str(e))
+        if count:
+            # The first chunks are already replaced; drop the rest of the
+            # earlier version rather than serve a mix of both
+            try:
+                await delete_stale()
+            except Exception as cleanup_error:
+                logger.error("Error deleting leftover chunks of %s: %s", path, cleanup_error)
+        metadata.chunk_count = count
+        return metadata
+    finally:
+        # Stops the parser when indexing failed before the text ran out
+        stream.close()
+
+    metadata.chunk_count = count
+    metadata.embedding_model = settings.EMBEDDING_MODEL
+    metadata.update_status(ProcessingStatus.INDEXED)
+    logger.info("Indexed %s: %s chunks", path, count)
+    return metadata
+
+async def index_files(
+    paths: Sequence[str],
+    namespace: Optional[str] = None,
+    **document: Any
+) -> List[DocumentMetadata]:
+    """Index files concurrently, as many at once as there are parser workers"""
+    store = VectorStore()
+    async with DocumentParser() as parser:
+        slots = asyncio.Semaphore(parser.workers)
+
+        async def index(path: str) -> Optional[DocumentMetadata]:
+            async with slots:
+                try:
+                    return await index_file(parser, store, path, namespace, **document)
+                except ParseError as e:
+                    logger.error(str(e))
+                    return None
+
+        results = await asyncio.gather(*(index(path) for path in paths))
+    return [metadata for metadata in results if metadata is not None]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("paths", nargs="+", help="PDF, DOCX, HTML, text or Markdown files")
+    parser.add_argument("--namespace", help="Target namespace (default: the shared namespace)")
+    parser.add_argument("--workspace-id", help="Workspace the documents belong to")
+    parser.add_argument("--user-id", help="Owner of the documents")
+    parser.add_argument("--public", action="store_true", help="Readable by the whole workspace")
+    args = parser.parse_args()
+
+    try:
+        documents = asyncio.run(index_files(
+            args.paths,
+            namespace=args.namespace,
+            user_id=args.user_id,
+            workspace_id=args.workspace_id,
+            permissions={'public': args.public}
+        ))
+        failed = [doc.source for doc in documents if doc.status == ProcessingStatus.FAILED]
+        logger.info(
+            "Indexed %s of %s files, %s chunks",
+            len(documents) - len(failed), len(args.paths), sum(doc.chunk_count or 0 for doc in documents)
+        )
+    finally:
+        shutdown_logging()
+
+if __name__ == "__main__":
+    main()
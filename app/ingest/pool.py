@@ -0,0 +1,380 @@
+# app/ingest/pool.py
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+import asyncio
+import hashlib
+import itertools
+import logging
+import mmap
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from ..config import get_settings
+from ..models import DocumentMetadata, ProcessingStatus
+from .parsers import PARSERS, file_type_for
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Text is sent from workers in segments of about this many characters
+SEGMENT_CHARS = 64 * 1024
+# Segments a job may send ahead of its reader before its worker pauses
+STREAM_SEGMENTS = 16
+# Slots of the shared arrays workers poll for cancelled jobs and read progress
+JOB_SLOTS = 1024
+# Seconds between checks of a paused worker
+_PAUSE_POLL = 0.005
+
+class ParseError(Exception):
+    """A file could not be parsed, timed out or exceeded its memory cap"""
+
+# Set in each worker process by _init_worker
+_events: Optional[Any] = None
+_cancelled: Optional[Any] = None
+_consumed: Optional[Any] = None
+
+def available_cores() -> int:
+    """CPU cores this process may run on, honouring affinity masks"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _data_bytes() -> Optional[int]:
+    """Current data segment size of this process (Linux), for the memory cap"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmData:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def _on_alarm(signum, frame):
+    raise TimeoutError()
+
+def _init_worker(events: Any, cancelled: Any, consumed: Any) -> None:
+    global _events, _cancelled, _consumed
+    _events = events
+    _cancelled = cancelled
+    _consumed = consumed
+    # Start the queue's feeder thread now; it can't start under a memory cap
+    events.put((None, None, None))
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+@contextmanager
+def _file_limits(timeout: float, memory_mb: int) -> Iterator[None]:
+    """
+    Bound the time and memory one file may take in a worker
+    Memory is capped with RLIMIT_DATA above the worker's current usage;
+    the memory-mapped file itself doesn't count against it.
+    """
+    previous = None
+    usage = _data_bytes() if resource is not None and memory_mb else None
+    if usage is not None:
+        previous = resource.getrlimit(resource.RLIMIT_DATA)
+        cap = usage + memory_mb * 1024 * 1024
+        if previous[1] != resource.RLIM_INFINITY:
+            cap = min(cap, previous[1])
+        resource.setrlimit(resource.RLIMIT_DATA, (cap, previous[1]))
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        if previous is not None:
+            resource.setrlimit(resource.RLIMIT_DATA, previous)
+
+def _wait_for_reader(job_id: int, sent: int) -> None:
+    """
+    Pause while the job's reader is STREAM_SEGMENTS segments behind
+    Each job waits for its own reader only, so a slow reader never holds
+    up other files. The wait doesn't count against the file's timeout.
+    """
+    slot = job_id % JOB_SLOTS
+    if sent - _consumed[slot] < STREAM_SEGMENTS:
+        return
+    left = signal.setitimer(signal.ITIMER_REAL, 0)[0]
+    try:
+        while sent - _consumed[slot] >= STREAM_SEGMENTS and _cancelled[slot] != job_id:
+            time.sleep(_PAUSE_POLL)
+    finally:
+        if left:
+            signal.setitimer(signal.ITIMER_REAL, left)
+
+def _parse_file(job_id: int, path: str, file_type: str, timeout: float, memory_mb: int) -> Dict[str, Any]:
+    """
+    Parse one file in a worker, sending text segments as they are extracted
+    The title is sent with every segment once the parser has found it.
+    Parsing pauses while the job's reader falls behind, and stops early if
+    the job is cancelled.
+    Returns:
+        Document properties found by the parser
+    """
+    info: Dict[str, Any] = {}
+    pending: List[str] = []
+    size = 0
+    sent = 0
+    try:
+        with _file_limits(timeout, memory_mb):
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return info
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    for text in PARSERS[file_type](buf, info):
+                        if _cancelled[job_id % JOB_SLOTS] == job_id:
+                            return info
+                        pending.append(text)
+                        size += len(text)
+                        if size >= SEGMENT_CHARS:
+                            _wait_for_reader(job_id, sent)
+                            _events.put((job_id, ''.join(pending), info.get('title')))
+                            pending, size = [], 0
+                            sent += 1
+            if pending:
+                _events.put((job_id, ''.join(pending), info.get('title')))
+        return info
+    except TimeoutError:
+        raise ParseError(f"Parsing {path} timed out after {timeout}s") from None
+    except MemoryError:
+        raise ParseError(f"Parsing {path} exceeded {memory_mb} MB") from None
+    except Exception as e:
+        # Parser exceptions may not survive pickling back to the parent
+        raise ParseError(f"Error parsing {path}: {str(e)}") from None
+    finally:
+        # End of this file's text; always sent before the result
+        _events.put((job_id, None, None))
+
+class ParseStream:
+    """
+    Text of one file as it is parsed
+
+    Iterate to receive text segments as soon as the worker extracts them;
+    `metadata.title` is set once the parser finds it, and `metadata` is
+    completed, or marked failed, when iteration ends. The worker stays at
+    most STREAM_SEGMENTS segments ahead of the reader; close() a stream
+    that won't be read to the end.
+    """
+
+    def __init__(self, metadata: DocumentMetadata, cancel: Callable[[], None], consumed: Callable[[], None]):
+        self.metadata = metadata
+        self._cancel = cancel
+        self._consumed = consumed
+        self._future: Optional['asyncio.Future[Dict[str, Any]]'] = None
+        # Bounded by the worker pausing, not here, so routing never waits
+        self._segments: asyncio.Queue = asyncio.Queue()
+
+    def _attach(self, future: 'asyncio.Future[Dict[str, Any]]') -> None:
+        self._future = future
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: 'asyncio.Future[Dict[str, Any]]') -> None:
+        # If the worker died, no end marker will come
+        if future.cancelled() or future.exception() is not None:
+            self._segments.put_nowait(None)
+
+    def _put(self, segment: Optional[str], title: Optional[str]) -> None:
+        if title:
+            self.metadata.title = title
+        self._segments.put_nowait(segment)
+
+    def close(self) -> None:
+        """Stop parsing and drop the text not yet read"""
+        self._cancel()
+        if self._future is not None:
+            self._future.cancel()
+        while not self._segments.empty():
+            self._segments.get_nowait()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        try:
+            while True:
+                segment = await self._segments.get()
+                if segment is None:
+                    break
+                self._consumed()
+                yield segment
+            info = await self._future
+        except Exception as e:
+            self.metadata.update_status(ProcessingStatus.FAILED, str(e))
+            raise ParseError(str(e)) from e
+        if info.get('title'):
+            self.metadata.title = info['title']
+        self.metadata.metadata.update(info)
+        self.metadata.update_status(ProcessingStatus.COMPLETED)
+
+class DocumentParser:
+    """
+    Parses documents in a pool of worker processes
+
+    Parsing is CPU-bound, so it runs outside the event loop, one process
+    per available core by default. Each file is read through a memory map,
+    gets its own timeout and memory cap, and streams its text back in
+    segments, so callers can chunk and embed while large files are still
+    being parsed. A worker that crashes is replaced on the next file.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.PARSE_WORKERS,
+        timeout: float = settings.PARSE_TIMEOUT_SECONDS,
+        memory_mb: int = settings.PARSE_MEMORY_MB
+    ):
+        """
+        Initialize the parser; workers start on the first file
+        Args:
+            workers: Worker processes; 0 uses every available core
+            timeout: Seconds one file may take; 0 disables
+            memory_mb: Memory one file may allocate; 0 disables
+        """
+        self.workers = workers or available_cores()
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        # Spawned workers don't inherit the event loop or its threads
+        self._context = multiprocessing.get_context('spawn')
+        self._events = self._context.Queue()
+        self._cancelled = self._context.Array('q', [-1] * JOB_SLOTS, lock=False)
+        # Segments read per job; only the event loop writes them
+        self._consumed = self._context.Array('q', [0] * JOB_SLOTS, lock=False)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._streams: Dict[int, ParseStream] = {}
+        self._ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+
+    async def __aenter__(self) -> 'DocumentParser':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def _start(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self._events, self._cancelled, self._consumed)
+            )
+        if self._reader is None:
+            self._loop = asyncio.get_running_loop()
+            self._reader = threading.Thread(target=self._read_events, name='parse-events', daemon=True)
+            self._reader.start()
+        return self._executor
+
+    def _read_events(self) -> None:
+        """Route text segments from the workers to their streams"""
+        while True:
+            try:
+                event = self._events.get()
+            except (EOFError, OSError):
+                return
+            if event is None:
+                return
+            job_id, segment, title = event
+            # The end marker is the last event of a file
+            stream = self._streams.pop(job_id, None) if segment is None else self._streams.get(job_id)
+            if stream is None:
+                continue
+            try:
+                # Never waits: backpressure pauses each job's worker instead
+                self._loop.call_soon_threadsafe(stream._put, segment, title)
+            except RuntimeError:
+                # The event loop has closed
+                return
+
+    def parse(
+        self,
+        path: str,
+        user_id: Optional[str] = None,
+        workspace_id: Optional[str] = None,
+        permissions: Optional[Dict[str, Any]] = None
+    ) -> ParseStream:
+        """
+        Start parsing a file
+        Args:
+            path: File to parse
+            user_id: Owner of the document
+            workspace_id: Workspace the document belongs to
+            permissions: Document permissions, see DocumentMetadata.acl
+        Returns:
+            Stream of the file's text and its metadata
+        Raises:
+            ParseError: If the file type is not supported
+        """
+        file_type = file_type_for(path)
+        if file_type is None:
+            raise ParseError(f"Unsupported file type: {path}")
+        source = os.path.abspath(path)
+        stat = os.stat(source)
+        now = datetime.utcnow()
+        metadata = DocumentMetadata(
+            id=hashlib.sha1(source.encode('utf-8')).hexdigest(),
+            title=os.path.basename(source),
+            source=source,
+            file_type=file_type,
+            file_size=stat.st_size,
+            created_at=datetime.utcfromtimestamp(stat.st_mtime),
+            updated_at=now,
+            processed_at=None,
+            status=ProcessingStatus.PROCESSING,
+            chunk_count=None,
+            embedding_model=None,
+            error=None,
+            user_id=user_id,
+            workspace_id=workspace_id,
+            permissions=permissions or {}
+        )
+
+        # Registered first, so no segment arrives before its stream exists
+        job_id = next(self._ids)
+        self._consumed[job_id % JOB_SLOTS] = 0
+        stream = self._streams[job_id] = ParseStream(
+            metadata, lambda: self._cancel(job_id), lambda: self._consume(job_id)
+        )
+        args = (_parse_file, job_id, source, file_type, self.timeout, self.memory_mb)
+        try:
+            try:
+                future = self._start().submit(*args)
+            except BrokenProcessPool:
+                logger.warning("A parser worker died; restarting the pool")
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                future = self._start().submit(*args)
+        except Exception:
+            self._streams.pop(job_id, None)
+            raise
+        stream._attach(asyncio.wrap_future(future))
+        return stream
+
+    def _cancel(self, job_id: int) -> None:
+        """Stop routing a job's text and tell its worker to stop parsing"""
+        self._streams.pop(job_id, None)
+        self._cancelled[job_id % JOB_SLOTS] = job_id
+
+    def _consume(self, job_id: int) -> None:
+        """Count a segment read, letting the job's worker send another"""
+        self._consumed[job_id % JOB_SLOTS] += 1
+
+    async def close(self) -> None:
+        """Stop the workers and the event reader"""
+        if self._executor is not None:
+            await asyncio.to_thread(self._executor.shutdown)
+            self._executor = None
+        if self._reader is not None:
+            self._events.put(None)
+            await asyncio.to_thread(self._reader.join)
+            self._reader = None
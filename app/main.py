@@ -1,23 +1,24 @@
 # app/main.py
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import logging
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from typing import Optional
+import asyncio
+import hmac
+import threading
 import time
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .config import get_settings
 from .slack import SlackBot
-from .utils import setup_logger
+from .slack.handlers import build_command_data
+from .cache import get_shared_cache
+from .utils import setup_logger, shutdown_logging, bind_request_context, Warmup, get_metrics
+from .utils.diagnostics import MemoryTracer, collapse, measure_loop_lag, sample_stacks, task_summary
+from .utils.usage import DIMENSIONS, get_usage_tracker
 from .models import Message, MessageType
 
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
-# Initialize settings and logger
+# Initialize settings and logger; records are written by a background thread
 settings = get_settings()
 logger = setup_logger(__name__)
 
@@ -37,18 +38,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tag every log record of a request with its request and trace IDs"""
+    trace_header = request.headers.get("x-cloud-trace-context") or request.headers.get("traceparent")
+    request_id = bind_request_context(
+        request_id=request.headers.get("x-request-id"),
+        trace_id=trace_header.split("/")[0] if trace_header else None
+    )
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Initialize Slack bot
 slack_bot = SlackBot()
 
+# Warmup steps run before the service reports ready
+warmup = Warmup(step_timeout=settings.WARMUP_STEP_TIMEOUT, retry_interval=settings.WARMUP_RETRY_INTERVAL)
+rag_engine = slack_bot.message_handler.chat_engine.rag_engine
+warmup.add_step("slack", slack_bot.warmup)
+# No question can be answered without these, so /ready waits for them
+warmup.add_step("vector_store", rag_engine.vector_store.warmup, required=True)
+warmup.add_step("llm", rag_engine.warmup, required=True)
+warmup.add_step("firestore", slack_bot.message_handler.conversation_store.warmup)
+if rag_engine.permission_index is not None:
+    warmup.add_step("permissions", rag_engine.permission_index.refresh)
+if rag_engine.faq_index is not None:
+    warmup.add_step("faq", rag_engine.faq_index.refresh)
+warmup.add_step("cache", lambda: asyncio.to_thread(
+    get_shared_cache().preload,
+    ["answers", "embeddings"],
+    settings.WARMUP_PRELOAD_ENTRIES
+))
+startup_tasks = set()
+
+async def warm_up_and_serve():
+    """Warm up, then start receiving Socket Mode traffic"""
+    if settings.WARMUP_ENABLED:
+        await warmup.run()
+    else:
+        warmup.mark_ready()
+    get_usage_tracker().start()
+    if rag_engine.permission_index is not None:
+        rag_engine.permission_index.start()
+    if settings.SLACK_SOCKET_MODE:
+        await slack_bot.start_socket_mode()
+
+def startup_task_done(task: asyncio.Task) -> None:
+    """Forget a finished startup task, logging why it failed"""
+    startup_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Startup task failed", exc_info=task.exception())
+
 @app.on_event("startup")
 async def startup():
     """Startup tasks"""
     logger.info("Starting Slack AI Assistant")
+    # Run in the background so liveness checks pass while warming up
+    task = asyncio.create_task(warm_up_and_serve())
+    startup_tasks.add(task)
+    task.add_done_callback(startup_task_done)
 
 @app.on_event("shutdown")
 async def shutdown():
     """Shutdown tasks"""
     logger.info("Shutting down Slack AI Assistant")
+    await slack_bot.stop_socket_mode()
+    if rag_engine.permission_index is not None:
+        await rag_engine.permission_index.stop()
+    memory_tracer.stop()
+    await get_usage_tracker().stop()
+    shutdown_logging()
 
 # Health check endpoint
 @app.get("/health")
@@ -59,6 +119,103 @@ async def health_check():
         "version": "0.1.0"
     }
 
+# Readiness endpoint; fails until warmup has finished
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check endpoint"""
+    report = warmup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+# Prometheus metrics of this worker process
+@app.get("/metrics")
+async def metrics():
+    """Metrics endpoint"""
+    return PlainTextResponse(
+        get_metrics().render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+# Diagnostics; nothing runs until an endpoint is called
+memory_tracer = MemoryTracer(settings.MEMORY_TRACE_MAX_SECONDS)
+
+def require_admin(request: Request) -> None:
+    """Allow only requests bearing ADMIN_TOKEN; the endpoints don't exist without one"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(10.0, ge=1),
+    include_idle: bool = False,
+    format: str = Query("collapsed", pattern="^(collapsed|json)$")
+):
+    """Sample the stacks of the event loop and worker threads for a while"""
+    seconds = min(seconds, settings.PROFILE_MAX_SECONDS)
+    try:
+        stacks, samples = await asyncio.to_thread(
+            sample_stacks, seconds, interval_ms / 1000, include_idle, threading.get_ident()
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "json":
+        return {"seconds": seconds, "samples": samples, "stacks": dict(stacks.most_common())}
+    return PlainTextResponse(collapse(stacks))
+
+@app.post("/admin/memory/start", dependencies=[Depends(require_admin)])
+async def admin_memory_start(frames: int = Query(1, ge=1, le=50)):
+    """Start tracing allocations and take the baseline snapshot"""
+    return await memory_tracer.start(frames)
+
+@app.get("/admin/memory/diff", dependencies=[Depends(require_admin)])
+async def admin_memory_diff(
+    limit: int = Query(25, ge=1, le=500),
+    key: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    rebase: bool = False
+):
+    """Top allocation sites by growth since the baseline"""
+    try:
+        return await memory_tracer.diff(limit, key, rebase)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/memory/stop", dependencies=[Depends(require_admin)])
+async def admin_memory_stop():
+    """Stop tracing allocations"""
+    return memory_tracer.stop()
+
+@app.get("/admin/loop", dependencies=[Depends(require_admin)])
+async def admin_loop(
+    samples: int = Query(50, ge=1, le=1000),
+    tasks: int = Query(20, ge=0, le=500),
+    stack_depth: int = Query(0, ge=0, le=50)
+):
+    """Event loop lag and the outstanding asyncio tasks, grouped by coroutine"""
+    return {
+        "lag": await measure_loop_lag(samples),
+        "tasks": task_summary(tasks, stack_depth)
+    }
+
+@app.get("/admin/usage", dependencies=[Depends(require_admin)])
+async def admin_usage(
+    since: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}(T\d{2})?$"),
+    group_by: str = "user_id,channel_id,model"
+):
+    """
+    Token usage, wall time and cost, grouped by any of hour, user_id,
+    channel_id and model; from the start of today (UTC) by default
+    """
+    dimensions = [dimension.strip() for dimension in group_by.split(",") if dimension.strip()]
+    unknown = set(dimensions) - set(DIMENSIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dimensions: {', '.join(sorted(unknown))}")
+    since = since or time.strftime("%Y-%m-%dT00", time.gmtime())
+    rows = await get_usage_tracker().query(since, dimensions)
+    return {"since": since, "group_by": dimensions, "rows": rows}
+
 # Slack endpoints
 @app.post("/slack/events")
 async def endpoint_slack_events(request: Request):
@@ -66,7 +223,7 @@ async def endpoint_slack_events(request: Request):
     try:
         return await slack_bot.handler.handle(request)
     except Exception as e:
-        logger.error(f"Error handling event: {str(e)}")
+        logger.error("Error handling event: %s", e)
         return JSONResponse(
             status_code=500,
             content={"error": "Internal server error"}
@@ -95,15 +252,7 @@ async def endpoint_slack_commands(request: Request):
                 "text": "Processing your request..."
             })
 
-        command_data = {
-            "command": command,
-            "text": form_data.get("text"),
-            "user_id": form_data.get("user_id"),
-            "channel_id": form_data.get("channel_id"),
-            "command_ts": str(time.time()),
-            "say": say,
-            "ack": ack
-        }
+        command_data = build_command_data(form_data, say, ack)
 
         if command == "/ask":
             return await slack_bot.command_handler.handle_ask(command_data)
@@ -114,7 +263,7 @@ async def endpoint_slack_commands(request: Request):
         })
 
     except Exception as e:
-        logger.error(f"Error processing command: {str(e)}")
+        logger.error("Error processing command: %s", e)
         return JSONResponse(
             content={
                 "response_type": "ephemeral",
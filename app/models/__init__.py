@@ -2,6 +2,7 @@
 
 from .user import User, UserSettings
 from .chat import Message, Conversation, MessageType
+from .record import MessageRecord
 from .metadata import DocumentMetadata, ProcessingStatus
 
 __all__ = [
@@ -10,6 +11,7 @@ __all__ = [
     'Message',
     'Conversation',
     'MessageType',
+    'MessageRecord',
     'DocumentMetadata',
     'ProcessingStatus'
 ]
\ No newline at end of file
@@ -1,10 +1,21 @@
 # app/models/metadata.py
 
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
+# ACL principal granting access to everyone in the document's workspace
+PUBLIC_PRINCIPAL = "public"
+
+def user_principal(user_id: str) -> str:
+    """ACL principal of a Slack user"""
+    return f"user:{user_id}"
+
+def group_principal(group_id: str) -> str:
+    """ACL principal of a group"""
+    return f"group:{group_id}"
+
 class ProcessingStatus(str, Enum):
     """Document processing status"""
     PENDING = "pending"
@@ -44,4 +55,37 @@ class DocumentMetadata(BaseModel):
             self.error = error
         self.updated_at = datetime.utcnow()
         if status == ProcessingStatus.COMPLETED:
-            self.processed_at = datetime.utcnow()
\ No newline at end of file
+            self.processed_at = datetime.utcnow()
+
+    def acl(self) -> List[str]:
+        """
+        ACL principals allowed to read the document
+        `permissions` may hold `public` (bool), `users` and `groups` (lists
+        of IDs); the owner can always read their own document.
+        """
+        principals = []
+        if self.permissions.get('public'):
+            principals.append(PUBLIC_PRINCIPAL)
+        if self.user_id:
+            principals.append(user_principal(self.user_id))
+        principals.extend(user_principal(user) for user in self.permissions.get('users', []))
+        principals.extend(group_principal(group) for group in self.permissions.get('groups', []))
+        return sorted(set(principals))
+
+    def to_vector_metadata(self) -> Dict[str, Any]:
+        """
+        Metadata stored with each of the document's vectors
+        Includes the fields retrieval filters on (workspace_id and acl), so
+        shared documents are stored once and filtered per user at query time.
+        """
+        metadata = {
+            'document_id': self.id,
+            'title': self.title,
+            'source': self.source,
+            'file_type': self.file_type,
+            'workspace_id': self.workspace_id,
+            'owner_id': self.user_id,
+            'acl': self.acl()
+        }
+        # Pinecone rejects null metadata values
+        return {key: value for key, value in metadata.items() if value is not None}
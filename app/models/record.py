@@ -0,0 +1,107 @@
+# app/models/record.py
+
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+from datetime import datetime
+
+from .chat import Message, MessageType
+
+_NO_METADATA: Mapping[str, Any] = MappingProxyType({})
+
+def _to_epoch(value: Any) -> float:
+    """Convert a Slack ts, datetime or number to epoch seconds"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+class MessageRecord(NamedTuple):
+    """
+    Internal message representation used on the request path
+
+    A named tuple is immutable and has no per-instance __dict__, and
+    building one does no validation. Use `Message` (pydantic) at external
+    boundaries only; convert with `from_model` / `to_model`.
+    """
+    id: str
+    channel_id: str
+    user_id: str
+    thread_ts: Optional[str]
+    message_type: str
+    content: str
+    timestamp: float = 0.0  # Epoch seconds
+    metadata: Mapping[str, Any] = _NO_METADATA
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'MessageRecord':
+        """
+        Build a record from a stored message without validation
+        Args:
+            data: Message dict, e.g. a Firestore history row
+        Returns:
+            Message record
+        """
+        return cls(
+            data.get('id', ''),
+            data.get('channel_id', ''),
+            data.get('user_id', ''),
+            data.get('thread_ts'),
+            data.get('message_type', MessageType.USER.value),
+            data.get('content', ''),
+            _to_epoch(data.get('timestamp')),
+            data.get('metadata') or _NO_METADATA
+        )
+
+    @classmethod
+    def from_event(cls, event: Mapping[str, Any]) -> 'MessageRecord':
+        """
+        Build a user message record from a Slack message event
+        Args:
+            event: Slack event payload
+        Returns:
+            Message record
+        """
+        return cls(
+            event['ts'],
+            event['channel'],
+            event['user'],
+            event.get('thread_ts'),
+            MessageType.USER.value,
+            event['text'],
+            _to_epoch(event['ts'])
+        )
+
+    @classmethod
+    def from_model(cls, message: Message) -> 'MessageRecord':
+        """Convert a validated message model"""
+        return cls(
+            message.id,
+            message.channel_id,
+            message.user_id,
+            message.thread_ts,
+            message.message_type.value,
+            message.content,
+            message.timestamp.timestamp(),
+            message.metadata or _NO_METADATA
+        )
+
+    def to_model(self) -> Message:
+        """Validate into a message model, for use at external boundaries"""
+        return Message(
+            id=self.id,
+            channel_id=self.channel_id,
+            user_id=self.user_id,
+            thread_ts=self.thread_ts,
+            message_type=self.message_type,
+            content=self.content,
+            timestamp=datetime.fromtimestamp(self.timestamp),
+            metadata=dict(self.metadata)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict of the record"""
+        data = self._asdict()
+        data['metadata'] = dict(self.metadata)
+        return data
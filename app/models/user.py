@@ -1,13 +1,14 @@
 # app/models/user.py
 
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class UserSettings(BaseModel):
     """User settings and preferences"""
-    max_context_length: int = 5
-    response_temperature: float = 0.7
+    # None uses the service default
+    max_context_length: Optional[int] = Field(None, ge=1, le=20)  # Most document chunks per answer
+    response_temperature: Optional[float] = Field(None, ge=0.0, le=2.0)
     thread_enabled: bool = True
     notification_enabled: bool = True
 
@@ -18,6 +19,7 @@ class User(BaseModel):
     email: Optional[EmailStr] = None
     settings: UserSettings = UserSettings()
     workspace_id: str
+    groups: List[str] = []  # Group IDs used in document ACLs
     created_at: datetime
     updated_at: datetime
     metadata: Dict[str, Any] = {}
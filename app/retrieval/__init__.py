@@ -3,9 +3,11 @@
 from .rag_engine import RAGEngine
 from .chat import ChatEngine
 from .context import ContextManager
+from .faq import FAQIndex
 
 __all__ = [
     'RAGEngine',
     'ChatEngine',
-    'ContextManager'
+    'ContextManager',
+    'FAQIndex'
 ]
\ No newline at end of file
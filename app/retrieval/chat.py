@@ -5,7 +5,9 @@ from langchain_openai import ChatOpenAI
 import logging
 
 from ..config import get_settings
-from ..models import Message, MessageType
+from ..models import MessageRecord, MessageType
+from ..utils.deadline import DeadlineExceeded
+from ..utils.usage import get_usage_tracker
 from .rag_engine import RAGEngine
 
 logger = logging.getLogger(__name__)
@@ -23,9 +25,9 @@ class ChatEngine:
 
     async def process_message(
         self,
-        message: Message,
-        conversation_history: Optional[List[Message]] = None
-    ) -> Message:
+        message: MessageRecord,
+        conversation_history: Optional[List[MessageRecord]] = None
+    ) -> MessageRecord:
         """
         Process a message and generate response
         Args:
@@ -35,20 +37,22 @@ class ChatEngine:
             Response message
         """
         try:
-            # Get RAG response
-            response_data = await self.rag_engine.get_response(
-                question=message.content,
-                conversation_history=conversation_history,
-                user_id=message.user_id
-            )
+            # Tokens and wall time are accounted to the user and channel
+            with get_usage_tracker().track(message.user_id, message.channel_id) as usage:
+                response_data = await self.rag_engine.get_response(
+                    question=message.content,
+                    conversation_history=conversation_history,
+                    user_id=message.user_id
+                )
+                usage.model = "faq" if response_data.get("faq_id") else (response_data["model_used"] or "fallback")
             
             # Create response message
-            response_message = Message(
+            response_message = MessageRecord(
                 id=f"resp_{message.id}",
                 channel_id=message.channel_id,
                 user_id="BOT",  # Bot's user ID
                 thread_ts=message.thread_ts,
-                message_type=MessageType.ASSISTANT,
+                message_type=MessageType.ASSISTANT.value,
                 content=response_data["response"],
                 timestamp=message.timestamp,
                 metadata={
@@ -59,15 +63,17 @@ class ChatEngine:
             
             return response_message
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Error processing message: {str(e)}")
+            logger.error("Error processing message: %s", e)
             # Return error message
-            return Message(
+            return MessageRecord(
                 id=f"error_{message.id}",
                 channel_id=message.channel_id,
                 user_id="BOT",
                 thread_ts=message.thread_ts,
-                message_type=MessageType.ERROR,
-                content=f"Sorry, I encountered an error: {str(e)}",
+                message_type=MessageType.ERROR.value,
+                content="Sorry, I encountered an error processing your question.",
                 timestamp=message.timestamp
             )
\ No newline at end of file
@@ -1,10 +1,11 @@
 # app/retrieval/context.py
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence
 from datetime import datetime
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 import logging
 
-from ..models import Message
+from ..models import MessageRecord, MessageType
 from ..config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,7 @@ class ContextManager:
     
     def format_conversation_history(
         self,
-        messages: List[Message],
+        messages: Sequence[MessageRecord],
         max_messages: int = None
     ) -> str:
         """
@@ -33,19 +34,41 @@ class ContextManager:
         recent_messages = messages[-max_messages:]
         
         # Format messages
-        formatted_messages = []
-        for msg in recent_messages:
-            role = "Human" if msg.message_type == "user" else "Assistant"
-            formatted_messages.append(f"{role}: {msg.content}")
-            
-        return "\n".join(formatted_messages)
+        user = MessageType.USER.value
+        return "\n".join([
+            f"{'Human' if msg.message_type == user else 'Assistant'}: {msg.content}"
+            for msg in recent_messages
+        ])
+
+    def to_chat_messages(
+        self,
+        messages: Sequence[MessageRecord],
+        max_messages: int = None
+    ) -> List[BaseMessage]:
+        """
+        Convert conversation history to chat messages for the prompt
+        Args:
+            messages: List of messages
+            max_messages: Maximum number of messages to include
+        Returns:
+            Human and AI messages, oldest first
+        """
+        if not max_messages:
+            max_messages = settings.MAX_HISTORY_MESSAGES
+
+        user = MessageType.USER.value
+        return [
+            HumanMessage(content=msg.content) if msg.message_type == user
+            else AIMessage(content=msg.content)
+            for msg in messages[-max_messages:]
+        ]
 
     def get_relevant_window(
         self,
-        messages: List[Message],
+        messages: Sequence[MessageRecord],
         current_time: datetime,
         window_minutes: int = 30
-    ) -> List[Message]:
+    ) -> List[MessageRecord]:
         """
         Get messages within a time window
         Args:
@@ -55,12 +78,9 @@ class ContextManager:
         Returns:
             List of messages within the window
         """
-        relevant_messages = []
-        for msg in messages:
-            time_diff = (current_time - msg.timestamp).total_seconds() / 60
-            if time_diff <= window_minutes:
-                relevant_messages.append(msg)
-        return relevant_messages
+        # Record timestamps are epoch seconds
+        cutoff = current_time.timestamp() - window_minutes * 60
+        return [msg for msg in messages if msg.timestamp >= cutoff]
 
     def merge_contexts(
         self,
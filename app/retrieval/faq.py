@@ -0,0 +1,273 @@
+# app/retrieval/faq.py
+
+from google.cloud import firestore
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+FAQ_COLLECTION = 'faq_answers'
+
+# Rows of the similarity matrix computed at once during clustering
+_CHUNK_ROWS = 4096
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, so dot products are cosine similarities"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _best(vectors: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest centroid of every vector and its similarity, a slab at a time"""
+    labels = np.empty(len(vectors), dtype=np.int64)
+    sims = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), _CHUNK_ROWS):
+        scores = vectors[start:start + _CHUNK_ROWS] @ centroids.T
+        labels[start:start + _CHUNK_ROWS] = scores.argmax(axis=1)
+        sims[start:start + _CHUNK_ROWS] = scores.max(axis=1)
+    return labels, sims
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    weights: np.ndarray,
+    k: int,
+    iterations: int = 25,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Weighted k-means on the unit sphere (cosine similarity)
+    Seeded with k-means++; every step is a matrix product over all vectors.
+    Args:
+        vectors: Unit-length vectors, one per row
+        weights: Weight of each vector, e.g. how often a question was asked
+        k: Number of clusters, capped at the number of vectors
+        iterations: Most assignment and update rounds
+        seed: Random seed, for reproducible clusters
+    Returns:
+        Unit-length centroids, the cluster of each vector and its
+        similarity to that cluster's centroid
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    weights = np.asarray(weights, dtype=np.float64)
+    k = min(k, len(vectors))
+    rng = np.random.default_rng(seed)
+
+    centroids = np.empty((k, vectors.shape[1]), dtype=np.float32)
+    centroids[0] = vectors[rng.choice(len(vectors), p=weights / weights.sum())]
+    distance = np.maximum(1.0 - vectors @ centroids[0], 0.0)
+    for i in range(1, k):
+        p = weights * distance ** 2
+        total = p.sum()
+        index = rng.choice(len(vectors), p=p / total) if total > 0 else rng.integers(len(vectors))
+        centroids[i] = vectors[index]
+        distance = np.minimum(distance, np.maximum(1.0 - vectors @ centroids[i], 0.0))
+
+    weighted = vectors * weights[:, None].astype(np.float32)
+    labels = np.full(len(vectors), -1, dtype=np.int64)
+    for _ in range(iterations):
+        new_labels, sims = _best(vectors, centroids)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        # Sum each cluster's members in one pass over the sorted rows;
+        # empty clusters keep their previous centroid
+        order = np.argsort(labels, kind='stable')
+        sorted_labels = labels[order]
+        starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+        sums = np.add.reduceat(weighted[order], starts, axis=0)
+        centroids[sorted_labels[starts]] = normalize_rows(sums)
+    labels, sims = _best(vectors, centroids)
+    return centroids, labels, sims
+
+class FAQCluster(NamedTuple):
+    """A frequent question: its members near the centroid and how often they were asked"""
+    centroid: np.ndarray
+    count: int  # Askings close enough to the centroid to be answered by it
+    members: List[int]  # Indexes of those questions, most asked first
+
+def frequent_clusters(
+    centroids: np.ndarray,
+    labels: np.ndarray,
+    sims: np.ndarray,
+    weights: np.ndarray,
+    threshold: float,
+    top: int,
+    min_count: int
+) -> List[FAQCluster]:
+    """
+    Most asked clusters, counting only questions a lookup would match
+    Args:
+        centroids: Cluster centroids from spherical_kmeans
+        labels: Cluster of each question
+        sims: Similarity of each question to its centroid
+        weights: Times each question was asked
+        threshold: Similarity a question needs to be served from its centroid
+        top: Most clusters to return
+        min_count: Fewest matching askings a cluster needs
+    Returns:
+        Clusters, most asked first
+    """
+    covered = sims >= threshold
+    counts = np.bincount(labels[covered], weights=weights[covered], minlength=len(centroids))
+    clusters = []
+    for cluster in np.argsort(-counts, kind='stable'):
+        if len(clusters) >= top or counts[cluster] < min_count:
+            break
+        members = np.flatnonzero(covered & (labels == cluster))
+        members = members[np.lexsort((-sims[members], -weights[members]))]
+        clusters.append(FAQCluster(centroids[cluster], int(counts[cluster]), members.tolist()))
+    return clusters
+
+class FAQEntry(NamedTuple):
+    """A precomputed answer, served for questions close to its centroid"""
+    id: str
+    question: str
+    answer: str
+    context: str
+    model: str
+    namespace: str
+    workspace_id: Optional[str]
+    index_version: int  # Index version of the namespace the answer was generated from
+    generated_at: float  # Epoch seconds
+
+    @classmethod
+    def from_dict(cls, entry_id: str, data: Dict[str, Any]) -> 'FAQEntry':
+        """Build an entry from a stored document"""
+        generated_at = data.get('generated_at')
+        return cls(
+            entry_id,
+            data.get('question', ''),
+            data.get('answer', ''),
+            data.get('context', ''),
+            data.get('model', ''),
+            data.get('namespace', settings.SHARED_NAMESPACE),
+            data.get('workspace_id'),
+            int(data.get('index_version') or 0),
+            generated_at.timestamp() if isinstance(generated_at, datetime) else float(generated_at or 0)
+        )
+
+    def expired(self, index_version: Optional[int]) -> bool:
+        """
+        Whether the answer may no longer be served
+        Args:
+            index_version: Current version of the entry's namespace, None if unknown
+        Returns:
+            True if the namespace changed since the answer was generated, its
+            version can't be read, or the answer is older than FAQ_MAX_AGE_SECONDS
+        """
+        return (
+            index_version is None
+            or index_version != self.index_version
+            or time.time() - self.generated_at > settings.FAQ_MAX_AGE_SECONDS
+        )
+
+class FAQIndex:
+    """
+    In-memory centroids of the approved precomputed answers
+
+    Loaded from the `faq_answers` collection, which the offline job
+    (`python -m app.retrieval.faq_job`) fills. A lookup is one matrix-vector
+    product against the centroids. The index reloads itself in the
+    background once it is older than the refresh interval, so processes
+    that never call refresh() still pick up new answers.
+    """
+
+    def __init__(
+        self,
+        threshold: float = settings.FAQ_MATCH_THRESHOLD,
+        refresh_interval: float = settings.FAQ_REFRESH_SECONDS
+    ):
+        """
+        Initialize the index
+        Args:
+            threshold: Similarity a question needs to its nearest centroid
+            refresh_interval: Seconds between reloads from Firestore
+        """
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self._entries: List[FAQEntry] = []
+        self._centroids = np.zeros((0, 0), dtype=np.float32)
+        self._loaded_at: Optional[float] = None
+        self._db: Optional[firestore.Client] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, entries: Iterable[Tuple[FAQEntry, Sequence[float]]]) -> None:
+        """
+        Replace the index contents
+        Args:
+            entries: Entries and their centroids
+        """
+        pairs = [(entry, centroid) for entry, centroid in entries if len(centroid)]
+        centroids = np.asarray([centroid for _, centroid in pairs], dtype=np.float32)
+        # Swap both together so concurrent lookups never see a partial index
+        self._entries, self._centroids = (
+            [entry for entry, _ in pairs],
+            normalize_rows(centroids) if pairs else np.zeros((0, 0), dtype=np.float32)
+        )
+        self._loaded_at = time.monotonic()
+
+    async def refresh(self) -> int:
+        """
+        Reload the approved answers from Firestore
+        Returns:
+            Number of answers indexed
+        """
+        if self._db is None:
+            self._db = firestore.Client(project=settings.PROJECT_ID)
+        query = self._db.collection(FAQ_COLLECTION).where('approved', '==', True)
+        docs = await asyncio.to_thread(query.get)
+        self.load(
+            (FAQEntry.from_dict(doc.id, data), data.get('centroid') or [])
+            for doc, data in ((doc, doc.to_dict()) for doc in docs)
+        )
+        logger.info("FAQ index loaded with %s answers", len(self._entries))
+        return len(self._entries)
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Retried after another interval rather than on every lookup
+            self._loaded_at = time.monotonic()
+            logger.error("Error refreshing FAQ index: %s", e)
+        finally:
+            self._task = None
+
+    def _maybe_refresh(self) -> None:
+        """Start a reload if the index is due and none is running"""
+        due = self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval
+        if due and self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._refresh_in_background())
+
+    def ready(self) -> bool:
+        """Whether lookups can match; schedules a reload when one is due"""
+        self._maybe_refresh()
+        return bool(self._entries)
+
+    def match(self, vector: Sequence[float]) -> Optional[Tuple[FAQEntry, float]]:
+        """
+        Nearest precomputed answer to a question
+        Args:
+            vector: Embedding of the question
+        Returns:
+            The entry and its similarity, or None if no centroid is close enough
+        """
+        entries, centroids = self._entries, self._centroids
+        query = np.asarray(vector, dtype=np.float32)
+        if not entries or centroids.shape[1] != len(query):
+            return None
+        scores = centroids @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        best = int(scores.argmax())
+        if scores[best] < self.threshold:
+            return None
+        return entries[best], float(scores[best])
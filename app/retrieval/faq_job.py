@@ -0,0 +1,329 @@
+# app/retrieval/faq_job.py
+
+"""
+Precompute answers to the most frequently asked questions.
+
+`build` reads every user message from the conversation store, embeds the
+distinct questions and clusters them with spherical k-means. The `--top`
+clusters asked most often get a canonical answer, generated at temperature
+0 from the shared namespace. Only askings within FAQ_MATCH_THRESHOLD of a
+centroid count towards its frequency, since only those would be served. A
+second model call checks each answer against its context. Answers that pass
+are approved unless FAQ_REQUIRE_APPROVAL is set; the rest are kept for
+review. Every answer records the index version it was generated from and
+is no longer served once that version changes.
+
+`refresh` regenerates the answers whose index version changed or that are
+older than FAQ_MAX_AGE_SECONDS, keeping their clusters; run it after
+ingesting documents. `list` shows the stored answers, and `approve` and
+`reject` vet them by hand.
+
+    python -m app.retrieval.faq_job build --top 100
+    python -m app.retrieval.faq_job refresh
+    python -m app.retrieval.faq_job approve 3f2a9c0e5b1d4a77
+"""
+
+from collections import Counter
+from datetime import datetime, timezone
+from google.cloud import firestore
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import hashlib
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ..config import get_settings
+from ..database import AccessFilter, ConversationStore, NamespaceSearch
+from ..models import MessageType
+from ..models.metadata import PUBLIC_PRINCIPAL
+from ..utils import setup_logger, shutdown_logging
+from ..utils.helpers import normalize_query
+from .faq import FAQ_COLLECTION, FAQEntry, frequent_clusters, normalize_rows, spherical_kmeans
+from .rag_engine import RAGEngine
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+# Questions embedded per request
+EMBED_BATCH = 256
+# Example phrasings stored with each answer, for review
+EXAMPLES_KEPT = 5
+
+VET_PROMPT = (
+    "Context:\n{context}\n\n"
+    "Question: {question}\n\n"
+    "Answer: {answer}\n\n"
+    "Does the answer address the question using only facts stated in the "
+    "context? Reply with YES or NO only."
+)
+
+def entry_id(question: str, workspace_id: Optional[str] = None) -> str:
+    """Stable document ID of the answer to a question"""
+    return hashlib.sha256(f"{workspace_id or ''}:{normalize_query(question)}".encode()).hexdigest()[:16]
+
+def faq_search(workspace_id: Optional[str] = None) -> NamespaceSearch:
+    """
+    Where canonical answers are retrieved from: the shared namespace and,
+    with ACL filtering, only documents public in the workspace, since the
+    answer is served to everyone in it
+    """
+    metadata_filter = None
+    if settings.ACL_FILTERING_ENABLED:
+        metadata_filter = AccessFilter(workspace_id, frozenset([PUBLIC_PRINCIPAL])).to_metadata_filter()
+    return NamespaceSearch(
+        namespace=settings.SHARED_NAMESPACE,
+        filter=metadata_filter,
+        threshold=settings.NAMESPACE_THRESHOLDS.get(settings.SHARED_NAMESPACE)
+    )
+
+async def collect_questions(
+    store: ConversationStore,
+    min_words: int,
+    max_questions: int
+) -> List[Tuple[str, int]]:
+    """
+    Distinct user questions and how often each was asked
+    Args:
+        store: Conversation store to read from
+        min_words: Shorter messages (greetings, follow-ups) are skipped
+        max_questions: Most distinct questions kept, most asked first
+    Returns:
+        The first phrasing seen of each question and its count
+    """
+    counts: Counter = Counter()
+    phrasing: Dict[str, str] = {}
+    read = 0
+    async for page in store.iter_messages():
+        for doc in page:
+            data = doc.to_dict() or {}
+            read += 1
+            if data.get('message_type') != MessageType.USER.value:
+                continue
+            content = (data.get('content') or '').strip()
+            key = normalize_query(content)
+            if len(key.split()) < min_words:
+                continue
+            counts[key] += 1
+            phrasing.setdefault(key, content)
+    logger.info("Read %s messages, %s distinct questions", read, len(counts))
+    return [(phrasing[key], count) for key, count in counts.most_common(max_questions)]
+
+async def embed_questions(embeddings: Embeddings, questions: List[str]) -> np.ndarray:
+    """Unit-length embeddings of the questions, one per row"""
+    vectors: List[List[float]] = []
+    for start in range(0, len(questions), EMBED_BATCH):
+        vectors.extend(await embeddings.aembed_documents(questions[start:start + EMBED_BATCH]))
+    return normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+async def vet_answer(engine: RAGEngine, question: str, answer: Dict[str, Any]) -> bool:
+    """Whether the model judges the answer grounded in its context"""
+    verdict = await engine.llm.bind(temperature=0.0).ainvoke(VET_PROMPT.format(
+        context=answer["context_used"],
+        question=question,
+        answer=answer["response"]
+    ))
+    return str(verdict.content).strip().upper().startswith("YES")
+
+async def generate_answer(
+    engine: RAGEngine,
+    question: str,
+    workspace_id: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    Canonical answer fields for a question
+    Returns:
+        Stored fields of the answer, or None if the documents don't cover it
+    """
+    search = faq_search(workspace_id)
+    # Read first, so documents changing during generation expire the answer
+    version = await engine.vector_store.index_version(search.namespace)
+    if version is None:
+        raise RuntimeError(f"index version of namespace {search.namespace} is unavailable")
+    answer = await engine.canonical_answer(question, [search])
+    if answer is None:
+        logger.info("No context found for %r; not precomputed", question)
+        return None
+    vetted = await vet_answer(engine, question, answer)
+    return {
+        'question': question,
+        'answer': answer["response"],
+        'context': answer["context_used"],
+        'model': answer["model_used"],
+        'namespace': search.namespace,
+        'workspace_id': workspace_id,
+        'index_version': version,
+        'generated_at': datetime.now(timezone.utc),
+        'vetted': vetted,
+        'approved': vetted and not settings.FAQ_REQUIRE_APPROVAL
+    }
+
+async def _bounded(concurrency: int, jobs: List[Any]) -> List[Any]:
+    """Run coroutines with at most `concurrency` at once"""
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(job: Any) -> Any:
+        async with slots:
+            return await job
+
+    return await asyncio.gather(*(run(job) for job in jobs))
+
+async def _commit(
+    db: firestore.Client,
+    writes: List[Tuple[str, Optional[Dict[str, Any]]]],
+    merge: bool = False
+) -> None:
+    """Set or (with None) delete answer documents in batched writes"""
+    collection = db.collection(FAQ_COLLECTION)
+    for start in range(0, len(writes), 500):
+        batch = db.batch()
+        for doc_id, data in writes[start:start + 500]:
+            if data is None:
+                batch.delete(collection.document(doc_id))
+            else:
+                batch.set(collection.document(doc_id), data, merge=merge)
+        await asyncio.to_thread(batch.commit)
+
+async def build(
+    top: int,
+    min_count: int,
+    clusters: Optional[int],
+    min_words: int,
+    max_questions: int,
+    workspace_id: Optional[str],
+    concurrency: int
+) -> int:
+    """
+    Cluster the asked questions and precompute answers for the most frequent
+    Returns:
+        Number of answers stored; answers of earlier builds are replaced
+    """
+    engine = RAGEngine()
+    db = firestore.Client(project=settings.PROJECT_ID)
+    questions = await collect_questions(ConversationStore(), min_words, max_questions)
+    if not questions:
+        logger.info("No questions to cluster")
+        return 0
+
+    started = time.perf_counter()
+    texts = [text for text, _ in questions]
+    vectors = await embed_questions(engine.vector_store.embeddings, texts)
+    weights = np.asarray([count for _, count in questions], dtype=np.float64)
+    centroids, labels, sims = spherical_kmeans(vectors, weights, clusters or 4 * top)
+    frequent = frequent_clusters(
+        centroids, labels, sims, weights, settings.FAQ_MATCH_THRESHOLD, top, min_count
+    )
+    logger.info(
+        "Clustered %s questions into %s clusters in %.1fs; %s are frequent",
+        len(texts), len(centroids), time.perf_counter() - started, len(frequent)
+    )
+
+    # The most asked phrasing near the centroid stands for the cluster
+    answers = await _bounded(concurrency, [
+        generate_answer(engine, texts[cluster.members[0]], workspace_id) for cluster in frequent
+    ])
+    writes: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+    for cluster, answer in zip(frequent, answers):
+        if answer is None:
+            continue
+        writes.append((entry_id(answer['question'], workspace_id), {
+            **answer,
+            'centroid': cluster.centroid.tolist(),
+            'count': cluster.count,
+            'examples': [texts[i] for i in cluster.members[:EXAMPLES_KEPT]]
+        }))
+
+    kept = {doc_id for doc_id, _ in writes}
+    existing = await asyncio.to_thread(
+        db.collection(FAQ_COLLECTION).where('workspace_id', '==', workspace_id).select([]).get
+    )
+    writes.extend((doc.id, None) for doc in existing if doc.id not in kept)
+    await _commit(db, writes)
+    approved = sum(1 for _, data in writes if data and data['approved'])
+    logger.info("Stored %s answers, %s approved", len(kept), approved)
+    return len(kept)
+
+async def refresh(concurrency: int) -> int:
+    """
+    Regenerate answers that expired with their index version or age
+    Returns:
+        Number of answers regenerated
+    """
+    engine = RAGEngine()
+    db = firestore.Client(project=settings.PROJECT_ID)
+    docs = await asyncio.to_thread(db.collection(FAQ_COLLECTION).get)
+
+    stale = []
+    for doc in docs:
+        entry = FAQEntry.from_dict(doc.id, doc.to_dict())
+        if entry.expired(await engine.vector_store.index_version(entry.namespace)):
+            stale.append(entry)
+    answers = await _bounded(concurrency, [
+        generate_answer(engine, entry.question, entry.workspace_id) for entry in stale
+    ])
+
+    # Clusters are kept; documents that no longer cover a question drop its answer
+    writes = [(entry.id, answer) for entry, answer in zip(stale, answers)]
+    await _commit(db, writes, merge=True)
+    logger.info("Regenerated %s of %s answers", sum(1 for _, data in writes if data), len(docs))
+    return len(writes)
+
+async def list_answers() -> List[Dict[str, Any]]:
+    """Stored answers, most asked first"""
+    db = firestore.Client(project=settings.PROJECT_ID)
+    docs = await asyncio.to_thread(
+        db.collection(FAQ_COLLECTION).select(
+            ['question', 'count', 'vetted', 'approved', 'index_version', 'generated_at']
+        ).get
+    )
+    rows = [{'id': doc.id, **doc.to_dict()} for doc in docs]
+    return sorted(rows, key=lambda row: -(row.get('count') or 0))
+
+async def set_approved(ids: List[str], approved: bool) -> None:
+    """Approve or reject answers by hand"""
+    db = firestore.Client(project=settings.PROJECT_ID)
+    collection = db.collection(FAQ_COLLECTION)
+    batch = db.batch()
+    for doc_id in ids:
+        batch.update(collection.document(doc_id), {'approved': approved})
+    await asyncio.to_thread(batch.commit)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="Cluster the questions and precompute answers")
+    build_parser.add_argument("--top", type=int, default=100, help="Most answers to precompute")
+    build_parser.add_argument("--min-count", type=int, default=3, help="Fewest askings of a precomputed question")
+    build_parser.add_argument("--clusters", type=int, help="k of k-means (default: 4 x --top)")
+    build_parser.add_argument("--min-words", type=int, default=3)
+    build_parser.add_argument("--max-questions", type=int, default=50000, help="Most distinct questions clustered")
+    build_parser.add_argument("--workspace", help="Workspace whose public documents answer, with ACL filtering")
+    build_parser.add_argument("--concurrency", type=int, default=4, help="Answers generated at once")
+    refresh_parser = commands.add_parser("refresh", help="Regenerate expired answers")
+    refresh_parser.add_argument("--concurrency", type=int, default=4)
+    commands.add_parser("list", help="Show the stored answers")
+    for name in ("approve", "reject"):
+        commands.add_parser(name, help=f"{name.capitalize()} answers by ID").add_argument("ids", nargs="+")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "build":
+            asyncio.run(build(
+                args.top, args.min_count, args.clusters, args.min_words,
+                args.max_questions, args.workspace, args.concurrency
+            ))
+        elif args.command == "refresh":
+            asyncio.run(refresh(args.concurrency))
+        elif args.command == "list":
+            for row in asyncio.run(list_answers()):
+                status = "approved" if row.get('approved') else ("vetted" if row.get('vetted') else "review")
+                print(f"{row['id']}  {row.get('count', 0):>6}  {status:<8}  {row.get('question', '')}")
+        else:
+            asyncio.run(set_approved(args.ids, args.command == "approve"))
+    finally:
+        shutdown_logging()
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,256 @@
 # app/retrieval/rag_engine.py
 
-from typing import List, Dict, Any, Optional
-from langchain.prompts import ChatPromptTemplate
+from string import Formatter
+from typing import List, Dict, Any, Optional, Tuple
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
+import asyncio
+import json
 import logging
 
 from ..config import get_settings
-from ..database import VectorStore
-from ..models import Message, MessageType
+from ..cache import get_shared_cache, make_key
+from ..database import NamespaceSearch, PermissionIndex, UserSettingsStore, VectorStore
+from ..models import MessageRecord, MessageType, UserSettings
+from ..utils.helpers import normalize_query
+from ..utils.metrics import get_metrics
+from ..utils.deadline import DeadlineExceeded, running_low, within_deadline
+from ..utils.resilience import get_dependency
+from ..utils.usage import get_usage_tracker
 from .context import ContextManager
+from .faq import FAQIndex
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+prompt_tokens = get_metrics().counter(
+    "llm_prompt_tokens_total",
+    "Prompt tokens sent to the chat model",
+    labels=("model",)
+)
+cached_prompt_tokens = get_metrics().counter(
+    "llm_cached_prompt_tokens_total",
+    "Prompt tokens served from the provider's prompt cache",
+    labels=("model",)
+)
+completion_tokens = get_metrics().counter(
+    "llm_completion_tokens_total",
+    "Completion tokens generated by the chat model",
+    labels=("model",)
+)
+
+# Fixed instructions; part of the cacheable prompt prefix
+CONTEXT_INSTRUCTIONS = (
+    "The user's latest message starts with context information retrieved "
+    "from the company's documents. Answer the question after it using "
+    "that context and the conversation so far."
+)
+
+degraded_total = get_metrics().counter(
+    "rag_degraded_total",
+    "Answers degraded because the request deadline was near",
+    labels=("stage",)
+)
+faq_lookups = get_metrics().counter(
+    "faq_lookups_total",
+    "Standalone questions looked up among the precomputed answers",
+    labels=("result",)
+)
+
+def record_prompt_usage(message: BaseMessage, model: str = settings.OPENAI_MODEL) -> None:
+    """Count the prompt, cached prompt and completion tokens reported by the provider"""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    prompt = usage.get("input_tokens", 0)
+    cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    completion = usage.get("output_tokens", 0)
+    prompt_tokens.inc(prompt, model=model)
+    cached_prompt_tokens.inc(cached, model=model)
+    completion_tokens.inc(completion, model=model)
+    get_usage_tracker().record(
+        model,
+        prompt_tokens=prompt,
+        cached_tokens=cached,
+        completion_tokens=completion
+    )
+
+class UncachedResponse(Exception):
+    """Carries a fallback or degraded response out past the answer cache"""
+
+    def __init__(self, response: Dict[str, Any]):
+        super().__init__(response["response"])
+        self.response = response
+
+def fallback_response(results: List[Dict[str, Any]]) -> str:
+    """Reply listing the retrieved sources when no answer can be generated"""
+    sources = list(dict.fromkeys(
+        result["metadata"].get("source", "Unknown") for result in results
+    ))
+    if not sources:
+        return "I can't answer right now. Please try again in a few minutes."
+    listed = "\n".join(f"• {source}" for source in sources)
+    return (
+        "I can't write an answer right now, but these documents look relevant:\n"
+        f"{listed}"
+    )
+
 class RAGEngine:
     """Retrieval Augmented Generation Engine"""
     
-    def __init__(self):
-        self.vector_store = VectorStore()
+    def __init__(
+        self,
+        vector_store: Optional[VectorStore] = None,
+        llm: Optional[BaseChatModel] = None,
+        user_settings: Optional[UserSettingsStore] = None
+    ):
+        """
+        Initialize the engine
+        Args:
+            vector_store: Vector store to retrieve from, e.g. an offline fixture
+            llm: Chat model to answer with instead of OpenAI
+            user_settings: Source of per-user preferences
+        """
+        self.vector_store = vector_store or VectorStore()
+        self.user_settings = user_settings or UserSettingsStore()
         self.context_manager = ContextManager()
-        self.llm = ChatOpenAI(
+        # With ACL filtering, shared documents live once in the shared
+        # namespace and each user's access is applied as a metadata filter
+        self.permission_index = PermissionIndex() if settings.ACL_FILTERING_ENABLED else None
+        self.llm = llm or ChatOpenAI(
             model=settings.OPENAI_MODEL,
             temperature=settings.OPENAI_TEMPERATURE,
             max_tokens=settings.MAX_TOKENS
         )
+        self.llm_dependency = get_dependency("llm")
         
-        # Initialize prompt template
+        # Static messages first, so every request shares the same prefix and
+        # the provider can reuse its cached computation; the thread history
+        # only grows at the end, and context and question come last
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", settings.SYSTEM_PROMPT),
-            ("system", "Context information is below:\n{context}"),
-            ("human", "{question}")
+            ("system", f"{settings.SYSTEM_PROMPT}\n\n{CONTEXT_INSTRUCTIONS}"),
+            MessagesPlaceholder("history", optional=True),
+            ("human", "Context information is below:\n{context}\n\nQuestion: {question}")
         ])
+        # Used when the request deadline is near
+        self.fast_llm = llm or ChatOpenAI(
+            model=settings.FALLBACK_MODEL,
+            temperature=settings.OPENAI_TEMPERATURE,
+            max_tokens=settings.MAX_TOKENS
+        )
+        # Chains are compiled once per model and temperature; user
+        # temperatures are bound per call, so clients are never recreated
+        self._chains: Dict[Tuple[bool, Optional[float]], Runnable] = {}
+
+        # Standalone questions (no thread history) share answers across workers
+        self.answer_cache = get_shared_cache().namespace(
+            "answers", ttl=settings.ANSWER_CACHE_TTL
+        )
+        # Precomputed answers to the most frequent questions
+        self.faq_index = FAQIndex() if settings.FAQ_ENABLED else None
+
+    def _chain(self, fast: bool = False, temperature: Optional[float] = None) -> Runnable:
+        """
+        Prompt and model chain
+        Args:
+            fast: Use the fallback model
+            temperature: Sampling temperature, None for the model default
+        """
+        key = (fast, temperature)
+        chain = self._chains.get(key)
+        if chain is None:
+            llm = self.fast_llm if fast else self.llm
+            if temperature is not None:
+                llm = llm.bind(temperature=temperature)
+            chain = self._chains[key] = self.prompt | llm
+        return chain
+
+    async def warmup(self) -> None:
+        """Open the OpenAI connection pool the chat model uses"""
+        await self.llm.root_async_client.models.retrieve(settings.OPENAI_MODEL)
+
+    def _retrieval_searches(self, user_id: Optional[str]) -> List[NamespaceSearch]:
+        """
+        Namespaces to search for a user, from RETRIEVAL_NAMESPACES
+        With ACL filtering, every namespace except the user's own is
+        filtered to what the user may read. Without a user there is no
+        workspace to scope those namespaces to, so they are skipped.
+        """
+        workspace_id = None
+        metadata_filter = None
+        if self.permission_index is not None and user_id:
+            workspace_id = self.permission_index.access_for(user_id).workspace_id
+            metadata_filter = self.permission_index.filter_for(user_id)
+        values = {
+            "user_id": user_id,
+            "workspace_id": workspace_id,
+            "shared": settings.SHARED_NAMESPACE
+        }
+
+        searches = []
+        seen = set()
+        for template in settings.RETRIEVAL_NAMESPACES:
+            fields = [field for _, field, _, _ in Formatter().parse(template) if field]
+            if any(values.get(field) is None for field in fields):
+                continue
+            namespace = template.format(**values)
+            if not namespace or namespace in seen:
+                continue
+            own = namespace == user_id
+            if self.permission_index is not None and not own and metadata_filter is None:
+                continue
+            seen.add(namespace)
+            searches.append(NamespaceSearch(
+                namespace=namespace,
+                filter=None if own else metadata_filter,
+                quota=settings.NAMESPACE_QUOTAS.get(template),
+                weight=settings.NAMESPACE_WEIGHTS.get(template, 1.0),
+                # Calibrated per namespace, or per entry for per-user namespaces
+                threshold=settings.NAMESPACE_THRESHOLDS.get(
+                    namespace, settings.NAMESPACE_THRESHOLDS.get(template)
+                )
+            ))
+        return searches
+
+    async def retrieve(
+        self,
+        question: str,
+        user_id: Optional[str] = None,
+        max_chunks: Optional[int] = None,
+        adaptive: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the context chunks for a question
+        Args:
+            question: User's question
+            user_id: User ID for context scoping
+            max_chunks: Most chunks, instead of the configured number
+            adaptive: Select by score, defaults to ADAPTIVE_CONTEXT_ENABLED
+        Returns:
+            Search results, best first
+        """
+        if adaptive is None:
+            adaptive = settings.ADAPTIVE_CONTEXT_ENABLED
+        if max_chunks is None:
+            max_chunks = settings.ADAPTIVE_MAX_CHUNKS if adaptive else settings.MAX_CONTEXT_CHUNKS
+        searches = self._retrieval_searches(user_id)
+        if not searches and self.permission_index is not None:
+            # Never fall back to an unfiltered search of the default namespace
+            return []
+        return await self.vector_store.get_relevant_results(
+            question,
+            max_chunks=max_chunks,
+            searches=searches,
+            adaptive=adaptive
+        )
 
     async def get_response(
         self,
         question: str,
-        conversation_history: Optional[List[Message]] = None,
+        conversation_history: Optional[List[MessageRecord]] = None,
         user_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
@@ -48,35 +263,200 @@ class RAGEngine:
             Dictionary containing response and metadata
         """
         try:
-            # Get relevant context
-            context = await self.vector_store.get_relevant_context(
-                query=question,
-                max_chunks=settings.MAX_CONTEXT_CHUNKS,
-                namespace=user_id
+            # Served from the shared cache after the user's first request
+            prefs = await self.user_settings.get(user_id)
+            if conversation_history:
+                return await self._generate(question, conversation_history, user_id, prefs)
+
+            faq = await self._faq_answer(question, user_id)
+            if faq is not None:
+                return faq
+
+            # Keyed by index version so answers expire when the documents
+            # change, and by access filter so they expire with permissions
+            searches = self._retrieval_searches(user_id)
+            versions = await asyncio.gather(*(
+                self.vector_store.index_version(search.namespace)
+                for search in searches
+            ))
+            if None in versions:
+                return await self._generate(question, None, user_id, prefs)
+            access = json.dumps([search.filter for search in searches], sort_keys=True)
+            cache_key = make_key(
+                settings.OPENAI_MODEL, user_id, make_key(access), *versions,
+                prefs.max_context_length, prefs.response_temperature,
+                normalize_query(question)
             )
+            return await self.answer_cache.get_or_set(
+                cache_key,
+                lambda: self._generate(question, None, user_id, prefs)
+            )
+        except UncachedResponse as e:
+            # Raised through the answer cache so fallbacks are never cached
+            return e.response
+
+    async def _faq_answer(self, question: str, user_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Precomputed answer for a frequent question, without an LLM call
+        Only answers generated from the current index version of their
+        namespace, younger than FAQ_MAX_AGE_SECONDS and, with ACL filtering,
+        from the user's workspace are served.
+        """
+        if self.faq_index is None or not self.faq_index.ready():
+            return None
+        try:
+            # Through the embedding cache, so retrieval reuses it on a miss
+            vector = await self.vector_store.embedding_dependency.call(
+                lambda: self.vector_store.embeddings.aembed_query(question)
+            )
+            found = self.faq_index.match(vector)
+            if found is None:
+                faq_lookups.inc(result="miss")
+                return None
+            entry, score = found
+
+            if self.permission_index is not None:
+                workspace_id = self.permission_index.access_for(user_id).workspace_id if user_id else None
+                if workspace_id is None or entry.workspace_id != workspace_id:
+                    faq_lookups.inc(result="denied")
+                    return None
+            # Versions are shared by all hosts, so writes anywhere expire the answer
+            if entry.expired(await self.vector_store.index_version(entry.namespace)):
+                faq_lookups.inc(result="stale")
+                return None
+        except Exception as e:
+            logger.error("Error looking up precomputed answers: %s", e)
+            return None
+
+        faq_lookups.inc(result="hit")
+        logger.info("Answered from FAQ entry %s (similarity %.3f)", entry.id, score)
+        return {
+            "response": entry.answer,
+            "context_used": entry.context,
+            "model_used": entry.model,
+            "conversation_history": "",
+            "faq_id": entry.id
+        }
+
+    async def canonical_answer(
+        self,
+        question: str,
+        searches: List[NamespaceSearch]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Answer a standalone question for reuse by everyone
+        Retrieves from the given namespaces only and generates with the main
+        model at temperature 0, outside of any request deadline.
+        Args:
+            question: Question to answer
+            searches: Namespaces to retrieve from, e.g. the shared one
+        Returns:
+            Response, context and model, or None if no context was found
+        """
+        results = await self.vector_store.get_relevant_results(
+            question,
+            max_chunks=settings.ADAPTIVE_MAX_CHUNKS if settings.ADAPTIVE_CONTEXT_ENABLED else settings.MAX_CONTEXT_CHUNKS,
+            searches=searches,
+            adaptive=settings.ADAPTIVE_CONTEXT_ENABLED
+        )
+        if not results:
+            return None
+        context = self.vector_store.format_context(results)
+        chain = self._chain(False, 0.0)
+        inputs = {"history": [], "context": context, "question": question}
+        response = await self.llm_dependency.call(lambda: chain.ainvoke(inputs))
+        record_prompt_usage(response)
+        return {
+            "response": response.content,
+            "context_used": context,
+            "model_used": settings.OPENAI_MODEL
+        }
+
+    async def _generate(
+        self,
+        question: str,
+        conversation_history: Optional[List[MessageRecord]],
+        user_id: Optional[str],
+        prefs: UserSettings
+    ) -> Dict[str, Any]:
+        """
+        Retrieve context and generate an answer
+        The user's settings cap the context chunks and set the temperature.
+        Each stage is bounded by the request deadline. When little time is
+        left, fewer chunks are used and the faster fallback model answers.
+        """
+        try:
+            # Get relevant context; answer without it if retrieval fails
+            max_chunks = prefs.max_context_length
+            adaptive = None
+            if running_low(settings.DEGRADE_BELOW_SECONDS):
+                max_chunks = min(max_chunks or settings.DEGRADED_MAX_CHUNKS, settings.DEGRADED_MAX_CHUNKS)
+                adaptive = False
+                degraded_total.inc(stage="retrieval")
+            try:
+                results = await within_deadline(
+                    self.retrieve(question, user_id, max_chunks, adaptive), "retrieval"
+                )
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.error("Error getting relevant context: %s", e)
+                results = []
+
+            model = settings.OPENAI_MODEL
+            degraded = running_low(settings.DEGRADE_BELOW_SECONDS)
+            if degraded:
+                results = results[:settings.DEGRADED_MAX_CHUNKS]
+                model = settings.FALLBACK_MODEL
+                degraded_total.inc(stage="generation")
+            chain = self._chain(degraded, prefs.response_temperature)
+            context = self.vector_store.format_context(results) if results else ""
             
             # Prepare conversation history if available
             history_context = ""
+            history: List[BaseMessage] = []
             if conversation_history:
                 history_context = self.context_manager.format_conversation_history(
                     conversation_history
                 )
-                context = f"{history_context}\n\n{context}"
+                history = self.context_manager.to_chat_messages(conversation_history)
             
             # Generate response
-            chain = self.prompt | self.llm
-            response = await chain.ainvoke({
+            inputs = {
+                "history": history,
                 "context": context,
                 "question": question
-            })
+            }
+            try:
+                response = await within_deadline(
+                    self.llm_dependency.call(lambda: chain.ainvoke(inputs)), "generation"
+                )
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.error("Error generating response: %s", e)
+                raise UncachedResponse({
+                    "response": fallback_response(results),
+                    "context_used": context,
+                    "model_used": None,
+                    "conversation_history": history_context,
+                    "degraded": True
+                })
+            record_prompt_usage(response, model)
             
-            return {
+            answer = {
                 "response": response.content,
                 "context_used": context,
-                "model_used": settings.OPENAI_MODEL,
+                "model_used": model,
                 "conversation_history": history_context
             }
+            if degraded:
+                # Don't let a rushed answer stand in for a full one
+                raise UncachedResponse({**answer, "degraded": True})
+            return answer
             
+        except (UncachedResponse, DeadlineExceeded):
+            raise
         except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
+            logger.error("Error generating response: %s", e)
             raise
\ No newline at end of file
@@ -2,11 +2,13 @@
 
 from .bot import SlackBot
 from .events import EventHandler
+from .socket_mode import SocketModeTransport
 from .handlers import MessageHandler, CommandHandler
 
 __all__ = [
     'SlackBot',
     'EventHandler',
+    'SocketModeTransport',
     'MessageHandler',
     'CommandHandler'
 ]
\ No newline at end of file
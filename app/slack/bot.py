@@ -3,8 +3,12 @@ from slack_bolt.async_app import AsyncApp
 from slack_bolt.adapter.fastapi.async_handler import AsyncSlackRequestHandler
 import logging
 
+from typing import Optional
+
 from ..config import get_settings
-from .handlers import MessageHandler, CommandHandler
+from ..cache import get_shared_cache
+from .handlers import MessageHandler, CommandHandler, build_command_data
+from .socket_mode import SocketModeTransport
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -19,9 +23,14 @@ class SlackBot:
             signing_secret=settings.SLACK_SIGNING_SECRET
         )
         
+        # Event IDs already handled by any worker, so Slack retries are dropped
+        self.idempotency_keys = get_shared_cache().namespace(
+            "idempotency", ttl=settings.IDEMPOTENCY_KEY_TTL
+        )
+
         # Initialize handlers
         self.message_handler = MessageHandler()
-        self.command_handler = CommandHandler()
+        self.command_handler = CommandHandler(self.message_handler.chat_engine)
         
         # Register event listeners
         self.register_listeners()
@@ -29,15 +38,50 @@ class SlackBot:
         # Create FastAPI handler
         self.handler = AsyncSlackRequestHandler(self.app)
 
+        # Socket Mode transport, created by start_socket_mode()
+        self.socket_mode: Optional[SocketModeTransport] = None
+
+    async def warmup(self):
+        """Open the Slack Web API connection and verify the bot token"""
+        await self.app.client.auth_test()
+
+    async def start_socket_mode(self):
+        """Receive Slack requests over Socket Mode using the app-level token"""
+        self.socket_mode = SocketModeTransport(
+            self.app,
+            app_token=settings.SLACK_APP_TOKEN,
+            connections=settings.SLACK_SOCKET_MODE_CONNECTIONS,
+            wss_url=settings.SLACK_SOCKET_MODE_URL
+        )
+        await self.socket_mode.start()
+
+    async def stop_socket_mode(self):
+        """Close Socket Mode connections"""
+        if self.socket_mode:
+            await self.socket_mode.stop()
+            self.socket_mode = None
+
     def register_listeners(self):
         """Register event listeners"""
+
+        @self.app.middleware
+        async def skip_duplicate_events(body, resp, next):
+            """Acknowledge Slack retries of already-handled events without reprocessing"""
+            event_id = body.get("event_id")
+            if event_id and not await self.idempotency_keys.add(event_id):
+                logger.info("Skipping duplicate Slack event %s", event_id)
+                resp.status = 200
+                return resp
+            return await next()
         
         @self.app.command("/ask")
         async def handle_ask_command(ack, command, say):
             """Handle /ask command"""
-            await ack()
             try:
-                await self.command_handler.handle_ask(command, say)
+                await self.command_handler.handle_ask(
+                    build_command_data(command, say, ack)
+                )
             except Exception as e:
-                logger.error(f"Error handling ask command: {str(e)}")
-                await say(f"Sorry, I encountered an error: {str(e)}")
\ No newline at end of file
+                # Exception text can leak internals, so it is only logged
+                logger.error("Error handling ask command: %s", e)
+                await say("Sorry, I encountered an error processing your question.")
\ No newline at end of file
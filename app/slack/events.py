@@ -24,7 +24,7 @@ class EventHandler:
                 return await self._handle_event_callback(event)
                 
         except Exception as e:
-            logger.error(f"Error handling event: {str(e)}")
+            logger.error("Error handling event: %s", e)
             raise
 
     def _handle_url_verification(self, event: Dict[str, Any]) -> Dict[str, str]:
@@ -36,4 +36,4 @@ class EventHandler:
         inner_event = event.get('event', {})
         event_type = inner_event.get('type')
         
-        logger.info(f"Handling event callback of type: {event_type}")
\ No newline at end of file
+        logger.info("Handling event callback of type: %s", event_type)
\ No newline at end of file
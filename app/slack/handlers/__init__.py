@@ -1,9 +1,10 @@
 # app/slack/handlers/__init__.py
 
 from .message import MessageHandler
-from .command import CommandHandler
+from .command import CommandHandler, build_command_data
 
 __all__ = [
     'MessageHandler',
-    'CommandHandler'
+    'CommandHandler',
+    'build_command_data'
 ]
\ No newline at end of file
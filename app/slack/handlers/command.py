@@ -1,17 +1,62 @@
 # app/slack/handlers/command.py
-from typing import Any, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional
 import logging
 import time
-import asyncio  # Add this import
+import asyncio
 
 from ...config import get_settings
 from ...retrieval import ChatEngine
-from ...models import Message, MessageType
+from ...models import MessageRecord, MessageType
+from ...tasks import TaskQueue, get_task_queue
+from ...utils.deadline import DeadlineExceeded, deadline
+from ...utils.helpers import slack_reply_chunks
+from .message import TIMEOUT_MESSAGE
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Task queue of /ask questions answered by app.worker
+ASK_QUEUE = "ask"
+# Command fields a queued question keeps; the callables stay in the web process
+ASK_TASK_FIELDS = ("text", "user_id", "channel_id", "command_ts", "thread_ts")
+
+def build_command_data(
+    payload: Dict[str, Any],
+    say: Callable[[Dict[str, Any]], Awaitable[Any]],
+    ack: Callable[[], Awaitable[Any]]
+) -> Dict[str, Any]:
+    """
+    Build the command data the handlers expect from a slash command payload
+    Args:
+        payload: Slash command payload (form fields or Socket Mode payload)
+        say: Coroutine posting a message dict to the command's channel
+        ack: Coroutine acknowledging the command
+    Returns:
+        Command data for CommandHandler
+    """
+    return {
+        "command": payload.get("command"),
+        "text": payload.get("text") or "",
+        "user_id": payload.get("user_id"),
+        "channel_id": payload.get("channel_id"),
+        "command_ts": str(time.time()),
+        "say": say,
+        "ack": ack
+    }
+
 class CommandHandler:
+    """Handles Slack slash commands"""
+
+    def __init__(
+        self,
+        chat_engine: Optional[ChatEngine] = None,
+        task_queue: Optional[TaskQueue] = None
+    ):
+        self.chat_engine = chat_engine or ChatEngine()
+        if task_queue is None and settings.TASK_QUEUE_ENABLED:
+            task_queue = get_task_queue()
+        self.task_queue = task_queue
+
     async def handle_ask(self, command_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # First, acknowledge the command immediately
@@ -24,8 +69,9 @@ class CommandHandler:
                     "text": "Please provide a question after /ask"
                 }
 
-            # Process in background
-            asyncio.create_task(self._process_and_respond(command_data))
+            # Hand off to the workers, or process in background
+            if not await self._enqueue(command_data):
+                asyncio.create_task(self._process_and_respond(command_data))
 
             # Return immediate acknowledgment
             return {
@@ -37,31 +83,69 @@ class CommandHandler:
             logger.exception("Error in handle_ask:")
             return {
                 "response_type": "ephemeral",
-                "text": f"Sorry, I encountered an error: {str(e)}"
+                "text": "Sorry, I encountered an error processing your question."
             }
 
+    async def _enqueue(self, command_data: Dict[str, Any]) -> bool:
+        """
+        Queue the question for the worker processes
+        Returns:
+            Whether it was queued; False without a queue or if queueing failed
+        """
+        if self.task_queue is None:
+            return False
+        try:
+            await self.task_queue.enqueue(
+                ASK_QUEUE,
+                {field: command_data.get(field) for field in ASK_TASK_FIELDS}
+            )
+            return True
+        except Exception as e:
+            logger.error("Error queueing question: %s", e)
+            return False
+
+    async def answer(self, command_data: Dict[str, Any], started_at: float) -> str:
+        """
+        Answer the question of an /ask command
+        Args:
+            command_data: Command data, or the fields of a queued question
+            started_at: When the request deadline started, as a Unix time
+        Returns:
+            Reply text
+        """
+        message = MessageRecord(
+            id=command_data["command_ts"],
+            channel_id=command_data["channel_id"],
+            user_id=command_data["user_id"],
+            thread_ts=None,
+            message_type=MessageType.USER.value,
+            content=command_data["text"],
+            timestamp=float(command_data["command_ts"])
+        )
+        try:
+            elapsed = time.time() - started_at
+            with deadline(settings.REQUEST_DEADLINE_SECONDS - elapsed):
+                response = await self.chat_engine.process_message(message)
+            return response.content
+        except DeadlineExceeded as e:
+            logger.warning("Gave up on command: %s", e)
+            return TIMEOUT_MESSAGE
+
     async def _process_and_respond(self, command_data: Dict[str, Any]):
         """Process the question and respond using Slack's say function"""
         try:
-            message = Message(
-                id=command_data["command_ts"],
-                channel_id=command_data["channel_id"],
-                user_id=command_data["user_id"],
-                thread_ts=None,
-                message_type=MessageType.USER,
-                content=command_data["text"]
-            )
+            # The budget started when the command was received
+            text = await self.answer(command_data, float(command_data["command_ts"]))
 
-            response = await self.chat_engine.process_message(message)
-            
             # Use Slack's say function to send the response
-            await command_data['say']({
-                "text": response.content,
-                "thread_ts": command_data.get("thread_ts")
-            })
+            for chunk in slack_reply_chunks(text):
+                await command_data['say']({
+                    "text": chunk,
+                    "thread_ts": command_data.get("thread_ts")
+                })
 
         except Exception as e:
-            logger.error(f"Error processing message: {str(e)}")
+            logger.error("Error processing message: %s", e)
             await command_data['say']({
                 "text": "Sorry, I encountered an error processing your question.",
                 "thread_ts": command_data.get("thread_ts")
@@ -95,12 +179,8 @@ class CommandHandler:
             }
 
         except Exception as e:
-            logger.error(f"Error handling help command: {str(e)}")
+            logger.error("Error handling help command: %s", e)
             return {
                 "response_type": "ephemeral",
                 "text": "Sorry, I encountered an error showing the help message."
-            }
-
-    def _format_error_message(self, error: str) -> str:
-        """Format error message for user display"""
-        return f"Sorry, I encountered an error: {error}"
\ No newline at end of file
+            }
\ No newline at end of file
@@ -4,13 +4,17 @@ from typing import Any, Dict
 import logging
 
 from ...retrieval import ChatEngine
-from ...models import Message, MessageType
+from ...models import MessageRecord
 from ...config import get_settings
 from ...database import ConversationStore
+from ...utils.deadline import DeadlineExceeded, deadline, within_deadline
+from ...utils.helpers import slack_reply_chunks
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+TIMEOUT_MESSAGE = "Sorry, that question took too long to answer. Please try again."
+
 class MessageHandler:
     """Handles Slack messages"""
     
@@ -26,55 +30,74 @@ class MessageHandler:
             say: Slack say function
             context: Event context
         """
-        try:
-            # Ignore bot messages
-            if event.get('bot_id'):
-                return
-
-            # Create message object
-            message = Message(
-                id=event['ts'],
-                channel_id=event['channel'],
-                user_id=event['user'],
-                thread_ts=event.get('thread_ts'),
-                message_type=MessageType.USER,
-                content=event['text'],
-                timestamp=event['ts']
-            )
+        # Ignore bot messages
+        if event.get('bot_id'):
+            return
 
-            # Get conversation history if in thread
-            history = []
-            if message.thread_ts:
-                history = await self.conversation_store.get_conversation_history(
-                    channel_id=message.channel_id,
-                    thread_ts=message.thread_ts
+        with deadline(settings.REQUEST_DEADLINE_SECONDS):
+            try:
+                await self._answer(event, say)
+            except DeadlineExceeded as e:
+                logger.warning("Gave up on message: %s", e)
+                await say(
+                    text=TIMEOUT_MESSAGE,
+                    thread_ts=event.get('thread_ts')
+                )
+            except Exception as e:
+                logger.error("Error handling message: %s", e)
+                await say(
+                    text="Sorry, I encountered an error processing your question.",
+                    thread_ts=event.get('thread_ts')
                 )
 
-            # Process message
-            response = await self.chat_engine.process_message(
-                message=message,
-                conversation_history=history
-            )
+    async def _answer(self, event: Dict[str, Any], say: Any) -> None:
+        """Answer a message within the current request deadline"""
+        # Create message record
+        message = MessageRecord.from_event(event)
 
-            # Save response to conversation history
-            await self.conversation_store.save_message(
-                channel_id=response.channel_id,
-                user_id=response.user_id,
-                message_type=response.message_type,
-                content=response.content,
-                thread_ts=response.thread_ts,
-                metadata=response.metadata
+        # Get conversation history if in thread
+        history = []
+        if message.thread_ts:
+            rows = await within_deadline(
+                self.conversation_store.get_conversation_history(
+                    channel_id=message.channel_id,
+                    thread_ts=message.thread_ts
+                ),
+                "history"
             )
+            history = [MessageRecord.from_dict(row) for row in rows]
 
-            # Send response
-            await say(
-                text=response.content,
+        # Record the question; threads keep every message in order
+        await within_deadline(
+            self.conversation_store.save_message(
+                channel_id=message.channel_id,
+                user_id=message.user_id,
+                message_type=message.message_type,
+                content=message.content,
                 thread_ts=message.thread_ts
-            )
+            ),
+            "history"
+        )
 
-        except Exception as e:
-            logger.error(f"Error handling message: {str(e)}")
+        # Process message
+        response = await self.chat_engine.process_message(
+            message=message,
+            conversation_history=history
+        )
+
+        # Save response to conversation history
+        await self.conversation_store.save_message(
+            channel_id=response.channel_id,
+            user_id=response.user_id,
+            message_type=response.message_type,
+            content=response.content,
+            thread_ts=response.thread_ts,
+            metadata=dict(response.metadata)
+        )
+
+        # Send response, split if it is longer than Slack accepts
+        for chunk in slack_reply_chunks(response.content):
             await say(
-                text=f"Sorry, I encountered an error: {str(e)}",
+                text=chunk,
                 thread_ts=message.thread_ts
-            )
\ No newline at end of file
+            )
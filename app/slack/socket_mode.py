@@ -0,0 +1,124 @@
+# app/slack/socket_mode.py
+
+from typing import List, Optional, Set
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.request.async_request import AsyncBoltRequest
+from slack_sdk.socket_mode.aiohttp import SocketModeClient
+from slack_sdk.socket_mode.async_client import AsyncBaseSocketModeClient
+from slack_sdk.socket_mode.request import SocketModeRequest
+from slack_sdk.socket_mode.response import SocketModeResponse
+from slack_sdk.web.async_client import AsyncWebClient
+import asyncio
+import logging
+
+from ..utils.logger import bind_request_context
+
+logger = logging.getLogger(__name__)
+
+# Slack accepts at most 10 concurrent Socket Mode connections per app
+MAX_CONNECTIONS = 10
+
+class _FixedUrlSocketModeClient(SocketModeClient):
+    """Socket Mode client that connects to a fixed URL, e.g. a local stand-in"""
+
+    def __init__(self, wss_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.fixed_wss_url = wss_url
+
+    async def issue_new_wss_url(self) -> str:
+        return self.fixed_wss_url
+
+class SocketModeTransport:
+    """
+    Receives Slack requests over persistent Socket Mode websockets
+
+    Every envelope is acknowledged as soon as it arrives and then dispatched
+    to the Bolt app in its own task, so listeners are the same ones the HTTP
+    path uses and slow handlers never delay the ack. Several connections
+    are kept open; Slack spreads envelopes across them and each one
+    reconnects on its own.
+    """
+
+    def __init__(
+        self,
+        app: AsyncApp,
+        app_token: str,
+        connections: int = 2,
+        wss_url: Optional[str] = None,
+        ping_interval: float = 10
+    ):
+        """
+        Initialize the transport
+        Args:
+            app: Bolt app whose listeners handle the requests
+            app_token: App-level token (xapp-...) with connections:write
+            connections: Number of concurrent websocket connections
+            wss_url: Fixed websocket URL instead of apps.connections.open
+            ping_interval: Seconds between keepalive pings
+        """
+        self.app = app
+        self.app_token = app_token
+        self.connections = max(1, min(connections, MAX_CONNECTIONS))
+        self.wss_url = wss_url
+        self.ping_interval = ping_interval
+        self.clients: List[AsyncBaseSocketModeClient] = []
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _create_client(self) -> AsyncBaseSocketModeClient:
+        """Create one auto-reconnecting Socket Mode client"""
+        kwargs = dict(
+            app_token=self.app_token,
+            web_client=AsyncWebClient(token=self.app_token),
+            auto_reconnect_enabled=True,
+            ping_interval=self.ping_interval,
+            logger=logger
+        )
+        if self.wss_url:
+            client = _FixedUrlSocketModeClient(self.wss_url, **kwargs)
+        else:
+            client = SocketModeClient(**kwargs)
+        client.socket_mode_request_listeners.append(self._on_request)
+        return client
+
+    async def start(self) -> None:
+        """Open all connections"""
+        self.clients = [self._create_client() for _ in range(self.connections)]
+        await asyncio.gather(*(client.connect() for client in self.clients))
+        logger.info("Socket Mode connected with %d connections", len(self.clients))
+
+    async def stop(self) -> None:
+        """Close all connections and wait for in-flight requests"""
+        for client in self.clients:
+            await client.close()
+        self.clients = []
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info("Socket Mode disconnected")
+
+    async def _on_request(
+        self,
+        client: AsyncBaseSocketModeClient,
+        req: SocketModeRequest
+    ) -> None:
+        """Ack the envelope immediately and dispatch it in the background"""
+        await client.send_socket_mode_response(
+            SocketModeResponse(envelope_id=req.envelope_id)
+        )
+        task = asyncio.create_task(self._dispatch(req))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, req: SocketModeRequest) -> None:
+        """Run the request through the Bolt app's middleware and listeners"""
+        bind_request_context(request_id=req.envelope_id)
+        try:
+            bolt_request = AsyncBoltRequest(mode="socket_mode", body=req.payload)
+            response = await self.app.async_dispatch(bolt_request)
+            if response.status >= 400:
+                logger.warning(
+                    "Socket Mode %s request failed with status %d",
+                    req.type,
+                    response.status
+                )
+        except Exception as e:
+            logger.error("Error dispatching Socket Mode request: %s", e)
@@ -0,0 +1,9 @@
+# app/tasks/__init__.py
+
+from .queue import Task, TaskQueue, get_task_queue
+
+__all__ = [
+    'Task',
+    'TaskQueue',
+    'get_task_queue'
+]
@@ -0,0 +1,248 @@
+# app/tasks/queue.py
+
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from ..config import get_settings
+from ..utils.sqlite import Transaction
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+READY, LEASED, DEAD = "ready", "leased", "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_id TEXT,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_available ON tasks (queue, status, available_at);
+"""
+
+class Task(NamedTuple):
+    """A leased task"""
+    id: int
+    queue: str
+    payload: Dict[str, Any]
+    attempts: int
+    lease_id: str
+    created_at: float
+
+class TaskQueue:
+    """
+    Durable task queue shared by the processes on a host
+
+    Tasks are rows in a SQLite database in WAL mode, so they survive
+    restarts and any number of producer and worker processes can share
+    them. A leased task is hidden for the visibility timeout; if its worker
+    neither acknowledges nor extends it in time, it is handed out again.
+    Failed tasks are retried with exponential backoff until max_attempts,
+    then kept as dead letters for inspection and requeueing.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        visibility_timeout: float = settings.TASK_VISIBILITY_TIMEOUT,
+        max_attempts: int = settings.TASK_MAX_ATTEMPTS,
+        retry_backoff: float = settings.TASK_RETRY_BACKOFF_SECONDS
+    ):
+        """
+        Initialize the queue
+        Args:
+            path: SQLite database file shared by producers and workers
+            visibility_timeout: Seconds a leased task is hidden from other workers
+            max_attempts: Attempts before a task is dead-lettered
+            retry_backoff: Delay before the first retry, doubled for each further one
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, reconnecting after a fork"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # An acknowledged enqueue must survive a power loss
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self) -> Transaction:
+        return Transaction(self._connection())
+
+    def enqueue_sync(self, queue: str, payload: Dict[str, Any], delay: float = 0) -> int:
+        """Add a task; returns its ID"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO tasks (queue, payload, status, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (queue, json.dumps(payload), READY, now + delay, now)
+            )
+        return cursor.lastrowid
+
+    def lease_sync(self, queue: str) -> Optional[Task]:
+        """
+        Lease the next available task
+        Tasks whose lease expired are available again; if they have used up
+        their attempts, they are dead-lettered instead of handed out.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT id, payload, status, attempts, created_at FROM tasks "
+                    "WHERE queue = ? AND status IN (?, ?) AND available_at <= ? "
+                    "ORDER BY available_at, id LIMIT 1",
+                    (queue, READY, LEASED, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                task_id, payload, status, attempts, created_at = row
+                if status == LEASED and attempts >= self.max_attempts:
+                    # Its last worker died or stalled past the timeout
+                    conn.execute(
+                        "UPDATE tasks SET status = ?, lease_id = NULL, last_error = ? WHERE id = ?",
+                        (DEAD, "lease expired", task_id)
+                    )
+                    logger.warning("Task %s dead-lettered after %s attempts", task_id, attempts)
+                    continue
+                lease_id = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE tasks SET status = ?, attempts = attempts + 1, available_at = ?, "
+                    "lease_id = ? WHERE id = ?",
+                    (LEASED, now + self.visibility_timeout, lease_id, task_id)
+                )
+                return Task(task_id, queue, json.loads(payload), attempts + 1, lease_id, created_at)
+
+    def extend_sync(self, task: Task) -> bool:
+        """Push back the task's visibility timeout; False if the lease was lost"""
+        cursor = self._connection().execute(
+            "UPDATE tasks SET available_at = ? WHERE id = ? AND lease_id = ?",
+            (time.time() + self.visibility_timeout, task.id, task.lease_id)
+        )
+        return cursor.rowcount == 1
+
+    def update_sync(self, task: Task) -> bool:
+        """Save the task's payload, e.g. its progress; False if the lease was lost"""
+        cursor = self._connection().execute(
+            "UPDATE tasks SET payload = ? WHERE id = ? AND lease_id = ?",
+            (json.dumps(task.payload), task.id, task.lease_id)
+        )
+        return cursor.rowcount == 1
+
+    def ack_sync(self, task: Task) -> bool:
+        """Remove a finished task; False if the lease was lost"""
+        cursor = self._connection().execute(
+            "DELETE FROM tasks WHERE id = ? AND lease_id = ?",
+            (task.id, task.lease_id)
+        )
+        return cursor.rowcount == 1
+
+    def fail_sync(self, task: Task, error: str) -> str:
+        """
+        Record a failed attempt
+        Returns:
+            The task's new status: ready for a retry, or dead
+        """
+        if task.attempts >= self.max_attempts:
+            status, available_at = DEAD, time.time()
+        else:
+            status = READY
+            available_at = time.time() + self.retry_backoff * 2 ** (task.attempts - 1)
+        self._connection().execute(
+            "UPDATE tasks SET status = ?, available_at = ?, lease_id = NULL, last_error = ? "
+            "WHERE id = ? AND lease_id = ?",
+            (status, available_at, error[:2000], task.id, task.lease_id)
+        )
+        return status
+
+    def dead_letters_sync(self, queue: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Dead-lettered tasks, oldest first"""
+        rows = self._connection().execute(
+            "SELECT id, payload, attempts, created_at, last_error FROM tasks "
+            "WHERE queue = ? AND status = ? ORDER BY id LIMIT ?",
+            (queue, DEAD, limit)
+        ).fetchall()
+        return [
+            {
+                "id": task_id,
+                "payload": json.loads(payload),
+                "attempts": attempts,
+                "created_at": created_at,
+                "last_error": last_error
+            }
+            for task_id, payload, attempts, created_at, last_error in rows
+        ]
+
+    def requeue_sync(self, task_ids: List[int]) -> int:
+        """Give dead-lettered tasks a fresh set of attempts"""
+        with self._transaction() as conn:
+            cursor = conn.executemany(
+                "UPDATE tasks SET status = ?, attempts = 0, available_at = ? "
+                "WHERE id = ? AND status = ?",
+                [(READY, time.time(), task_id, DEAD) for task_id in task_ids]
+            )
+        return cursor.rowcount
+
+    def depth_sync(self, queue: str) -> Dict[str, int]:
+        """Number of tasks by status"""
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*) FROM tasks WHERE queue = ? GROUP BY status",
+            (queue,)
+        ).fetchall()
+        return {READY: 0, LEASED: 0, DEAD: 0, **dict(rows)}
+
+    # Async wrappers; SQLite calls run in a thread so the event loop never blocks
+
+    async def enqueue(self, queue: str, payload: Dict[str, Any], delay: float = 0) -> int:
+        return await asyncio.to_thread(self.enqueue_sync, queue, payload, delay)
+
+    async def lease(self, queue: str) -> Optional[Task]:
+        return await asyncio.to_thread(self.lease_sync, queue)
+
+    async def extend(self, task: Task) -> bool:
+        return await asyncio.to_thread(self.extend_sync, task)
+
+    async def update(self, task: Task) -> bool:
+        return await asyncio.to_thread(self.update_sync, task)
+
+    async def ack(self, task: Task) -> bool:
+        return await asyncio.to_thread(self.ack_sync, task)
+
+    async def fail(self, task: Task, error: str) -> str:
+        return await asyncio.to_thread(self.fail_sync, task, error)
+
+    async def depth(self, queue: str) -> Dict[str, int]:
+        return await asyncio.to_thread(self.depth_sync, queue)
+
+@lru_cache()
+def get_task_queue() -> TaskQueue:
+    """Create and cache the task queue instance for this process"""
+    return TaskQueue(settings.TASK_QUEUE_PATH)
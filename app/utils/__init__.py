@@ -1,11 +1,19 @@
 # app/utils/__init__.py
 
-from .logger import setup_logger
-from .helpers import format_slack_message, generate_uuid, parse_timestamp
+from .logger import setup_logger, configure_logging, shutdown_logging, bind_request_context
+from .warmup import Warmup
+from .metrics import get_metrics
+from .helpers import format_slack_message, generate_uuid, normalize_query, parse_timestamp
 
 __all__ = [
     'setup_logger',
+    'configure_logging',
+    'shutdown_logging',
+    'bind_request_context',
+    'Warmup',
+    'get_metrics',
     'format_slack_message',
     'generate_uuid',
+    'normalize_query',
     'parse_timestamp'
 ]
\ No newline at end of file
@@ -0,0 +1,88 @@
+# app/utils/deadline.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, Optional, TypeVar
+import asyncio
+import time
+
+from .metrics import get_metrics
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() by which the current request must be answered
+deadline_var: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+deadline_exceeded_total = get_metrics().counter(
+    "deadline_exceeded_total",
+    "Requests cancelled because their deadline passed, by stage",
+    labels=("stage",)
+)
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """
+    Set the deadline of the current request
+    Nested deadlines can only shorten the budget, never extend it.
+    Args:
+        seconds: Time budget from now
+    Yields:
+        The absolute deadline on the time.monotonic() clock
+    """
+    at = time.monotonic() + seconds
+    current = deadline_var.get()
+    if current is not None:
+        at = min(at, current)
+    token = deadline_var.set(at)
+    try:
+        yield at
+    finally:
+        deadline_var.reset(token)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, or None without one"""
+    at = deadline_var.get()
+    if at is None:
+        return None
+    return at - time.monotonic()
+
+def running_low(threshold: float) -> bool:
+    """Whether less than `threshold` seconds of the budget are left"""
+    left = remaining()
+    return left is not None and left < threshold
+
+async def within_deadline(awaitable: Awaitable[T], stage: str) -> T:
+    """
+    Await a stage with the remaining budget as its timeout
+    Args:
+        awaitable: Stage to run; cancelled if the deadline passes
+        stage: Stage name for errors and metrics
+    Returns:
+        Result of the stage
+    Raises:
+        DeadlineExceeded: If the budget is spent before or during the stage
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        # Close the coroutine so it doesn't warn about never being awaited
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        deadline_exceeded_total.inc(stage=stage)
+        raise DeadlineExceeded(stage)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except asyncio.TimeoutError:
+        # Only our own timeout; a stage's own TimeoutError has time left
+        if remaining() > 0.01:
+            raise
+        deadline_exceeded_total.inc(stage=stage)
+        raise DeadlineExceeded(stage) from None
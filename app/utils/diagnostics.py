@@ -0,0 +1,241 @@
+# app/utils/diagnostics.py
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+# Leaf frames of threads that are blocked rather than working
+_IDLE_LEAVES = frozenset([
+    ('select', 'selectors.py'),
+    ('wait', 'threading.py'),
+    ('_worker', 'thread.py'),
+    ('accept', 'socket.py')
+])
+
+_profile_lock = threading.Lock()
+
+def _frame_label(code: Any) -> str:
+    """Collapsed-stack label of a function: name (package/file.py:line)"""
+    path = code.co_filename.split(os.sep)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+def _thread_stack(frame: Any) -> Tuple[List[str], bool]:
+    """Labels of a thread's frames, outermost first, and whether it is idle"""
+    leaf = frame.f_code
+    idle = (leaf.co_name, os.path.basename(leaf.co_filename)) in _IDLE_LEAVES
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels, idle
+
+def sample_stacks(
+    seconds: float,
+    interval: float = 0.01,
+    include_idle: bool = False,
+    loop_thread: Optional[int] = None
+) -> Tuple[Counter, int]:
+    """
+    Sample the Python stacks of every thread
+    Runs in the calling thread, which must not be the event loop's; nothing
+    is installed in the sampled threads, so they only pay for the GIL
+    handoffs while the sampler walks their frames.
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+        include_idle: Keep samples of threads blocked in select, locks or queues
+        loop_thread: Thread ID of the event loop, labelled `event-loop`
+    Returns:
+        Collapsed stacks (thread;outer;...;inner) with their sample counts,
+        and the number of samples taken
+    Raises:
+        RuntimeError: If another profile is running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("a profile is already running")
+    try:
+        own = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels, idle = _thread_stack(frame)
+                if idle and not include_idle:
+                    continue
+                thread = 'event-loop' if ident == loop_thread else names.get(ident, f'thread-{ident}')
+                stacks[';'.join([thread.replace(';', '_'), *labels])] += 1
+            samples += 1
+            time.sleep(interval)
+        return stacks, samples
+    finally:
+        _profile_lock.release()
+
+def collapse(stacks: Counter) -> str:
+    """Collapsed-stack text, as read by flamegraph.pl, speedscope and inferno"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+class MemoryTracer:
+    """
+    tracemalloc snapshots diffed against a baseline
+
+    tracemalloc slows every allocation while it traces, so it only runs
+    between start() and stop(), and stops itself after `max_seconds`.
+    """
+
+    def __init__(self, max_seconds: float):
+        """
+        Initialize the tracer
+        Args:
+            max_seconds: Longest tracing runs before it is stopped automatically
+        """
+        self.max_seconds = max_seconds
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_at: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ])
+
+    async def start(self, frames: int = 1) -> Dict[str, Any]:
+        """
+        Start tracing and take the baseline snapshot
+        Args:
+            frames: Stack frames recorded per allocation; more cost more
+        """
+        if not self.tracing:
+            tracemalloc.start(frames)
+        self._baseline = await asyncio.to_thread(self._snapshot)
+        self._started_at = time.time()
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.max_seconds, self.stop)
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop tracing and drop the snapshots"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        tracemalloc.stop()
+        self._baseline = None
+        self._started_at = None
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": self.tracing,
+            "started_at": self._started_at,
+            "traced_bytes": current,
+            "peak_traced_bytes": peak
+        }
+
+    async def diff(self, limit: int = 25, key: str = "lineno", rebase: bool = False) -> Dict[str, Any]:
+        """
+        Top allocation sites by growth since the baseline
+        Args:
+            limit: Sites returned
+            key: Group by "lineno", "filename" or "traceback"
+            rebase: Make this snapshot the baseline of the next diff
+        Raises:
+            RuntimeError: If tracing isn't running
+        """
+        if not self.tracing or self._baseline is None:
+            raise RuntimeError("memory tracing is not running")
+        baseline = self._baseline
+        snapshot = await asyncio.to_thread(self._snapshot)
+        stats = await asyncio.to_thread(snapshot.compare_to, baseline, key)
+        if rebase:
+            self._baseline = snapshot
+        return {
+            **self.status(),
+            "total_growth_bytes": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                    "size_bytes": stat.size,
+                    "size_diff_bytes": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff
+                }
+                for stat in stats[:limit]
+            ]
+        }
+
+async def measure_loop_lag(samples: int = 50, interval: float = 0.01) -> Dict[str, float]:
+    """
+    Event loop lag: how late short sleeps wake up
+    Measured only while this runs; nothing watches the loop otherwise.
+    Args:
+        samples: Sleeps measured
+        interval: Length of each sleep in seconds
+    Returns:
+        Lag percentiles and maximum in milliseconds
+    """
+    lags = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - start - interval) * 1000)
+    lags.sort()
+    return {
+        "samples": samples,
+        "p50_ms": round(statistics.median(lags), 3),
+        "p95_ms": round(lags[int(0.95 * (len(lags) - 1))], 3),
+        "max_ms": round(lags[-1], 3)
+    }
+
+def _coroutine_name(task: asyncio.Task) -> str:
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+def _await_chain(coro: Any, depth: int) -> List[str]:
+    """Where a suspended task waits: its coroutine and those it awaits, outermost first"""
+    chain = []
+    while coro is not None and len(chain) < depth:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        chain.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return chain
+
+def task_summary(limit: int = 20, stack_depth: int = 0) -> Dict[str, Any]:
+    """
+    Outstanding asyncio tasks of the running loop, grouped by coroutine
+    Args:
+        limit: Groups returned, largest first
+        stack_depth: Frames of one example task's stack per group; 0 for none
+    """
+    current = asyncio.current_task()
+    groups: Dict[str, List[asyncio.Task]] = {}
+    for task in asyncio.all_tasks():
+        if task is not current:
+            groups.setdefault(_coroutine_name(task), []).append(task)
+
+    top = []
+    for name, tasks in sorted(groups.items(), key=lambda item: -len(item[1]))[:limit]:
+        group: Dict[str, Any] = {"coroutine": name, "count": len(tasks)}
+        if stack_depth:
+            group["example_stack"] = _await_chain(tasks[0].get_coro(), stack_depth)
+        top.append(group)
+    return {"total": sum(len(tasks) for tasks in groups.values()), "groups": top}
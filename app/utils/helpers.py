@@ -2,8 +2,9 @@
 
 import uuid
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Union
 import re
+from itertools import islice
 
 def generate_uuid() -> str:
     """Generate a unique identifier"""
@@ -22,6 +23,50 @@ def parse_timestamp(ts: str) -> datetime:
     except (ValueError, TypeError):
         return datetime.utcnow()
 
+def normalize_query(text: str) -> str:
+    """
+    Normalize a question for use in cache keys
+    Args:
+        text: Raw question text
+    Returns:
+        Lowercased text with whitespace collapsed
+    """
+    return " ".join(text.lower().split())
+
+# Slack limits: section block text and total message text
+SLACK_BLOCK_TEXT_LIMIT = 3000
+SLACK_MESSAGE_TEXT_LIMIT = 40000
+
+_FENCE = "```"
+_LIST_ITEM = re.compile(r'^\s*(?:[-*+]|\d{1,9}[.)])\s')
+_LIST_MARKERS = frozenset('-*+0123456789')
+# Lines that can't open a fence, a list item or a continuation line
+_LINE_STARTS = frozenset('`-*+0123456789 \t')
+_LINE_SLAB_SIZE = 64 * 1024
+
+# Single alternation so every construct is converted in one scan. Code is
+# matched first so nothing inside a code span or fence is ever rewritten.
+# Lookbehinds follow the literal that opens their branch, so the scan can
+# skip ahead to candidate characters instead of trying every position.
+# `__` only marks bold outside words and around more than an identifier,
+# so names like __init__ are left alone.
+_MRKDWN_PATTERN = re.compile(
+    r'(?P<fence>```(?P<fence_lang>[\w+#.-]*\n)?(?P<fence_body>.*?)```)'
+    r'|(?P<code>`[^`\n]+`)'
+    r'|(?P<slack_link><https?://[^>\s]+>)'
+    r'|(?P<mention><@(?P<mention_id>[A-Z0-9]+)>)'
+    r'|(?P<md_link>\[(?P<md_label>[^\]\n]+)\]\((?P<md_url>https?://[^)\s]+)\))'
+    r'|(?P<heading>^[ \t]{0,3}#{1,6}[ \t]+(?P<heading_text>[^\n]*?)[ \t#]*$)'
+    r'|(?P<bold>\*\*(?P<bold_text>[^\n]+?)\*\*|__(?<!\w__)(?!\w+__(?!\w))(?P<bold_alt>[^\n]+?)__(?!\w))'
+    r'|(?P<strike>~~(?P<strike_text>[^\n]+?)~~)'
+    r'|(?P<italic>\*(?<![*\w]\*)(?![\s*])(?P<italic_text>[^*\n]+?)(?<!\s)\*(?![*\w]))',
+    re.DOTALL | re.MULTILINE
+)
+
+# Deleting control characters through a translation table stays on the
+# str.translate ASCII fast path; the multi-character HTML escapes don't
+_CONTROL_CHARS_TABLE = str.maketrans({code: None for code in range(32) if code != ord('\n')})
+
 def format_slack_message(
     text: str,
     code_blocks: bool = True,
@@ -29,34 +74,183 @@ def format_slack_message(
     mentions: bool = True
 ) -> str:
     """
-    Format text for Slack messaging
+    Convert Markdown to Slack mrkdwn in a single pass
     Args:
         text: Input text
-        code_blocks: Format code blocks
-        links: Format links
-        mentions: Format mentions
+        code_blocks: Normalize code fences (drop language hints)
+        links: Convert Markdown links to Slack links
+        mentions: Flatten user mentions so they don't ping
     Returns:
         Formatted text
     """
-    # Format code blocks
-    if code_blocks:
-        text = re.sub(r'```(.*?)```', r'```\1```', text, flags=re.DOTALL)
-        text = re.sub(r'`([^`]+)`', r'`\1`', text)
-    
-    # Format links
-    if links:
-        text = re.sub(r'<(https?://[^|>]+)\|([^>]+)>', r'\2', text)
-        text = re.sub(r'<(https?://[^>]+)>', r'\1', text)
-    
-    # Format mentions
-    if mentions:
-        text = re.sub(r'<@([A-Z0-9]+)>', r'@\1', text)
-    
-    return text
+    def replace(match: 're.Match[str]') -> str:
+        kind = match.lastgroup
+        if kind == 'fence':
+            if code_blocks and match.group('fence_lang'):
+                return f"```\n{match.group('fence_body')}```"
+            return match.group(0)
+        if kind == 'mention':
+            return f"@{match.group('mention_id')}" if mentions else match.group(0)
+        if kind == 'md_link':
+            if links:
+                return f"<{match.group('md_url')}|{match.group('md_label')}>"
+            return match.group(0)
+        if kind == 'heading':
+            return f"*{match.group('heading_text')}*"
+        if kind == 'bold':
+            return f"*{match.group('bold_text') or match.group('bold_alt')}*"
+        if kind == 'strike':
+            return f"~{match.group('strike_text')}~"
+        if kind == 'italic':
+            return f"_{match.group('italic_text')}_"
+        # Inline code and existing Slack links pass through untouched
+        return match.group(0)
+
+    return _MRKDWN_PATTERN.sub(replace, text)
+
+def _iter_lines(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    """Yield complete lines from a string or a stream of text fragments"""
+    fragments: Iterable[str] = source
+    if isinstance(source, str):
+        # Split in slabs so the first lines are available without a full scan
+        fragments = (
+            source[start:start + _LINE_SLAB_SIZE]
+            for start in range(0, len(source), _LINE_SLAB_SIZE)
+        )
+
+    pending: List[str] = []
+    for fragment in fragments:
+        lines = fragment.split('\n')
+        if len(lines) == 1:
+            pending.append(fragment)
+            continue
+        pending.append(lines[0])
+        yield ''.join(pending)
+        yield from islice(lines, 1, len(lines) - 1)
+        pending = [lines[-1]]
+    yield ''.join(pending)
+
+def _split_line(line: str, width: int) -> Iterator[str]:
+    """Hard-split a line longer than width, preferring whitespace boundaries"""
+    if len(line) <= width:
+        yield line
+        return
+
+    start = 0
+    while len(line) - start > width:
+        cut = line.rfind(' ', start + 1, start + width)
+        if cut <= start:
+            yield line[start:start + width]
+            start += width
+        else:
+            yield line[start:cut]
+            start = cut + 1
+    yield line[start:]
+
+def _has_text(parts: List[str]) -> bool:
+    """Whether chunk lines hold more than blank lines and code fences"""
+    return any(part.strip() and not part.lstrip().startswith(_FENCE) for part in parts)
+
+def _render_chunk(
+    parts: List[str],
+    in_fence: bool,
+    chunk_prefix: str,
+    chunk_suffix: str
+) -> str:
+    """Join chunk lines, closing a code fence left open at the split"""
+    body = '\n'.join(parts).rstrip().lstrip('\n')
+    if in_fence:
+        body += '\n' + _FENCE
+    return chunk_prefix + body + chunk_suffix
+
+def iter_message_chunks(
+    message: Union[str, Iterable[str]],
+    max_length: int = SLACK_BLOCK_TEXT_LIMIT,
+    chunk_prefix: str = "",
+    chunk_suffix: str = ""
+) -> Iterator[str]:
+    """
+    Lazily split a long message into Slack-sized chunks
+    Args:
+        message: Message text, or a stream of text fragments
+        max_length: Maximum chunk length
+        chunk_prefix: Prefix for each chunk
+        chunk_suffix: Suffix for each chunk
+    Yields:
+        Message chunks, as soon as each one is complete
+    """
+    if isinstance(message, str) and len(message) <= max_length:
+        if message.strip():
+            yield message
+        return
+
+    fence_overhead = len(_FENCE) + 1
+    # Always leave room to close a code fence that is open at the split
+    limit = max_length - len(chunk_prefix) - len(chunk_suffix) - fence_overhead
+    width = limit - fence_overhead
+    if width <= 0:
+        raise ValueError("max_length is too small for the chunk prefix and suffix")
+
+    parts: List[str] = []
+    size = 0
+    in_fence = False
+    # Index in parts of the list item being built, so it can move as a whole
+    item_start = -1
+    for line in _iter_lines(message):
+        if line[:1] not in _LINE_STARTS:
+            # Fast path for plain prose
+            is_fence = False
+            item_start = -1
+        elif in_fence:
+            is_fence = _FENCE in line and line.lstrip().startswith(_FENCE)
+        else:
+            stripped = line.lstrip()
+            is_fence = stripped.startswith(_FENCE)
+            if is_fence:
+                item_start = -1
+            elif stripped[:1] in _LIST_MARKERS and _LIST_ITEM.match(line):
+                item_start = len(parts)
+            elif not stripped or line[0] not in ' \t':
+                # Only indented continuation lines stay attached to a list item
+                item_start = -1
+
+        if not is_fence and size + len(line) < limit:
+            # Most lines fit the current chunk whole
+            parts.append(line)
+            size += len(line) + 1
+            continue
+        for piece in (line,) if len(line) <= width else _split_line(line, width):
+            if parts and size + len(piece) + 1 > limit:
+                carry: List[str] = []
+                if item_start > 0 and not in_fence:
+                    carry = parts[item_start:]
+                    del parts[item_start:]
+                # Runs of blank lines are dropped rather than sent as empty chunks
+                if _has_text(parts):
+                    yield _render_chunk(parts, in_fence, chunk_prefix, chunk_suffix)
+                if carry and sum(len(part) + 1 for part in carry) + len(piece) + 1 > limit:
+                    # The item doesn't fit with its next line either; send it alone
+                    yield _render_chunk(carry, False, chunk_prefix, chunk_suffix)
+                    carry = []
+                parts = [_FENCE] + carry if in_fence else carry
+                size = sum(len(part) + 1 for part in parts)
+                item_start = 0 if carry else -1
+
+            if in_fence and parts == [_FENCE] and is_fence:
+                # The fence closes right at the split; don't emit an empty block
+                parts, size, in_fence = [], 0, False
+                continue
+            parts.append(piece)
+            size += len(piece) + 1
+            if is_fence:
+                in_fence = not in_fence
+
+    if _has_text(parts):
+        yield _render_chunk(parts, in_fence, chunk_prefix, chunk_suffix)
 
 def chunk_message(
     message: str,
-    max_length: int = 3000,
+    max_length: int = SLACK_BLOCK_TEXT_LIMIT,
     chunk_prefix: str = "",
     chunk_suffix: str = ""
 ) -> List[str]:
@@ -70,27 +264,17 @@ def chunk_message(
     Returns:
         List of message chunks
     """
-    if len(message) <= max_length:
-        return [message]
-    
-    chunks = []
-    current_chunk = ""
-    
-    # Split on newlines if possible
-    lines = message.split('\n')
-    
-    for line in lines:
-        if len(current_chunk) + len(line) + 1 <= max_length:
-            current_chunk += line + '\n'
-        else:
-            if current_chunk:
-                chunks.append(chunk_prefix + current_chunk.rstrip() + chunk_suffix)
-            current_chunk = line + '\n'
-    
-    if current_chunk:
-        chunks.append(chunk_prefix + current_chunk.rstrip() + chunk_suffix)
-    
-    return chunks
+    return list(iter_message_chunks(message, max_length, chunk_prefix, chunk_suffix))
+
+def slack_reply_chunks(text: str) -> List[str]:
+    """
+    Reply text as Slack mrkdwn, split into messages Slack won't truncate
+    Args:
+        text: Markdown reply, e.g. a generated answer
+    Returns:
+        Message texts of at most SLACK_MESSAGE_TEXT_LIMIT characters, in order
+    """
+    return chunk_message(format_slack_message(text), SLACK_MESSAGE_TEXT_LIMIT)
 
 def format_error_message(error: Exception, include_trace: bool = False) -> str:
     """
@@ -119,18 +303,16 @@ def sanitize_text(text: str) -> str:
         Sanitized text
     """
     # Remove control characters
-    text = ''.join(char for char in text if ord(char) >= 32 or char == '\n')
-    
+    text = text.translate(_CONTROL_CHARS_TABLE)
+
     # Basic HTML escape
-    text = (
+    return (
         text.replace('&', '&amp;')
         .replace('<', '&lt;')
         .replace('>', '&gt;')
         .replace('"', '&quot;')
         .replace("'", '&#39;')
     )
-    
-    return text
 
 def parse_slack_metadata(
     metadata: Dict[str, Any]
@@ -1,49 +1,205 @@
 # app/utils/logger.py
 
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional, Tuple
+import json
 import logging
+import queue
 import sys
-from typing import Optional
+import threading
+import time
+import uuid
+
 from ..config import get_settings
 
 settings = get_settings()
 
+# Correlation IDs for the request being handled; asyncio tasks inherit them
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+trace_id_var: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "trace_id"
+}
+
+_listener: Optional[QueueListener] = None
+_configure_lock = threading.Lock()
+
+def bind_request_context(
+    request_id: Optional[str] = None,
+    trace_id: Optional[str] = None
+) -> str:
+    """
+    Set correlation IDs for the current request
+    Args:
+        request_id: Request ID, generated if not given
+        trace_id: Distributed trace ID, if the caller sent one
+    Returns:
+        The request ID in effect
+    """
+    request_id = request_id or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    trace_id_var.set(trace_id)
+    return request_id
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "trace_id": getattr(record, "trace_id", None)
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Caps how often the same error is logged
+
+    Errors are keyed by logger and message template; beyond `limit` per
+    `interval` seconds they are dropped, and the next one let through
+    reports how many were suppressed.
+    """
+
+    def __init__(self, limit: int, interval: float, level: int = logging.ERROR):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.level = level
+        self._windows: Dict[Tuple[str, Any], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level or self.limit <= 0:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            # [window start, count in window, suppressed since last emit]
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, suppressed]
+                if len(self._windows) > 10000:
+                    self._windows = {key: window}
+            if window[1] >= self.limit:
+                window[2] += 1
+                return False
+            window[1] += 1
+            if window[2]:
+                record.suppressed = window[2]
+                window[2] = 0
+        return True
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the background writer without blocking the caller
+
+    Only the message interpolation and correlation IDs are resolved on the
+    calling thread; formatting and I/O happen on the writer thread. When the
+    queue is full the record is dropped and counted instead of waiting.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.request_id = request_id_var.get()
+        record.trace_id = trace_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def configure_logging() -> None:
+    """
+    Route all logging through a queue drained by a background writer thread
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        if settings.LOG_FORMAT == "json":
+            formatter: logging.Formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+            )
+
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if settings.LOG_FILE:
+            handlers.append(RotatingFileHandler(
+                settings.LOG_FILE,
+                maxBytes=settings.LOG_FILE_MAX_BYTES,
+                backupCount=settings.LOG_FILE_BACKUP_COUNT
+            ))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(
+            limit=settings.LOG_ERROR_RATE_LIMIT,
+            interval=settings.LOG_ERROR_RATE_INTERVAL
+        ))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
 def setup_logger(
     name: str,
     level: Optional[int] = None,
     format_string: Optional[str] = None
 ) -> logging.Logger:
     """
-    Setup a logger with standard configuration
+    Get a logger that writes through the shared logging pipeline
     Args:
         name: Logger name
-        level: Logging level
-        format_string: Custom format string
+        level: Logging level, defaults to LOG_LEVEL
+        format_string: Ignored; kept for compatibility, the pipeline formats records
     Returns:
         Configured logger
     """
+    configure_logging()
     logger = logging.getLogger(name)
-    
-    if level is None:
-        level = logging.DEBUG if settings.DEBUG_MODE else logging.INFO
-    logger.setLevel(level)
-    
-    if not format_string:
-        format_string = (
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-            if settings.DEBUG_MODE
-            else '%(levelname)s - %(message)s'
-        )
-    
-    # Create handler if none exists
-    if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(logging.Formatter(format_string))
-        logger.addHandler(handler)
-        
-        # Add file handler in debug mode
-        if settings.DEBUG_MODE:
-            file_handler = logging.FileHandler('app.log')
-            file_handler.setFormatter(logging.Formatter(format_string))
-            logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
+    if level is not None:
+        logger.setLevel(level)
+    return logger
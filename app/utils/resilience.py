@@ -0,0 +1,258 @@
+# app/utils/resilience.py
+
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import asyncio
+import logging
+import threading
+import time
+
+from ..config import get_settings
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+requests_total = get_metrics().counter(
+    "dependency_requests_total",
+    "Calls to external dependencies by outcome",
+    labels=("dependency", "outcome")
+)
+hedges_total = get_metrics().counter(
+    "dependency_hedges_total",
+    "Duplicate requests sent because the first exceeded the hedge delay",
+    labels=("dependency",)
+)
+hedge_wins_total = get_metrics().counter(
+    "dependency_hedge_wins_total",
+    "Hedged requests that finished before the original",
+    labels=("dependency",)
+)
+circuit_state = get_metrics().gauge(
+    "dependency_circuit_state",
+    "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+    labels=("dependency",)
+)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, dependency: str):
+        super().__init__(f"{dependency} is unavailable (circuit open)")
+        self.dependency = dependency
+
+class LatencyTracker:
+    """Rolling window of call latencies"""
+
+    def __init__(self, window: int):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int) -> Optional[float]:
+        """
+        Latency quantile over the window
+        Returns:
+            Seconds, or None until min_samples calls were seen
+        """
+        if len(self._samples) < max(min_samples, 1):
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency whose recent error rate is too high
+
+    Closed: calls pass, outcomes are tracked over a rolling window. Open:
+    calls are rejected until the cooldown passes. Half-open: one probe call
+    is let through; its success closes the circuit, its failure reopens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float,
+        min_calls: int,
+        window: int,
+        cooldown: float
+    ):
+        """
+        Initialize the breaker
+        Args:
+            name: Dependency name used in logs and metrics
+            failure_rate: Share of failed calls that opens the circuit
+            min_calls: Calls in the window before the rate is trusted
+            window: Number of recent calls tracked
+            cooldown: Seconds the circuit stays open before a probe
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        circuit_state.set(_STATE_VALUES[CLOSED], dependency=name)
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("Circuit for %s is now %s", self.name, state)
+        self.state = state
+        circuit_state.set(_STATE_VALUES[state], dependency=self.name)
+
+    def allow(self) -> bool:
+        """Whether a call may go out now"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of an allowed call"""
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if success:
+                self._outcomes.clear()
+                self._transition(CLOSED)
+            else:
+                self._open()
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+            self._open()
+
+    def release(self) -> None:
+        """Forget an allowed call that was cancelled before it finished"""
+        self._probing = False
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._transition(OPEN)
+
+class Dependency:
+    """
+    Guards calls to one external dependency
+
+    Calls that run past the rolling HEDGE_QUANTILE latency get a duplicate
+    request; whichever finishes first wins and the other is cancelled.
+    Failures feed a circuit breaker, so an unhealthy dependency is skipped
+    quickly instead of stalling every request.
+    """
+
+    def __init__(self, name: str, hedge: bool = True):
+        """
+        Initialize the dependency
+        Args:
+            name: Name used in logs and metrics
+            hedge: Send hedged duplicate requests; only for idempotent calls
+        """
+        self.name = name
+        self.hedge = hedge
+        self.latency = LatencyTracker(settings.LATENCY_WINDOW)
+        self.breaker = CircuitBreaker(
+            name,
+            failure_rate=settings.BREAKER_FAILURE_RATE,
+            min_calls=settings.BREAKER_MIN_CALLS,
+            window=settings.BREAKER_WINDOW,
+            cooldown=settings.BREAKER_COOLDOWN_SECONDS
+        )
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None to never hedge"""
+        if not self.hedge:
+            return None
+        delay = self.latency.quantile(settings.HEDGE_QUANTILE, settings.HEDGE_MIN_SAMPLES)
+        if delay is None:
+            return None
+        return max(delay, settings.HEDGE_MIN_DELAY_MS / 1000)
+
+    async def _attempt(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """One request, recording its own latency for the hedge delay"""
+        start = time.monotonic()
+        result = await factory()
+        self.latency.add(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, factory: Callable[[], Awaitable[T]], delay: float) -> T:
+        """Run the call, duplicating it if it outlasts the delay"""
+        primary = asyncio.ensure_future(self._attempt(factory))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            hedges_total.inc(dependency=self.name)
+            backup = asyncio.ensure_future(self._attempt(factory))
+            pending.add(backup)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            hedge_wins_total.inc(dependency=self.name)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Call the dependency
+        Args:
+            factory: Coroutine function making the request; may be called twice
+        Returns:
+            Result of the first request to succeed
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.breaker.allow():
+            requests_total.inc(dependency=self.name, outcome="rejected")
+            raise CircuitOpenError(self.name)
+        try:
+            delay = self.hedge_delay() if settings.HEDGE_ENABLED else None
+            if delay is None:
+                result = await self._attempt(factory)
+            else:
+                result = await self._hedged(factory, delay)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(False)
+            requests_total.inc(dependency=self.name, outcome="error")
+            raise
+        self.breaker.record(True)
+        requests_total.inc(dependency=self.name, outcome="success")
+        return result
+
+_dependencies: Dict[str, Dependency] = {}
+_lock = threading.Lock()
+
+def get_dependency(name: str) -> Dependency:
+    """
+    Process-wide guard for a dependency, so every caller shares its state
+    Hedging is enabled for the names in HEDGE_DEPENDENCIES.
+    """
+    with _lock:
+        if name not in _dependencies:
+            _dependencies[name] = Dependency(name, hedge=name in settings.HEDGE_DEPENDENCIES)
+        return _dependencies[name]
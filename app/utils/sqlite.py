@@ -0,0 +1,16 @@
+# app/utils/sqlite.py
+
+import sqlite3
+
+class Transaction:
+    """Context manager for an IMMEDIATE transaction on an autocommit connection"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
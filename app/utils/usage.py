@@ -0,0 +1,263 @@
+# app/utils/usage.py
+
+from google.cloud import firestore
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+from ..config import get_settings
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+USAGE_COLLECTION = 'usage'
+# Totals kept per hour, user, channel and model
+FIELDS = ('requests', 'prompt_tokens', 'completion_tokens', 'cached_tokens', 'embedding_tokens', 'wall_seconds')
+DIMENSIONS = ('hour', 'user_id', 'channel_id', 'model')
+# Stands in for the user, channel or model of usage outside a request
+UNATTRIBUTED = '-'
+
+request_seconds = get_metrics().histogram(
+    "request_wall_seconds",
+    "Wall time of answered questions, from retrieval to the generated answer",
+    labels=("model",),
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 30, 60)
+)
+
+UsageKey = Tuple[str, str, str, str]
+
+class _Scope:
+    """The request usage is attributed to; `model` is set once it is known"""
+    __slots__ = ('user_id', 'channel_id', 'model')
+
+    def __init__(self, user_id: Optional[str], channel_id: Optional[str]):
+        self.user_id = user_id or UNATTRIBUTED
+        self.channel_id = channel_id or UNATTRIBUTED
+        self.model = UNATTRIBUTED
+
+scope_var: ContextVar[Optional[_Scope]] = ContextVar("usage_scope", default=None)
+
+_encoding: Any = None
+_encoding_loading = threading.Lock()
+
+def _load_encoding() -> None:
+    global _encoding
+    try:
+        import tiktoken
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Downloaded on first use; estimates are used until it is available
+        logger.warning("Token counts are estimated, tiktoken unavailable: %s", e)
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens of a text for the embedding models (cl100k_base)
+    The encoding loads in a background thread; until then, and if it can't
+    be loaded, the count is estimated at four characters per token.
+    """
+    encoding = _encoding
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    if _encoding_loading.acquire(blocking=False):
+        threading.Thread(target=_load_encoding, name="tiktoken-loader", daemon=True).start()
+    return (len(text) + 3) // 4
+
+def usage_cost(model: str, totals: Dict[str, float]) -> float:
+    """USD cost of a model's token totals at MODEL_PRICES (per million tokens)"""
+    prices = settings.MODEL_PRICES.get(model)
+    if not prices:
+        return 0.0
+    cached = totals.get('cached_tokens', 0)
+    return (
+        (totals.get('prompt_tokens', 0) - cached) * prices.get('prompt', 0.0)
+        + cached * prices.get('cached', prices.get('prompt', 0.0))
+        + totals.get('completion_tokens', 0) * prices.get('completion', 0.0)
+        + totals.get('embedding_tokens', 0) * prices.get('embedding', 0.0)
+    ) / 1_000_000
+
+class UsageTracker:
+    """
+    Token usage and wall time by hour, user, channel and model
+
+    Usage is added to in-memory totals as it is reported, attributed to
+    the request in the current context (see track()). Every flush interval,
+    the totals are written to the `usage` collection as increments in
+    batched writes, so every process and host adds to the same documents
+    and a request costs no Firestore write of its own.
+    """
+
+    def __init__(self, flush_interval: float = settings.USAGE_FLUSH_SECONDS):
+        """
+        Initialize the tracker
+        Args:
+            flush_interval: Seconds between writes to Firestore
+        """
+        self.flush_interval = flush_interval
+        self._totals: Dict[UsageKey, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[firestore.Client] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, model: str, **amounts: float) -> None:
+        """
+        Add usage of a model to the current request's totals
+        Args:
+            model: Model that was called
+            amounts: Values of FIELDS to add, e.g. prompt_tokens=812
+        """
+        scope = scope_var.get()
+        key = (
+            time.strftime("%Y-%m-%dT%H", time.gmtime()),
+            scope.user_id if scope else UNATTRIBUTED,
+            scope.channel_id if scope else UNATTRIBUTED,
+            model or UNATTRIBUTED
+        )
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = dict.fromkeys(FIELDS, 0)
+            for field, amount in amounts.items():
+                totals[field] += amount
+
+    @contextmanager
+    def track(self, user_id: Optional[str], channel_id: Optional[str]) -> Iterator[_Scope]:
+        """
+        Attribute usage in this context to a user and channel
+        On exit the request and its wall time are counted under the model
+        set on the yielded scope.
+        """
+        scope = _Scope(user_id, channel_id)
+        token = scope_var.set(scope)
+        started = time.perf_counter()
+        try:
+            yield scope
+        finally:
+            elapsed = time.perf_counter() - started
+            self.record(scope.model, requests=1, wall_seconds=elapsed)
+            request_seconds.observe(elapsed, model=scope.model)
+            scope_var.reset(token)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Totals not yet written to Firestore"""
+        with self._lock:
+            return [
+                {**dict(zip(DIMENSIONS, key)), **totals}
+                for key, totals in self._totals.items()
+            ]
+
+    def _collection(self) -> firestore.CollectionReference:
+        if self._db is None:
+            self._db = firestore.Client(project=settings.PROJECT_ID)
+        return self._db.collection(USAGE_COLLECTION)
+
+    async def flush(self) -> int:
+        """
+        Write the in-memory totals to Firestore
+        Totals that fail to be written are kept for the next flush.
+        Returns:
+            Number of documents updated
+        """
+        with self._lock:
+            totals, self._totals = self._totals, {}
+        if not totals:
+            return 0
+
+        items = list(totals.items())
+        written = 0
+        try:
+            collection = self._collection()
+            for start in range(0, len(items), 500):
+                batch = self._db.batch()
+                for key, values in items[start:start + 500]:
+                    doc_id = '|'.join(key).replace('/', '_')
+                    batch.set(collection.document(doc_id), {
+                        **dict(zip(DIMENSIONS, key)),
+                        **{field: firestore.Increment(value) for field, value in values.items() if value}
+                    }, merge=True)
+                commit = asyncio.ensure_future(asyncio.to_thread(batch.commit))
+                try:
+                    await asyncio.shield(commit)
+                except asyncio.CancelledError:
+                    # The commit goes on in its thread; wait to know whether it was written
+                    await asyncio.wait([commit])
+                    if commit.exception() is None:
+                        written = start + len(items[start:start + 500])
+                    raise
+                written = start + len(items[start:start + 500])
+        except BaseException:
+            # Committed batches are not retried, or they would be counted
+            # twice; the rest is kept, also when cancelled during stop()
+            with self._lock:
+                for key, values in items[written:]:
+                    current = self._totals.setdefault(key, dict.fromkeys(FIELDS, 0))
+                    for field, value in values.items():
+                        current[field] += value
+            raise
+        return written
+
+    async def query(self, since: str, group_by: Sequence[str] = DIMENSIONS) -> List[Dict[str, Any]]:
+        """
+        Usage since an hour, stored and pending, grouped with its cost
+        Args:
+            since: First hour included, e.g. 2024-05-01T00
+            group_by: DIMENSIONS to group by; cost needs the model
+        Returns:
+            Totals per group with cost_usd, most expensive first
+        """
+        docs = await asyncio.to_thread(self._collection().where('hour', '>=', since).get)
+        rows = [doc.to_dict() for doc in docs] + [row for row in self.pending() if row['hour'] >= since]
+
+        groups: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        for row in rows:
+            key = tuple(row.get(dimension, UNATTRIBUTED) for dimension in group_by)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {**dict(zip(group_by, key)), **dict.fromkeys(FIELDS, 0), 'cost_usd': 0.0}
+            for field in FIELDS:
+                group[field] += row.get(field, 0)
+            group['cost_usd'] += usage_cost(row.get('model', UNATTRIBUTED), row)
+        for group in groups.values():
+            group['cost_usd'] = round(group['cost_usd'], 6)
+            group['wall_seconds'] = round(group['wall_seconds'], 3)
+        return sorted(groups.values(), key=lambda group: -group['cost_usd'])
+
+    async def _run(self) -> None:
+        """Flush until cancelled"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Error flushing usage: %s", e)
+
+    def start(self) -> None:
+        """Start flushing in the background"""
+        if self._task is None and self.flush_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop background flushes and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Error flushing usage: %s", e)
+
+@lru_cache()
+def get_usage_tracker() -> UsageTracker:
+    """Create and cache the usage tracker of this process"""
+    return UsageTracker()
@@ -0,0 +1,115 @@
+# app/utils/warmup.py
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Warmup:
+    """
+    Runs startup warmup steps and tracks readiness
+
+    Steps run concurrently, each under its own timeout. A failed optional
+    step is reported but doesn't keep the service unready; a failed
+    required step is retried until it succeeds, and the service reports
+    not ready until then.
+    """
+
+    def __init__(self, step_timeout: float = 20.0, retry_interval: float = 5.0):
+        """
+        Initialize warmup
+        Args:
+            step_timeout: Seconds each step may take before it is abandoned
+            retry_interval: Seconds between retries of failed required steps
+        """
+        self.step_timeout = step_timeout
+        self.retry_interval = retry_interval
+        self.steps: List[Tuple[str, Callable[[], Awaitable[Any]]]] = []
+        self.required: Set[str] = set()
+        self.status: Dict[str, Dict[str, Any]] = {}
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+
+    def add_step(self, name: str, step: Callable[[], Awaitable[Any]], required: bool = False) -> None:
+        """
+        Register a warmup step
+        Args:
+            name: Step name used in reports
+            step: Coroutine function performing the step
+            required: Whether the service can't serve until the step succeeds
+        """
+        self.steps.append((name, step))
+        self.status[name] = {"state": "pending", "required": required}
+        if required:
+            self.required.add(name)
+
+    async def _run_step(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        """Run one step and record its outcome"""
+        attempts = self.status[name].get("attempts", 0) + 1
+        self.status[name] = {"state": "running", "required": name in self.required, "attempts": attempts}
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(step(), timeout=self.step_timeout)
+            self.status[name]["state"] = "done"
+            if result is not None:
+                self.status[name]["result"] = result
+        except asyncio.TimeoutError:
+            self.status[name]["state"] = "timeout"
+        except Exception as e:
+            self.status[name].update(state="failed", error=str(e))
+
+        self.status[name]["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        finished = sum(1 for status in self.status.values() if "duration_ms" in status)
+        logger.info(
+            "Warmup step %s %s in %.0f ms (%d/%d)",
+            name,
+            self.status[name]["state"],
+            self.status[name]["duration_ms"],
+            finished,
+            len(self.steps)
+        )
+
+    def _failed_required(self) -> List[Tuple[str, Callable[[], Awaitable[Any]]]]:
+        """Required steps that failed or timed out"""
+        return [
+            (name, step) for name, step in self.steps
+            if name in self.required and self.status[name]["state"] != "done"
+        ]
+
+    async def run(self) -> None:
+        """Run all steps, retrying required ones until they succeed, then mark the service ready"""
+        self.started_at = time.time()
+        start = time.perf_counter()
+        logger.info("Warmup started with %d steps", len(self.steps))
+
+        await asyncio.gather(*(self._run_step(name, step) for name, step in self.steps))
+        failed = self._failed_required()
+        while failed:
+            logger.warning(
+                "Required warmup steps failed (%s); service stays unready, retrying in %.0f s",
+                ", ".join(name for name, _ in failed),
+                self.retry_interval
+            )
+            await asyncio.sleep(self.retry_interval)
+            await asyncio.gather(*(self._run_step(name, step) for name, step in failed))
+            failed = self._failed_required()
+
+        self.duration = time.perf_counter() - start
+        self.ready = True
+        logger.info("Warmup finished in %.0f ms; service is ready", self.duration * 1000)
+
+    def mark_ready(self) -> None:
+        """Mark the service ready without warming up"""
+        self.ready = True
+
+    def report(self) -> Dict[str, Any]:
+        """Readiness and per-step progress"""
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+            "steps": self.status
+        }
@@ -0,0 +1,175 @@
+# app/worker.py
+
+"""
+Answer queued /ask questions.
+
+With TASK_QUEUE_ENABLED, the web process only acknowledges /ask and queues
+the question in the task queue at TASK_QUEUE_PATH; worker processes on the
+same host lease questions, answer them and post the replies. Run as many
+as the LLM traffic needs, independently of the web tier:
+
+    python -m app.worker
+"""
+
+from typing import Optional, Set
+import asyncio
+import signal
+import time
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from .config import get_settings
+from .slack.handlers import CommandHandler
+from .slack.handlers.command import ASK_QUEUE
+from .tasks import Task, TaskQueue, get_task_queue
+from .tasks.queue import DEAD
+from .utils import setup_logger, shutdown_logging
+from .utils.helpers import slack_reply_chunks
+from .utils.usage import get_usage_tracker
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+ERROR_MESSAGE = "Sorry, I encountered an error processing your question."
+
+class AnswerWorker:
+    """
+    Leases /ask questions from the task queue and answers them
+
+    Leases are extended while a question is being answered, so the
+    visibility timeout only has to cover a stalled or dead worker. On
+    shutdown, no new questions are leased and running ones are given until
+    the visibility timeout to finish; any left are retried by another worker.
+    """
+
+    def __init__(
+        self,
+        queue: Optional[TaskQueue] = None,
+        command_handler: Optional[CommandHandler] = None,
+        client: Optional[AsyncWebClient] = None,
+        concurrency: int = settings.WORKER_CONCURRENCY
+    ):
+        """
+        Initialize the worker
+        Args:
+            queue: Task queue to lease from
+            command_handler: Answers the questions
+            client: Slack client posting the replies
+            concurrency: Questions answered at once
+        """
+        self.queue = queue or get_task_queue()
+        self.command_handler = command_handler or CommandHandler(task_queue=self.queue)
+        self.client = client or AsyncWebClient(token=settings.SLACK_BOT_TOKEN)
+        self.concurrency = max(1, concurrency)
+        self._stopping = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        """Lease and answer questions until stopped"""
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info("Worker started with %s slots", self.concurrency)
+        while not self._stopping.is_set():
+            await slots.acquire()
+            task = None
+            try:
+                task = await self.queue.lease(ASK_QUEUE)
+            except Exception as e:
+                logger.error("Error leasing task: %s", e)
+            if task is None:
+                slots.release()
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            running = asyncio.create_task(self._process(task))
+            self._running.add(running)
+            running.add_done_callback(self._running.discard)
+            running.add_done_callback(lambda _: slots.release())
+
+        if self._running:
+            logger.info("Waiting for %s questions to finish", len(self._running))
+            _, unfinished = await asyncio.wait(self._running, timeout=self.queue.visibility_timeout)
+            for running in unfinished:
+                running.cancel()
+
+    def stop(self) -> None:
+        """Stop leasing; run() returns once running questions are done"""
+        self._stopping.set()
+
+    async def _keep_leased(self, task: Task) -> None:
+        """Extend the lease while the question is being answered"""
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            if not await self.queue.extend(task):
+                logger.warning("Lost the lease of task %s", task.id)
+                return
+
+    async def _post(self, task: Task, text: str) -> None:
+        await self.client.chat_postMessage(
+            channel=task.payload["channel_id"],
+            text=text,
+            thread_ts=task.payload.get("thread_ts")
+        )
+
+    async def _post_reply(self, task: Task) -> None:
+        """
+        Post the task's reply, recording each message sent on the task
+        A retry resumes after the last message posted, so a failed post
+        doesn't repeat the ones before it.
+        """
+        chunks = slack_reply_chunks(task.payload["reply"])
+        for index in range(task.payload.get("posted", 0), len(chunks)):
+            await self._post(task, chunks[index])
+            task.payload["posted"] = index + 1
+            await self.queue.update(task)
+
+    async def _process(self, task: Task) -> None:
+        """Answer one question and acknowledge it, or record the failure"""
+        heartbeat = asyncio.create_task(self._keep_leased(task))
+        try:
+            # The deadline starts when a worker picks the question up, so
+            # questions retried after a restart still get a full budget
+            if "reply" not in task.payload:
+                # Kept on the task, so a retry posts the same reply
+                task.payload["reply"] = await self.command_handler.answer(task.payload, time.time())
+                await self.queue.update(task)
+            await self._post_reply(task)
+        except Exception as e:
+            status = await self.queue.fail(task, str(e))
+            logger.error(
+                "Error answering task %s (attempt %s, now %s): %s", task.id, task.attempts, status, e
+            )
+            if status == DEAD:
+                try:
+                    await self._post(task, ERROR_MESSAGE)
+                except Exception as e:
+                    logger.error("Error posting failure of task %s: %s", task.id, e)
+            return
+        finally:
+            heartbeat.cancel()
+        if not await self.queue.ack(task):
+            logger.warning("Task %s was answered after its lease expired", task.id)
+        logger.info("Answered task %s in %.1fs since queued", task.id, time.time() - task.created_at)
+
+async def run_worker() -> None:
+    worker = AnswerWorker()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, worker.stop)
+    usage = get_usage_tracker()
+    usage.start()
+    try:
+        await worker.run()
+    finally:
+        await usage.stop()
+
+def main() -> None:
+    try:
+        asyncio.run(run_worker())
+    finally:
+        shutdown_logging()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_embedding_batching.py
+"""
+Throughput and latency of micro-batched versus individual query embeddings
+
+Queries are embedded through a stand-in with a fixed per-request overhead,
+a small per-text cost and a cap on concurrent requests (standing in for
+the rate limit), directly and through BatchingEmbeddings. Load is an open
+loop of Poisson arrivals at each rate, so queueing shows up in latency.
+
+    python -m benchmarks.bench_embedding_batching --rates 5,50,500 --seconds 5
+"""
+
+from typing import Dict, List
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from app.database.embeddings import BatchingEmbeddings
+
+class StandInEmbeddings(Embeddings):
+    """Simulated embedding API"""
+
+    def __init__(self, overhead: float, per_text: float, max_concurrent: int):
+        self.overhead = overhead
+        self.per_text = per_text
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.requests = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> List[float]:
+        raise NotImplementedError
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        async with self.slots:
+            self.requests += 1
+            await asyncio.sleep(self.overhead + self.per_text * len(texts))
+        return [[float(len(text))] for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+async def run_load(embedder: Embeddings, rate: float, seconds: float) -> Dict[str, float]:
+    """Open-loop Poisson arrivals at `rate` queries per second"""
+    latencies: List[float] = []
+
+    async def query(i: int) -> None:
+        start = time.perf_counter()
+        await embedder.aembed_query(f"question {i}")
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    started = time.perf_counter()
+    i = 0
+    while time.perf_counter() - started < seconds:
+        tasks.append(asyncio.create_task(query(i)))
+        i += 1
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000
+    }
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rates", default="5,50,500", help="Comma-separated arrival rates (queries/s)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--overhead-ms", type=float, default=60.0, help="Fixed cost per request")
+    parser.add_argument("--per-text-ms", type=float, default=0.5, help="Cost per text in a request")
+    parser.add_argument("--max-concurrent", type=int, default=8, help="Concurrent requests allowed")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+    random.seed(7)
+
+    print(f"{'rate':>6} {'mode':<9}{'qps':>8}{'p50 ms':>9}{'p95 ms':>9}{'requests':>10}")
+    for rate in (float(value) for value in args.rates.split(",")):
+        for mode in ("single", "batched"):
+            api = StandInEmbeddings(args.overhead_ms / 1000, args.per_text_ms / 1000, args.max_concurrent)
+            embedder = api if mode == "single" else BatchingEmbeddings(
+                api, args.max_batch, args.window_ms, args.max_concurrent
+            )
+            result = await run_load(embedder, rate, args.seconds)
+            print(
+                f"{rate:>6.0f} {mode:<9}{result['throughput']:>8.1f}{result['p50_ms']:>9.1f}"
+                f"{result['p95_ms']:>9.1f}{api.requests:>10}"
+            )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+# benchmarks/bench_embeddings.py
+"""
+Recall, memory and latency of reduced-dimension and quantized local indexes
+
+Builds a LocalVectorIndex for every combination of truncated dimension and
+precision over a fixture corpus, and measures recall@k against exact
+full-dimension float32 search, resident memory and per-query latency.
+
+The default corpus is synthetic: clustered unit vectors whose variance
+decays across dimensions, like Matryoshka-trained embeddings. Pass real
+embeddings exported as .npy files for decisions about production data.
+
+Memory is the resident size of the searchable vectors; full-precision
+rescoring vectors are memory-mapped unless --in-memory is given.
+
+    python -m benchmarks.bench_embeddings --docs 20000
+    python -m benchmarks.bench_embeddings --vectors docs.npy --queries queries.npy
+"""
+
+import argparse
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.database.local_index import PRECISIONS, LocalVectorIndex, truncate_embeddings
+
+def synthetic_corpus(
+    docs: int,
+    queries: int,
+    dimensions: int,
+    seed: int = 7
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors with information concentrated in leading dimensions"""
+    rng = np.random.default_rng(seed)
+    # Matryoshka-style spectrum: leading dimensions carry most of the signal
+    spectrum = (1.0 / np.sqrt(1.0 + np.arange(dimensions) / 64.0)).astype(np.float32)
+    centers = rng.standard_normal((max(docs // 50, 1), dimensions), dtype=np.float32)
+    labels = rng.integers(0, len(centers), docs)
+    corpus = centers[labels] + 0.8 * rng.standard_normal((docs, dimensions), dtype=np.float32)
+    corpus = truncate_embeddings(corpus * spectrum)
+
+    # Queries are paraphrases: noisy copies of random documents
+    picks = rng.integers(0, docs, queries)
+    noise = rng.standard_normal((queries, dimensions), dtype=np.float32) * spectrum
+    query_vectors = truncate_embeddings(corpus[picks] + 0.02 * noise)
+    return corpus, query_vectors
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """Ground truth: full-dimension float32 nearest neighbours"""
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+def evaluate(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    truth: List[set],
+    k: int,
+    dimensions: Optional[int],
+    precision: str,
+    rescore_factor: int,
+    mmap_dir: Optional[str]
+) -> Tuple[float, int, float, float]:
+    """Recall@k, resident bytes and p50/p95 latency in ms for one setting"""
+    index = LocalVectorIndex(
+        dimensions=dimensions,
+        precision=precision,
+        rescore_factor=rescore_factor,
+        full_precision_path=f"{mmap_dir}/{dimensions}-{precision}.npy" if mmap_dir else None
+    )
+    index.add([str(i) for i in range(len(corpus))], corpus)
+    memory = index.memory_bytes()
+    index.search(queries[0], k)
+
+    hits = 0
+    latencies = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(expected & {int(result["id"]) for result in results})
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return hits / (len(queries) * k), memory, float(p50), float(p95)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", help=".npy corpus embeddings (rows)")
+    parser.add_argument("--queries", help=".npy query embeddings (rows)")
+    parser.add_argument("--docs", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--source-dimensions", type=int, default=3072)
+    parser.add_argument("--dimensions", default="3072,1536,1024,512,256")
+    parser.add_argument("--precisions", default=",".join(PRECISIONS))
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--in-memory", action="store_true",
+        help="Keep rescoring vectors resident instead of memory-mapped"
+    )
+    args = parser.parse_args()
+
+    if args.vectors:
+        corpus = truncate_embeddings(np.load(args.vectors))
+        queries = truncate_embeddings(np.load(args.queries))
+    else:
+        corpus, queries = synthetic_corpus(args.docs, args.num_queries, args.source_dimensions)
+    truth = exact_top_k(corpus, queries, args.k)
+    print(f"corpus: {corpus.shape[0]} x {corpus.shape[1]}, {len(queries)} queries, k={args.k}")
+
+    dimensions = [int(value) for value in args.dimensions.split(",")]
+    precisions = args.precisions.split(",")
+    print(f"{'dims':>6} {'precision':<9}{'recall@k':>10}{'memory MB':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    with tempfile.TemporaryDirectory() as mmap_dir:
+        for dims in dimensions:
+            if dims > corpus.shape[1]:
+                continue
+            for precision in precisions:
+                recall, memory, p50, p95 = evaluate(
+                    corpus, queries, truth, args.k,
+                    dims, precision, args.rescore_factor,
+                    None if args.in_memory else mmap_dir
+                )
+                print(
+                    f"{dims:>6} {precision:<9}{recall:>10.3f}"
+                    f"{memory / 1024 / 1024:>11.1f}{p50:>9.2f}{p95:>9.2f}"
+                )
+
+if __name__ == "__main__":
+    main()
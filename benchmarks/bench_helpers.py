@@ -0,0 +1,131 @@
+# benchmarks/bench_helpers.py
+"""
+Microbenchmark for the Slack text pipeline in app/utils/helpers.py
+
+Compares the single-pass formatter, translate-based sanitizer and streaming
+chunker against the previous implementations on multi-megabyte inputs.
+
+    python -m benchmarks.bench_helpers --size-mb 4
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, List
+
+from app.utils.helpers import (
+    chunk_message,
+    format_slack_message,
+    iter_message_chunks,
+    sanitize_text
+)
+
+def legacy_format_slack_message(text: str) -> str:
+    """Previous pass-per-construct approach extended to the same conversions"""
+    text = re.sub(r'```[\w+#.-]*\n(.*?)```', r'```\n\1```', text, flags=re.DOTALL)
+    text = re.sub(r'`([^`]+)`', r'`\1`', text)
+    text = re.sub(r'<@([A-Z0-9]+)>', r'@\1', text)
+    text = re.sub(r'\[([^\]\n]+)\]\((https?://[^)\s]+)\)', r'<\2|\1>', text)
+    text = re.sub(r'^[ \t]{0,3}#{1,6}[ \t]+([^\n]*?)[ \t#]*$', r'*\1*', text, flags=re.MULTILINE)
+    text = re.sub(r'(?<![*\w])\*(?![\s*])([^*\n]+?)(?<!\s)\*(?![*\w])', r'_\1_', text)
+    text = re.sub(r'\*\*([^\n]+?)\*\*', r'*\1*', text)
+    text = re.sub(r'(?<!\w)__(?!\w+__(?!\w))([^\n]+?)__(?!\w)', r'*\1*', text)
+    text = re.sub(r'~~([^\n]+?)~~', r'~\1~', text)
+    return text
+
+def legacy_sanitize_text(text: str) -> str:
+    """Previous per-character implementation"""
+    text = ''.join(char for char in text if ord(char) >= 32 or char == '\n')
+    return (
+        text.replace('&', '&amp;')
+        .replace('<', '&lt;')
+        .replace('>', '&gt;')
+        .replace('"', '&quot;')
+        .replace("'", '&#39;')
+    )
+
+def legacy_chunk_message(message: str, max_length: int = 3000) -> List[str]:
+    """Previous string-concatenating implementation"""
+    if len(message) <= max_length:
+        return [message]
+    chunks = []
+    current_chunk = ""
+    for line in message.split('\n'):
+        if len(current_chunk) + len(line) + 1 <= max_length:
+            current_chunk += line + '\n'
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.rstrip())
+            current_chunk = line + '\n'
+    if current_chunk:
+        chunks.append(current_chunk.rstrip())
+    return chunks
+
+def build_corpus(size_bytes: int, seed: int = 7) -> str:
+    """Build a Markdown answer mixing prose, lists, links and code dumps"""
+    rng = random.Random(seed)
+    words = ["retrieval", "context", "answer", "slack", "thread", "vector",
+             "latency", "<@U0123ABC>", "**bold**", "`inline`", "a&b", "\t"]
+    blocks = []
+    size = 0
+    while size < size_bytes:
+        kind = rng.random()
+        if kind < 0.4:
+            block = " ".join(rng.choice(words) for _ in range(rng.randint(20, 80)))
+        elif kind < 0.6:
+            block = "\n".join(
+                f"- item {i} [doc](https://example.com/{i}) ~~old~~"
+                for i in range(rng.randint(3, 12))
+            )
+        elif kind < 0.7:
+            block = f"## Section {size}"
+        else:
+            body = "\n".join(
+                f"    value_{i} = compute({i}) * 2  # <tag>"
+                for i in range(rng.randint(10, 200))
+            )
+            block = f"```python\n{body}\n```"
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks)
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Return the best wall time of repeat runs in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = build_corpus(int(args.size_mb * 1024 * 1024))
+    print(f"input: {len(text) / 1024 / 1024:.2f} MB, {text.count(chr(10))} lines")
+
+    cases = [
+        ("format", lambda: legacy_format_slack_message(text),
+         lambda: format_slack_message(text)),
+        ("sanitize", lambda: legacy_sanitize_text(text),
+         lambda: sanitize_text(text)),
+        ("chunk", lambda: legacy_chunk_message(text),
+         lambda: chunk_message(text)),
+    ]
+    print(f"{'stage':<12}{'legacy ms':>12}{'new ms':>12}{'speedup':>10}")
+    for name, legacy, current in cases:
+        legacy_ms = measure(legacy, args.repeat)
+        current_ms = measure(current, args.repeat)
+        print(f"{name:<12}{legacy_ms:>12.1f}{current_ms:>12.1f}{legacy_ms / current_ms:>9.1f}x")
+
+    start = time.perf_counter()
+    first_chunk = next(iter_message_chunks(text))
+    first_ms = (time.perf_counter() - start) * 1000
+    print(f"time to first chunk: {first_ms:.2f} ms ({len(first_chunk)} chars)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/bench_messages.py
+"""
+Microbenchmark for the per-request message objects
+
+Replays the message work of one threaded request: the incoming event, the
+thread history rows from Firestore, history formatting and the response,
+once with pydantic Message models and once with MessageRecord tuples.
+Reports CPU time and memory allocated per request.
+
+    python -m benchmarks.bench_messages --history 10
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from app.models import Message, MessageRecord, MessageType
+from app.retrieval.context import ContextManager
+
+context_manager = ContextManager()
+
+def build_request(history: int) -> Dict[str, Any]:
+    """A Slack event and the thread history rows stored for it"""
+    thread_ts = "1700000000.000100"
+    rows = [
+        {
+            "id": f"{1700000000 + i:020d}-0000abcd",
+            "channel_id": "C0123456789",
+            "user_id": "BOT" if i % 2 else "U0123456789",
+            "message_type": "assistant" if i % 2 else "user",
+            "content": f"Message {i} about the quarterly planning document and its owners.",
+            "thread_ts": thread_ts,
+            "metadata": {"model_used": "gpt-4o"} if i % 2 else {},
+            "seq": 1700000000 + i,
+            "timestamp": datetime(2024, 1, 1, 12, 0, i % 60, tzinfo=timezone.utc)
+        }
+        for i in range(history)
+    ]
+    event = {
+        "ts": "1700000100.000200",
+        "channel": "C0123456789",
+        "user": "U0123456789",
+        "thread_ts": thread_ts,
+        "text": "Who owns the quarterly planning document?"
+    }
+    return {"event": event, "rows": rows}
+
+def with_models(request: Dict[str, Any]) -> Any:
+    """Message handling with pydantic models, validated at every step"""
+    event = request["event"]
+    message = Message(
+        id=event["ts"],
+        channel_id=event["channel"],
+        user_id=event["user"],
+        thread_ts=event.get("thread_ts"),
+        message_type=MessageType.USER,
+        content=event["text"],
+        timestamp=datetime.fromtimestamp(float(event["ts"]))
+    )
+    history = [Message(**row) for row in request["rows"]]
+    formatted = context_manager.format_conversation_history(history)
+    response = Message(
+        id=f"resp_{message.id}",
+        channel_id=message.channel_id,
+        user_id="BOT",
+        thread_ts=message.thread_ts,
+        message_type=MessageType.ASSISTANT,
+        content="The planning team owns it.",
+        timestamp=message.timestamp,
+        metadata={"context_used": formatted, "model_used": "gpt-4o"}
+    )
+    return message, history, response
+
+def with_records(request: Dict[str, Any]) -> Any:
+    """Message handling with MessageRecord tuples"""
+    message = MessageRecord.from_event(request["event"])
+    history = [MessageRecord.from_dict(row) for row in request["rows"]]
+    formatted = context_manager.format_conversation_history(history)
+    response = MessageRecord(
+        id=f"resp_{message.id}",
+        channel_id=message.channel_id,
+        user_id="BOT",
+        thread_ts=message.thread_ts,
+        message_type=MessageType.ASSISTANT.value,
+        content="The planning team owns it.",
+        timestamp=message.timestamp,
+        metadata={"context_used": formatted, "model_used": "gpt-4o"}
+    )
+    return message, history, response
+
+def cpu_us(fn: Callable[[], Any], requests: int) -> float:
+    """Best-of-five mean CPU time per request, in microseconds"""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(requests):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / requests * 1e6
+
+def allocated_bytes(fn: Callable[[], Any], requests: int) -> float:
+    """Memory allocated and retained per request while results are kept alive"""
+    results: List[Any] = []
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(requests):
+            results.append(fn())
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / requests
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", type=int, default=10, help="History messages per request")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    request = build_request(args.history)
+    # Same formatted history either way
+    assert with_models(request)[2].metadata == dict(with_records(request)[2].metadata)
+
+    print(f"{args.history} history messages per request")
+    print(f"{'path':<10}{'us/request':>12}{'bytes/request':>16}")
+    results = {}
+    for name, fn in (("models", with_models), ("records", with_records)):
+        results[name] = (
+            cpu_us(lambda: fn(request), args.requests),
+            allocated_bytes(lambda: fn(request), args.requests // 5)
+        )
+        print(f"{name:<10}{results[name][0]:>12.1f}{results[name][1]:>16.0f}")
+    print(
+        f"records: {results['models'][0] / results['records'][0]:.1f}x less CPU, "
+        f"{results['models'][1] / results['records'][1]:.1f}x less memory"
+    )
+
+if __name__ == "__main__":
+    main()
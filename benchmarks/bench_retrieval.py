@@ -0,0 +1,291 @@
+# benchmarks/bench_retrieval.py
+"""
+Offline retrieval quality and latency evaluation
+
+Chunks a fixture corpus with CHUNK_SIZE/CHUNK_OVERLAP, embeds it with a
+deterministic local embedder into a fixture store, and runs a labelled
+query set through VectorStore.similarity_search (fixed k) and
+RAGEngine.retrieve (the production path: namespace fan-out and adaptive
+selection). Reports recall@k, MRR, chunks and prompt tokens per query,
+and per-stage latency percentiles.
+
+Results can be saved as a JSON baseline; later runs print the difference.
+Settings are overridden per run to compare configurations:
+
+    python -m benchmarks.bench_retrieval --save-baseline benchmarks/baselines/retrieval.json
+    python -m benchmarks.bench_retrieval --chunk-size 500 --chunk-overlap 100 \\
+        --baseline benchmarks/baselines/retrieval.json
+"""
+
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.cache import SharedCache
+from app.config import get_settings
+from app.database import VectorStore
+from app.database.calibrate import calibrate_threshold
+from app.retrieval import RAGEngine
+from benchmarks.retrieval_fixtures import FixtureVectorStore, HashingEmbeddings, load_jsonl
+
+settings = get_settings()
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval")
+EVAL_USER = "U0EVALUSER"
+STAGES = ("embed", "search", "prompt", "total")
+# Metrics where a lower value is better, for the baseline diff
+LOWER_IS_BETTER = ("chunks", "prompt_tokens", "p50_ms", "p95_ms")
+# Timings, which vary between runs and machines
+LATENCY_METRICS = ("p50_ms", "p95_ms")
+# Latency changes smaller than this are scheduling noise at fixture scale
+LATENCY_NOISE_MS = 1.0
+
+def token_counter() -> Tuple[Callable[[str], int], str]:
+    """tiktoken for the configured model, or ~4 characters per token offline"""
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+        return (lambda text: len(encoding.encode(text))), "tiktoken"
+    except Exception:
+        # The encoding is downloaded on first use
+        return (lambda text: (len(text) + 3) // 4), "estimate"
+
+class TimedEmbeddings(HashingEmbeddings):
+    """Records how long each query embedding takes"""
+
+    def __init__(self, dimensions: int = 1024):
+        super().__init__(dimensions)
+        self.last_ms = 0.0
+
+    async def aembed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        vector = await super().aembed_query(text)
+        self.last_ms = (time.perf_counter() - start) * 1000
+        return vector
+
+async def build_store(
+    corpus: Sequence[Dict[str, Any]],
+    embeddings: HashingEmbeddings,
+    cache_path: str
+) -> VectorStore:
+    """Chunk and index the corpus into the shared namespace"""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP
+    )
+    store = VectorStore(
+        embeddings=embeddings,
+        vector_store=FixtureVectorStore(embeddings, namespace=settings.SHARED_NAMESPACE),
+        cache=SharedCache(cache_path, max_bytes=64 * 1024 * 1024)
+    )
+    for doc in corpus:
+        chunks = splitter.split_text(doc["text"])
+        await store.add_texts(
+            chunks,
+            metadatas=[{"source": doc["source"], "title": doc["title"]} for _ in chunks],
+            ids=[f"{doc['source']}#{i}" for i in range(len(chunks))]
+        )
+    return store
+
+async def fixture_threshold(store: VectorStore, queries: Sequence[Dict[str, Any]]) -> float:
+    """Calibrate the similarity threshold for the local embedder on the fixture"""
+    score_lists = []
+    for query in queries:
+        vector = await store.embeddings.aembed_query(query["query"])
+        results = await store.vector_store.asimilarity_search_by_vector_with_score(vector, k=50)
+        score_lists.append([score for _, score in results])
+    return calibrate_threshold(score_lists, relevant_ranks=5, percentile=90)
+
+def score_query(results: Sequence[Dict[str, Any]], relevant: Sequence[str]) -> Dict[str, float]:
+    """Recall of relevant documents and reciprocal rank of the first hit"""
+    sources = [result["metadata"].get("source") for result in results]
+    found = set(sources) & set(relevant)
+    rank = next((i + 1 for i, source in enumerate(sources) if source in relevant), None)
+    return {"recall": len(found) / len(relevant), "mrr": 1.0 / rank if rank else 0.0}
+
+async def run_mode(
+    retrieve: Callable[[str], Any],
+    engine: RAGEngine,
+    embeddings: TimedEmbeddings,
+    queries: Sequence[Dict[str, Any]],
+    count_tokens: Callable[[str], int]
+) -> Dict[str, Any]:
+    """Evaluate one retrieval path over the query set"""
+    rows = []
+    latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for query in queries:
+        # Every query is distinct, so nothing is served from the retrieval cache
+        embeddings.last_ms = 0.0
+        start = time.perf_counter()
+        results = await retrieve(query["query"])
+        retrieved = time.perf_counter()
+        messages = engine.prompt.format_messages(
+            history=[],
+            context=engine.vector_store.format_context(results) if results else "",
+            question=query["query"]
+        )
+        done = time.perf_counter()
+
+        retrieval_ms = (retrieved - start) * 1000
+        latencies["embed"].append(embeddings.last_ms)
+        latencies["search"].append(retrieval_ms - embeddings.last_ms)
+        latencies["prompt"].append((done - retrieved) * 1000)
+        latencies["total"].append((done - start) * 1000)
+        rows.append({
+            **score_query(results, query["relevant"]),
+            "chunks": len(results),
+            "prompt_tokens": sum(count_tokens(message.content) for message in messages)
+        })
+
+    summary: Dict[str, Any] = {
+        metric: round(float(np.mean([row[metric] for row in rows])), 4)
+        for metric in ("recall", "mrr", "chunks", "prompt_tokens")
+    }
+    summary["latency"] = {
+        stage: {
+            "p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p95_ms": round(float(np.percentile(values, 95)), 3)
+        }
+        for stage, values in latencies.items()
+    }
+    return summary
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Nested result dict as dotted metric names"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def print_diff(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25) -> None:
+    """
+    Print every metric next to its baseline value
+    Quality metrics are compared exactly; latencies only count as changed
+    beyond a relative tolerance and LATENCY_NOISE_MS, since timings vary
+    between runs.
+    Args:
+        current: Results of this run
+        baseline: Saved results
+        tolerance: Relative latency change ignored, e.g. 0.25 for 25%
+    """
+    if current["config"] != baseline.get("config"):
+        changed = {
+            key: f"{baseline.get('config', {}).get(key)} -> {value}"
+            for key, value in current["config"].items()
+            if baseline.get("config", {}).get(key) != value
+        }
+        print(f"config changed: {changed}")
+    before = flatten(baseline.get("modes", {}))
+    after = flatten(current["modes"])
+    print(f"{'metric':<42}{'baseline':>11}{'current':>11}{'change':>10}")
+    for metric, value in after.items():
+        if metric not in before:
+            continue
+        previous = before[metric]
+        name = metric.split(".")[-1]
+        change = (value - previous) / previous * 100 if previous else 0.0
+        if name in LATENCY_METRICS:
+            changed = abs(change) > tolerance * 100 and abs(value - previous) > LATENCY_NOISE_MS
+        else:
+            changed = value != previous
+        worse = (value > previous) == (name in LOWER_IS_BETTER)
+        marker = "" if not changed else ("-" if worse else "+")
+        print(f"{metric:<42}{previous:>11.4g}{value:>11.4g}{change:>9.1f}%{marker}")
+
+async def evaluate(args: argparse.Namespace) -> Dict[str, Any]:
+    corpus = load_jsonl(os.path.join(args.fixtures, "corpus.jsonl"))
+    queries = load_jsonl(os.path.join(args.fixtures, "queries.jsonl"))
+    embeddings = TimedEmbeddings()
+    count_tokens, counter_name = token_counter()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = await build_store(corpus, embeddings, os.path.join(cache_dir, "cache.sqlite3"))
+        if args.threshold is None:
+            settings.SIMILARITY_THRESHOLD = await fixture_threshold(store, queries)
+        engine = RAGEngine(vector_store=store)
+
+        modes = {
+            "similarity_search": lambda query: store.similarity_search(
+                query, k=settings.MAX_CONTEXT_CHUNKS
+            ),
+            "rag_engine": lambda query: engine.retrieve(query, EVAL_USER)
+        }
+        results = {
+            name: await run_mode(retrieve, engine, embeddings, queries, count_tokens)
+            for name, retrieve in modes.items()
+        }
+
+    return {
+        "config": {
+            "chunk_size": settings.CHUNK_SIZE,
+            "chunk_overlap": settings.CHUNK_OVERLAP,
+            "max_context_chunks": settings.MAX_CONTEXT_CHUNKS,
+            "similarity_threshold": settings.SIMILARITY_THRESHOLD,
+            "adaptive": settings.ADAPTIVE_CONTEXT_ENABLED,
+            "adaptive_max_chunks": settings.ADAPTIVE_MAX_CHUNKS,
+            "queries": len(queries),
+            "token_counter": counter_name
+        },
+        "modes": results
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", default=FIXTURES, help="Directory with corpus.jsonl and queries.jsonl")
+    parser.add_argument("--chunk-size", type=int, help="Override CHUNK_SIZE")
+    parser.add_argument("--chunk-overlap", type=int, help="Override CHUNK_OVERLAP")
+    parser.add_argument("--max-chunks", type=int, help="Override MAX_CONTEXT_CHUNKS")
+    parser.add_argument("--adaptive-max-chunks", type=int, help="Override ADAPTIVE_MAX_CHUNKS")
+    parser.add_argument(
+        "--threshold", type=float,
+        help="Override SIMILARITY_THRESHOLD (default: calibrated for the local embedder)"
+    )
+    parser.add_argument("--fixed", action="store_true", help="Disable adaptive context selection")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="Relative latency change ignored in the baseline diff (default: 0.25)"
+    )
+    parser.add_argument("--save-baseline", help="Write results as a baseline JSON")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    overrides = {
+        "CHUNK_SIZE": args.chunk_size,
+        "CHUNK_OVERLAP": args.chunk_overlap,
+        "MAX_CONTEXT_CHUNKS": args.max_chunks,
+        "ADAPTIVE_MAX_CHUNKS": args.adaptive_max_chunks,
+        "SIMILARITY_THRESHOLD": args.threshold
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(settings, name, value)
+    if args.fixed:
+        settings.ADAPTIVE_CONTEXT_ENABLED = False
+    # Thresholds calibrated for production embeddings don't apply here
+    settings.NAMESPACE_THRESHOLDS = {}
+
+    current = asyncio.run(evaluate(args))
+    print(json.dumps(current, indent=2))
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            print_diff(current, json.load(f), args.tolerance)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline) or ".", exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
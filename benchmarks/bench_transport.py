@@ -0,0 +1,166 @@
+# benchmarks/bench_transport.py
+"""
+Ack latency of Socket Mode versus the HTTP request path
+
+Both paths feed the same Bolt app with a deliberately slow /ask listener.
+Socket Mode runs through SocketModeTransport against a local stand-in;
+HTTP posts signed slash command forms to a local server using Bolt's
+request handling, one new connection per request as Slack does.
+
+    python -m benchmarks.bench_transport --requests 500
+"""
+
+from urllib.parse import urlencode
+import argparse
+import asyncio
+import gc
+import hashlib
+import hmac
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.authorization import AuthorizeResult
+from slack_bolt.request.async_request import AsyncBoltRequest
+
+from app.slack.socket_mode import SocketModeTransport
+from benchmarks.slack_standin import SocketModeStandIn
+
+SIGNING_SECRET = "stand-in-secret"
+LISTENER_DELAY = 0.05
+
+async def authorize(**kwargs) -> AuthorizeResult:
+    # Static authorization so no auth.test call leaves the machine
+    return AuthorizeResult(
+        enterprise_id=None,
+        team_id="T0STANDIN",
+        bot_token="xoxb-stand-in",
+        bot_user_id="U0STANDINBOT",
+        bot_id="B0STANDIN"
+    )
+
+def build_app() -> AsyncApp:
+    app = AsyncApp(signing_secret=SIGNING_SECRET, authorize=authorize)
+
+    @app.command("/ask")
+    async def ask(ack):
+        await ack()
+        # Simulates the handler scheduling work before it returns
+        await asyncio.sleep(LISTENER_DELAY)
+
+    return app
+
+def command_payload(i: int) -> dict:
+    return {
+        "command": "/ask",
+        "text": f"question {i}",
+        "user_id": "U0STANDIN",
+        "channel_id": "C0STANDIN",
+        "team_id": "T0STANDIN",
+        "trigger_id": f"trigger-{i}"
+    }
+
+def summarize(name: str, samples: list) -> None:
+    samples = sorted(samples)
+    p = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    print(
+        f"{name:<12} n={len(samples):<5} mean={statistics.mean(samples) * 1000:7.2f} ms"
+        f"  p50={p(0.50):7.2f}  p95={p(0.95):7.2f}  p99={p(0.99):7.2f}"
+    )
+
+async def bench_socket_mode(requests: int, connections: int, concurrency: int) -> list:
+    standin = SocketModeStandIn()
+    await standin.start()
+    transport = SocketModeTransport(
+        build_app(), app_token="xapp-stand-in",
+        connections=connections, wss_url=standin.url
+    )
+    await transport.start()
+    await standin.wait_for_connections(connections)
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> float:
+        async with semaphore:
+            sent = loop.time()
+            future = await standin.send("slash_commands", command_payload(i))
+            return await future - sent
+
+    # Discard the first round and let its dispatches finish; the first Bolt
+    # dispatch pays one-off setup costs that would block the loop mid-run
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    await asyncio.sleep(0.5)
+    samples = await asyncio.gather(*(one(i) for i in range(requests)))
+    await transport.stop()
+    await standin.stop()
+    return list(samples)
+
+async def bench_http(requests: int, concurrency: int) -> list:
+    app = build_app()
+
+    async def handle(request: web.Request) -> web.Response:
+        body = (await request.read()).decode("utf-8")
+        response = await app.async_dispatch(
+            AsyncBoltRequest(body=body, headers=dict(request.headers))
+        )
+        return web.Response(status=response.status, body=response.body)
+
+    server = web.Application()
+    server.router.add_post("/slack/commands", handle)
+    runner = web.AppRunner(server)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/slack/commands"
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> float:
+        body = urlencode(command_payload(i))
+        timestamp = str(int(time.time()))
+        signature = "v0=" + hmac.new(
+            SIGNING_SECRET.encode(),
+            f"v0:{timestamp}:{body}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "X-Slack-Request-Timestamp": timestamp,
+            "X-Slack-Signature": signature
+        }
+        async with semaphore:
+            start = time.perf_counter()
+            # A fresh connection per request, like Slack's webhook delivery
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, data=body, headers=headers) as response:
+                    await response.read()
+            return time.perf_counter() - start
+
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    await asyncio.sleep(0.5)
+    samples = await asyncio.gather(*(one(i) for i in range(requests)))
+    await runner.cleanup()
+    return list(samples)
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--connections", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    # Move import-time objects out of the collector's reach so a full
+    # collection of the app's heap doesn't land inside one sample window
+    gc.collect()
+    gc.freeze()
+
+    summarize("socket mode", await bench_socket_mode(args.requests, args.connections, args.concurrency))
+    summarize("http", await bench_http(args.requests, args.concurrency))
+    print("note: local loopback; production HTTP adds TLS and ingress hops per request")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+# benchmarks/retrieval_fixtures.py
+"""
+Offline stand-ins for the retrieval stack
+
+HashingEmbeddings is a deterministic local embedder and FixtureVectorStore
+is a namespaced in-memory store on LocalVectorIndex with the interface
+VectorStore uses from Pinecone, so retrieval runs without network access.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import re
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as BaseVectorStore
+
+from app.database.local_index import LocalVectorIndex
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it my of on or "
+    "our the to we what when where which who will with you your".split()
+)
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embedder
+
+    Unigrams and bigrams are hashed into signed buckets with sublinear term
+    weights. Scores are lower than a trained model's, so thresholds must be
+    calibrated for it, but rankings are stable across runs and machines.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+
+    def _terms(self, text: str) -> List[str]:
+        words = [
+            word[:-1] if len(word) > 3 and word.endswith("s") else word
+            for word in _WORD.findall(text.lower())
+            if word not in _STOPWORDS
+        ]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _embed(self, text: str) -> List[float]:
+        counts: Dict[int, float] = {}
+        for term in self._terms(text):
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            bucket = value % self.dimensions
+            sign = 1.0 if (value >> 63) else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for bucket, count in counts.items():
+            if count:
+                vector[bucket] = np.sign(count) * (1.0 + np.log(abs(count)))
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+def _matches(metadata: Dict[str, Any], conditions: Dict[str, Any]) -> bool:
+    """Evaluate the subset of Pinecone filters the app uses: $eq and $in"""
+    for field, condition in conditions.items():
+        value = metadata.get(field)
+        values = value if isinstance(value, list) else [value]
+        if "$eq" in condition and condition["$eq"] not in values:
+            return False
+        if "$in" in condition and not set(condition["$in"]) & set(values):
+            return False
+    return True
+
+class FixtureVectorStore(BaseVectorStore):
+    """Namespaced in-memory vector store backed by LocalVectorIndex"""
+
+    def __init__(self, embedding: Embeddings, namespace: str = "default", **index_options: Any):
+        self.embedding = embedding
+        self.namespace = namespace
+        self.index_options = index_options
+        self._indexes: Dict[str, LocalVectorIndex] = {}
+        self._texts: Dict[str, Dict[str, str]] = {}
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _index(self, namespace: Optional[str]) -> LocalVectorIndex:
+        namespace = namespace or self.namespace
+        if namespace not in self._indexes:
+            self._indexes[namespace] = LocalVectorIndex(**self.index_options)
+            self._texts[namespace] = {}
+        return self._indexes[namespace]
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        namespace: Optional[str] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        index = self._index(namespace)
+        index.add(ids, self.embedding.embed_documents(texts), metadatas)
+        self._texts[namespace or self.namespace].update(zip(ids, texts))
+        return ids
+
+    async def aadd_texts(self, texts: Iterable[str], **kwargs: Any) -> List[str]:
+        return self.add_texts(texts, **kwargs)
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None
+    ) -> List[Tuple[Document, float]]:
+        index = self._index(namespace)
+        texts = self._texts[namespace or self.namespace]
+        # Filters are applied after an exhaustive search; fixtures are small
+        results = index.search(embedding, len(index) if filter else k)
+        if filter:
+            results = [result for result in results if _matches(result["metadata"], filter)][:k]
+        return [
+            (Document(page_content=texts[result["id"]], metadata=result["metadata"]), result["score"])
+            for result in results
+        ]
+
+    async def asimilarity_search_by_vector_with_score(self, embedding: Sequence[float], **kwargs: Any):
+        return self.similarity_search_by_vector_with_score(embedding, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        vector = self.embedding.embed_query(query)
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(vector, k, **kwargs)]
+
+    async def adelete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        raise NotImplementedError("fixture stores are rebuilt, not edited")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+def load_jsonl(path: str) -> List[Dict[str, Any]]:
+    """Rows of a JSON Lines file"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,91 @@
+# benchmarks/slack_standin.py
+"""
+Local stand-in for Slack's Socket Mode websocket endpoint
+
+Speaks just enough of the protocol for SocketModeTransport: sends a hello
+on connect, pushes envelopes on demand and resolves a future when the
+matching ack comes back.
+"""
+
+from typing import Any, Dict, List, Optional
+from aiohttp import web, WSMsgType
+import asyncio
+import itertools
+import json
+
+class SocketModeStandIn:
+    """In-process websocket server imitating wss://wss-primary.slack.com"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.sockets: List[web.WebSocketResponse] = []
+        self.pending: Dict[str, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._next_socket = itertools.count()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/link"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/link", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        for ws in list(self.sockets):
+            await ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def wait_for_connections(self, count: int, timeout: float = 10) -> None:
+        async def poll():
+            while len(self.sockets) < count:
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(poll(), timeout)
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({
+            "type": "hello",
+            "num_connections": len(self.sockets) + 1,
+            "debug_info": {"host": "stand-in"},
+            "connection_info": {"app_id": "A0STANDIN"}
+        }))
+        self.sockets.append(ws)
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                envelope_id = json.loads(message.data).get("envelope_id")
+                future = self.pending.pop(envelope_id, None)
+                if future and not future.done():
+                    future.set_result(asyncio.get_running_loop().time())
+        finally:
+            self.sockets.remove(ws)
+        return ws
+
+    async def send(self, envelope_type: str, payload: Dict[str, Any]) -> asyncio.Future:
+        """
+        Push an envelope over the next connection, round robin
+        Returns:
+            Future resolving to the loop time the ack arrived
+        """
+        envelope_id = f"env-{next(self._ids)}"
+        future = asyncio.get_running_loop().create_future()
+        self.pending[envelope_id] = future
+        ws = self.sockets[next(self._next_socket) % len(self.sockets)]
+        await ws.send_str(json.dumps({
+            "envelope_id": envelope_id,
+            "type": envelope_type,
+            "payload": payload,
+            "accepts_response_payload": envelope_type == "slash_commands"
+        }))
+        return future
@@ -0,0 +1,49 @@
+# tests/conftest.py
+
+import os
+import tempfile
+import time
+
+import pytest
+
+# Settings are read at import time; the tests never reach the real services
+_TEST_DIR = tempfile.mkdtemp(prefix="slack-rag-tests-")
+for name, value in {
+    "SLACK_BOT_TOKEN": "xoxb-test",
+    "SLACK_SIGNING_SECRET": "test",
+    "SLACK_APP_TOKEN": "xapp-test",
+    "OPENAI_API_KEY": "sk-test",
+    "PINECONE_API_KEY": "test",
+    "PINECONE_ENVIRONMENT": "test",
+    "PINECONE_INDEX_NAME": "test",
+    "PROJECT_ID": "test",
+    "SHARED_CACHE_PATH": os.path.join(_TEST_DIR, "cache.sqlite3"),
+    "TASK_QUEUE_PATH": os.path.join(_TEST_DIR, "tasks.sqlite3")
+}.items():
+    os.environ.setdefault(name, value)
+
+@pytest.fixture
+def firestore_db(monkeypatch):
+    """Every Firestore client created during the test shares one in-memory database"""
+    from google.cloud import firestore
+    from tests.fakes import FakeFirestore
+
+    db = FakeFirestore()
+    monkeypatch.setattr(firestore, "Client", db)
+    return db
+
+class Clock:
+    """Wall clock the tests move forward by hand"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace time.time; expiry, leases and backoff follow `clock.now`"""
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
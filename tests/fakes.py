@@ -0,0 +1,308 @@
+# tests/fakes.py
+"""In-memory stand-ins for the external services the app talks to"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import copy
+import operator
+
+from google.cloud import firestore
+from langchain_core.documents import Document
+
+_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda value, options: value in options,
+    'array_contains': lambda value, item: item in (value or ())
+}
+
+class FakeSnapshot:
+    def __init__(self, reference: 'FakeDocument', data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field: str) -> Any:
+        if field == '__name__':
+            return self.reference
+        return self._data[field]
+
+def _apply(current: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve Firestore transforms against the stored fields"""
+    result = dict(current)
+    for field, value in data.items():
+        if isinstance(value, firestore.Increment):
+            result[field] = (result.get(field) or 0) + value.value
+        elif isinstance(value, firestore.ArrayUnion):
+            existing = list(result.get(field) or [])
+            result[field] = existing + [item for item in value.values if item not in existing]
+        elif value is firestore.SERVER_TIMESTAMP:
+            result[field] = datetime.now(timezone.utc)
+        else:
+            result[field] = copy.deepcopy(value)
+    return result
+
+class FakeDocument:
+    def __init__(self, db: 'FakeFirestore', path: str):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FakeDocument) and other.path == self.path
+
+    def __lt__(self, other: 'FakeDocument') -> bool:
+        return self.path < other.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    @property
+    def parent(self) -> 'FakeQuery':
+        return FakeQuery(self._db, self.path.rpartition('/')[0])
+
+    def collection(self, name: str) -> 'FakeQuery':
+        return FakeQuery(self._db, f"{self.path}/{name}")
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, **kwargs: Any) -> FakeSnapshot:
+        self._db.reads += 1
+        data = self._db.docs.get(self.path)
+        if data is not None and field_paths is not None:
+            data = {field: data[field] for field in field_paths if field in data}
+        return FakeSnapshot(self, copy.deepcopy(data))
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        current = self._db.docs.get(self.path, {}) if merge else {}
+        self._db.docs[self.path] = _apply(current, data)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        if self.path not in self._db.docs:
+            raise KeyError(self.path)
+        self.set(data, merge=True)
+
+    def delete(self) -> None:
+        self._db.docs.pop(self.path, None)
+
+class FakeQuery:
+    """A collection, collection group or query over either"""
+
+    def __init__(
+        self,
+        db: 'FakeFirestore',
+        path: str,
+        group: bool = False,
+        filters: Tuple = (),
+        orders: Tuple = (),
+        count: Optional[int] = None,
+        cursor: Any = None
+    ):
+        self._db = db
+        self._path = path
+        self._group = group
+        self._filters = filters
+        self._orders = orders
+        self._count = count
+        self._cursor = cursor
+
+    def _copy(self, **changes: Any) -> 'FakeQuery':
+        state = dict(
+            group=self._group, filters=self._filters, orders=self._orders,
+            count=self._count, cursor=self._cursor
+        )
+        state.update(changes)
+        return FakeQuery(self._db, self._path, **state)
+
+    def document(self, doc_id: str) -> FakeDocument:
+        return FakeDocument(self._db, f"{self._path}/{doc_id}")
+
+    @property
+    def parent(self) -> Optional[FakeDocument]:
+        """Document a subcollection belongs to; None for a root collection"""
+        parent = self._path.rpartition('/')[0]
+        return FakeDocument(self._db, parent) if parent else None
+
+    def where(self, field: str, op: str, value: Any) -> 'FakeQuery':
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field: str, direction: str = firestore.Query.ASCENDING) -> 'FakeQuery':
+        return self._copy(orders=self._orders + ((field, direction),))
+
+    def limit(self, count: int) -> 'FakeQuery':
+        return self._copy(count=count)
+
+    def select(self, fields: List[str]) -> 'FakeQuery':
+        return self
+
+    def start_after(self, cursor: Any) -> 'FakeQuery':
+        return self._copy(cursor=cursor)
+
+    def count(self) -> 'FakeAggregation':
+        return FakeAggregation(self)
+
+    def _matches(self, path: str) -> bool:
+        parent, _, _ = path.rpartition('/')
+        if self._group:
+            return parent.rsplit('/', 1)[-1] == self._path
+        return parent == self._path
+
+    def get(self, **kwargs: Any) -> List[FakeSnapshot]:
+        snapshots = [
+            FakeSnapshot(FakeDocument(self._db, path), copy.deepcopy(data))
+            for path, data in sorted(self._db.docs.items())
+            if self._matches(path)
+        ]
+        for field, op, value in self._filters:
+            snapshots = [
+                snapshot for snapshot in snapshots
+                if (field == '__name__' or field in snapshot._data)
+                and _OPERATORS[op](snapshot.get(field), value)
+            ]
+        for field, direction in reversed(self._orders):
+            snapshots.sort(key=lambda snapshot: snapshot.get(field), reverse=direction == firestore.Query.DESCENDING)
+        if self._cursor is not None:
+            snapshots = snapshots[self._after(snapshots):]
+        if self._count is not None:
+            snapshots = snapshots[:self._count]
+        self._db.reads += len(snapshots)
+        return snapshots
+
+    def _reference(self, value: str) -> FakeDocument:
+        """Document of a cursor path; bare IDs are relative to the collection"""
+        return self._db.document(value if '/' in value else f"{self._path}/{value}")
+
+    def _after(self, snapshots: List[FakeSnapshot]) -> int:
+        """Index of the first snapshot past the cursor"""
+        if isinstance(self._cursor, FakeSnapshot):
+            values = tuple(self._cursor.get(field) for field, _ in self._orders)
+        else:
+            values = tuple(
+                self._reference(value) if isinstance(value, str) and field == '__name__' else value
+                for field, value in ((field, self._cursor.get(field)) for field, _ in self._orders)
+                if value is not None
+            )
+        for index, snapshot in enumerate(snapshots):
+            key = tuple(snapshot.get(field) for field, _ in self._orders[:len(values)])
+            if key > values:
+                return index
+        return len(snapshots)
+
+    def stream(self, **kwargs: Any) -> Iterable[FakeSnapshot]:
+        return iter(self.get())
+
+class FakeAggregationResult:
+    def __init__(self, value: int):
+        self.value = value
+
+class FakeAggregation:
+    """count() over a query; get() returns results in the client's nesting"""
+
+    def __init__(self, query: FakeQuery):
+        self._query = query
+
+    def get(self, **kwargs: Any) -> List[List[FakeAggregationResult]]:
+        return [[FakeAggregationResult(len(self._query.get()))]]
+
+class FakeBatch:
+    def __init__(self, db: 'FakeFirestore'):
+        self._db = db
+        self._writes: List[Tuple[str, FakeDocument, Any, bool]] = []
+
+    def set(self, ref: FakeDocument, data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append(('set', ref, data, merge))
+
+    def delete(self, ref: FakeDocument) -> None:
+        self._writes.append(('delete', ref, None, False))
+
+    def commit(self) -> None:
+        if self._db.fail_commits:
+            self._db.fail_commits -= 1
+            raise RuntimeError("commit failed")
+        for kind, ref, data, merge in self._writes:
+            if kind == 'set':
+                ref.set(data, merge=merge)
+            else:
+                ref.delete()
+        self._db.commits += 1
+
+class FakeFirestore:
+    """
+    Firestore client over a dict of document paths
+
+    Supports the calls the app makes: documents, collections and
+    collection groups, equality and range filters, ordering, limits,
+    cursors, counts and batched writes with Increment, ArrayUnion and
+    SERVER_TIMESTAMP. Set `fail_commits` to fail the next batch commits.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.reads = 0
+        self.commits = 0
+        self.fail_commits = 0
+
+    def __call__(self, *args: Any, **kwargs: Any) -> 'FakeFirestore':
+        # Patched in for firestore.Client, so every client shares this data
+        return self
+
+    def collection(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def collection_group(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name, group=True)
+
+    def document(self, path: str) -> FakeDocument:
+        return FakeDocument(self, path)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+class FakeEmbeddings:
+    """Embedder counting the queries it is sent"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.queries: List[str] = []
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.queries.append(text)
+        await asyncio.sleep(self.delay)
+        return [float(len(text)), 1.0]
+
+class FakeVectorStore:
+    """
+    Pinecone stand-in returning fixed (content, score) matches per namespace
+
+    Matches are returned best first up to k. Namespaces listed in `failing`
+    raise, and every search is recorded in `searches`.
+    """
+
+    def __init__(self, matches: Dict[Optional[str], List[Tuple[str, float]]], delay: float = 0.0):
+        self.matches = matches
+        self.delay = delay
+        self.failing: set = set()
+        self.searches: List[Dict[str, Any]] = []
+
+    async def asimilarity_search_by_vector_with_score(
+        self, vector: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None
+    ) -> List[Tuple[Document, float]]:
+        self.searches.append({"namespace": namespace, "k": k, "filter": filter})
+        await asyncio.sleep(self.delay)
+        if namespace in self.failing:
+            raise ConnectionError(f"{namespace} unavailable")
+        return [
+            (Document(page_content=content, metadata={"source": namespace}), score)
+            for content, score in self.matches.get(namespace, [])[:k]
+        ]
@@ -0,0 +1,32 @@
+# tests/test_bench_retrieval.py
+
+from benchmarks.bench_retrieval import print_diff
+
+def results(recall, p95_ms):
+    return {"config": {"k": 5}, "modes": {"adaptive": {"recall_at_k": recall, "latency": {"p95_ms": p95_ms}}}}
+
+def markers(capsys):
+    rows = capsys.readouterr().out.splitlines()[1:]
+    return {row.split()[0]: row.rstrip()[-1] for row in rows}
+
+def test_quality_changes_are_always_marked(capsys):
+    print_diff(results(0.79, 10.0), results(0.80, 10.0))
+    assert markers(capsys)["adaptive.recall_at_k"] == "-"
+    print_diff(results(0.81, 10.0), results(0.80, 10.0))
+    assert markers(capsys)["adaptive.recall_at_k"] == "+"
+
+def test_latency_noise_is_not_marked(capsys):
+    # 20% slower is within the default tolerance
+    print_diff(results(0.8, 12.0), results(0.8, 10.0))
+    assert markers(capsys)["adaptive.latency.p95_ms"] == "%"
+    # Doubling a sub-millisecond timing is scheduling noise
+    print_diff(results(0.8, 0.8), results(0.8, 0.4))
+    assert markers(capsys)["adaptive.latency.p95_ms"] == "%"
+
+def test_latency_regressions_beyond_the_tolerance_are_marked(capsys):
+    print_diff(results(0.8, 14.0), results(0.8, 10.0))
+    assert markers(capsys)["adaptive.latency.p95_ms"] == "-"
+    print_diff(results(0.8, 14.0), results(0.8, 10.0), tolerance=0.5)
+    assert markers(capsys)["adaptive.latency.p95_ms"] == "%"
+    print_diff(results(0.8, 6.0), results(0.8, 10.0))
+    assert markers(capsys)["adaptive.latency.p95_ms"] == "+"
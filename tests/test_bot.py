@@ -0,0 +1,107 @@
+# tests/test_bot.py
+
+import asyncio
+
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.authorization import AuthorizeResult
+from slack_sdk.socket_mode.request import SocketModeRequest
+
+from app.slack.handlers.command import build_command_data
+from app.slack.socket_mode import MAX_CONNECTIONS, SocketModeTransport
+
+async def authorize(**kwargs):
+    return AuthorizeResult(
+        enterprise_id=None, team_id="T1", bot_token="xoxb-test", bot_user_id="UBOT", bot_id="B1"
+    )
+
+def bolt_app() -> AsyncApp:
+    """Bolt app that never calls Slack: fixed authorization, no signatures"""
+    return AsyncApp(signing_secret="test", authorize=authorize, request_verification_enabled=False)
+
+class FakeSocketClient:
+    """Records the acks sent over the websocket"""
+
+    def __init__(self):
+        self.acks = []
+
+    async def send_socket_mode_response(self, response):
+        self.acks.append(response.envelope_id)
+
+def ask_request(envelope_id: str, text: str) -> SocketModeRequest:
+    return SocketModeRequest("slash_commands", envelope_id, {
+        "command": "/ask",
+        "text": text,
+        "user_id": "U1",
+        "channel_id": "C1",
+        "team_id": "T1"
+    })
+
+def test_envelope_is_acked_before_the_listener_finishes():
+    async def run():
+        app = bolt_app()
+        release = asyncio.Event()
+        handled = []
+
+        @app.command("/ask")
+        async def ask(ack, command):
+            await ack()
+            await release.wait()
+            handled.append(command["text"])
+
+        transport = SocketModeTransport(app, "xapp-test")
+        client = FakeSocketClient()
+        await transport._on_request(client, ask_request("env-1", "hello"))
+        acked_before = list(client.acks), list(handled)
+        release.set()
+        # stop() waits for requests still being handled
+        await transport.stop()
+        return acked_before, handled
+
+    (acks, handled_before), handled = asyncio.run(run())
+    assert acks == ["env-1"] and handled_before == []
+    assert handled == ["hello"]
+
+def test_failing_dispatch_doesnt_break_the_transport():
+    async def run():
+        app = bolt_app()
+        handled = []
+
+        @app.command("/ask")
+        async def ask(ack, command):
+            await ack()
+            handled.append(command["text"])
+
+        dispatch = app.async_dispatch
+
+        async def flaky_dispatch(request):
+            if request.body["text"] == "boom":
+                raise RuntimeError("dispatch failed")
+            return await dispatch(request)
+
+        app.async_dispatch = flaky_dispatch
+        transport = SocketModeTransport(app, "xapp-test")
+        client = FakeSocketClient()
+        await transport._on_request(client, ask_request("env-1", "boom"))
+        await transport._on_request(client, ask_request("env-2", "fine"))
+        await transport.stop()
+        return client.acks, handled
+
+    acks, handled = asyncio.run(run())
+    assert acks == ["env-1", "env-2"]
+    assert handled == ["fine"]
+
+def test_connections_are_capped():
+    assert SocketModeTransport(bolt_app(), "xapp-test", connections=50).connections == MAX_CONNECTIONS
+    assert SocketModeTransport(bolt_app(), "xapp-test", connections=0).connections == 1
+
+def test_command_data_from_a_socket_mode_payload():
+    async def say(message):
+        pass
+
+    async def ack():
+        pass
+
+    data = build_command_data({"command": "/ask", "user_id": "U1", "channel_id": "C1"}, say, ack)
+    assert (data["command"], data["text"], data["user_id"], data["channel_id"]) == ("/ask", "", "U1", "C1")
+    assert data["say"] is say and data["ack"] is ack
+    assert float(data["command_ts"]) > 0
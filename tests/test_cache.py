@@ -0,0 +1,143 @@
+# tests/test_cache.py
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.cache import CachedEmbeddings, SharedCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedCache(str(tmp_path / "cache.sqlite3"), max_bytes=10_000_000)
+
+def test_set_and_get(cache):
+    assert cache.get("ns", "key") is None
+    cache.set("ns", "key", {"answer": 42})
+    assert cache.get("ns", "key") == {"answer": 42}
+    assert cache.get("other", "key") is None
+
+def test_none_is_never_cached(cache):
+    assert cache.set("ns", "key", None) is None
+    assert cache.get("ns", "key") is None
+
+def test_entries_expire(cache, clock):
+    cache.set("ns", "key", "value", ttl=10)
+    clock.now += 9
+    assert cache.get("ns", "key") == "value"
+    clock.now += 2
+    assert cache.get("ns", "key") is None
+    assert cache.stats()["ns"]["expired"] == 1
+
+def test_default_ttl(tmp_path, clock):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"), max_bytes=10_000_000, default_ttl=5)
+    cache.set("ns", "key", "value")
+    clock.now += 6
+    assert cache.get("ns", "key") is None
+
+def test_add_only_when_absent(cache, clock):
+    assert cache.add("ns", "key", ttl=10)
+    assert not cache.add("ns", "key", ttl=10)
+    clock.now += 11
+    assert cache.add("ns", "key", ttl=10)
+
+def test_set_only_if_absent_keeps_the_first_value(cache):
+    assert cache.set("ns", "key", "first", only_if_absent=True) == "first"
+    assert cache.set("ns", "key", "second", only_if_absent=True) == "first"
+    assert cache.get("ns", "key") == "first"
+
+def test_incr(cache):
+    assert cache.incr("ns", "counter") == 1
+    assert cache.incr("ns", "counter", 5) == 6
+    assert cache.get("ns", "counter") == 6
+
+def test_least_recently_used_are_evicted(tmp_path, clock):
+    value = "x" * 1000
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"), max_bytes=5 * 1100)
+    for i in range(5):
+        cache.set("ns", f"key-{i}", value)
+        clock.now += 60
+    # A read after the touch interval makes key-0 the most recently used
+    assert cache.get("ns", "key-0") == value
+    clock.now += 60
+    cache.set("ns", "key-5", value)
+
+    assert cache.get("ns", "key-0") == value
+    assert cache.get("ns", "key-1") is None
+    assert cache.get("ns", "key-5") == value
+    assert cache.stats()["ns"]["evictions"] == 1
+
+def test_counters_are_never_evicted(tmp_path, clock):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"), max_bytes=3000)
+    cache.incr("ns", "counter")
+    for i in range(10):
+        clock.now += 60
+        cache.set("ns", f"key-{i}", "x" * 1000)
+    assert cache.get("ns", "counter") == 1
+    assert cache.get("ns", "key-0") is None
+
+def test_get_or_set_calls_the_factory_once(cache):
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "computed"
+
+    async def run():
+        namespace = cache.namespace("ns")
+        values = await asyncio.gather(*(namespace.get_or_set("key", factory) for _ in range(10)))
+        return values + [await namespace.get_or_set("key", factory)]
+
+    assert asyncio.run(run()) == ["computed"] * 11
+    assert len(calls) == 1
+
+def test_get_or_set_shares_the_error(cache):
+    async def factory():
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    async def run():
+        namespace = cache.namespace("ns")
+        return await asyncio.gather(
+            *(namespace.get_or_set("key", factory) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
+    assert cache.get("ns", "key") is None
+
+class CountingEmbeddings:
+    """Fake embedder counting the texts it is sent"""
+
+    def __init__(self):
+        self.texts = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+def test_embeddings_only_send_misses(cache):
+    inner = CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, cache, model="m")
+    assert embeddings.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+    assert asyncio.run(embeddings.aembed_documents(["bb", "ccc"])) == [[2.0], [3.0]]
+    assert inner.texts == ["a", "bb", "ccc"]
+    # Vectors of another model are never reused
+    CachedEmbeddings(inner, cache, model="other").embed_documents(["a"])
+    assert inner.texts == ["a", "bb", "ccc", "a"]
+
+def test_embeddings_survive_a_broken_cache(cache, monkeypatch):
+    def broken(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, "get", broken)
+    monkeypatch.setattr(cache, "set", broken)
+    inner = CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, cache, model="m")
+    assert embeddings.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+    assert asyncio.run(embeddings.aembed_documents(["a"])) == [[1.0]]
+    assert inner.texts == ["a", "bb", "a"]
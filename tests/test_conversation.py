@@ -0,0 +1,125 @@
+# tests/test_conversation.py
+
+import asyncio
+
+import pytest
+
+from app.cache import SharedCache
+from app.database import conversation
+from app.database.conversation import ConversationStore
+
+@pytest.fixture
+def new_store(firestore_db, tmp_path, monkeypatch):
+    """Build stores that share Firestore; each has the cache of its own host"""
+    def build(host: str = "a") -> ConversationStore:
+        cache = SharedCache(str(tmp_path / f"{host}.sqlite3"), max_bytes=10_000_000)
+        monkeypatch.setattr(conversation, "get_shared_cache", lambda: cache)
+        return ConversationStore()
+    return build
+
+def contents(messages):
+    return [message['content'] for message in messages]
+
+def test_history_is_newest_messages_oldest_first(new_store):
+    store = new_store()
+
+    async def run():
+        for i in range(5):
+            await store.save_message("C1", "U1", "user", f"m{i}", thread_ts="1.0")
+        await store.save_message("C1", "U1", "user", "other thread", thread_ts="2.0")
+        return await store.get_conversation_history("C1", "1.0", limit=3)
+
+    assert contents(asyncio.run(run())) == ["m2", "m3", "m4"]
+
+def test_unknown_thread_has_no_history(new_store, firestore_db):
+    store = new_store()
+    assert asyncio.run(store.get_conversation_history("C1", "9.9")) == []
+    # Only the thread document was read
+    assert firestore_db.reads == 1
+
+def test_history_is_served_from_cache(new_store, firestore_db):
+    store = new_store()
+
+    async def run():
+        await store.save_message("C1", "U1", "user", "hello", thread_ts="1.0")
+        first = await store.get_conversation_history("C1", "1.0")
+        reads = firestore_db.reads
+        second = await store.get_conversation_history("C1", "1.0")
+        return first, second, firestore_db.reads - reads
+
+    first, second, reads = asyncio.run(run())
+    assert first == second
+    # The thread document is read to check the cached copy is current
+    assert reads == 1
+
+def test_write_on_another_host_invalidates_history(new_store):
+    here, there = new_store("a"), new_store("b")
+
+    async def run():
+        await here.save_message("C1", "U1", "user", "question", thread_ts="1.0")
+        before = await here.get_conversation_history("C1", "1.0")
+        await there.save_message("C1", "bot", "assistant", "answer", thread_ts="1.0")
+        return before, await here.get_conversation_history("C1", "1.0")
+
+    before, after = asyncio.run(run())
+    assert contents(before) == ["question"]
+    assert contents(after) == ["question", "answer"]
+
+def test_deleted_thread_has_no_history(new_store):
+    store = new_store()
+
+    async def run():
+        await store.save_message("C1", "U1", "user", "hello", thread_ts="1.0")
+        await store.get_conversation_history("C1", "1.0")
+        assert await store.delete_conversation("C1", "1.0")
+        return await store.get_conversation_history("C1", "1.0")
+
+    assert asyncio.run(run()) == []
+
+def test_messages_are_kept_under_their_thread(new_store, firestore_db):
+    store = new_store()
+
+    async def run():
+        await store.save_message("C1", "U1", "user", "question", thread_ts="1.0")
+        await store.save_message("C1", "bot", "assistant", "answer", thread_ts="1.0")
+        await store.save_message("C1", "U2", "user", "outside a thread")
+
+    asyncio.run(run())
+    thread = firestore_db.docs["threads/C1:1.0"]
+    assert thread["message_count"] == 2
+    assert thread["participants"] == ["U1", "bot"]
+    messages = sorted(path for path in firestore_db.docs if path.startswith("threads/C1:1.0/messages/"))
+    # Document IDs sort in write order, and the thread points at the last one
+    assert [firestore_db.docs[path]["content"] for path in messages] == ["question", "answer"]
+    assert thread["last_seq"] == firestore_db.docs[messages[-1]]["seq"]
+    assert firestore_db.docs["threads/C1:main"]["message_count"] == 1
+
+def test_deleting_a_channel_removes_every_thread(new_store, firestore_db):
+    store = new_store()
+
+    async def run():
+        for thread_ts in ("1.0", "2.0", None):
+            await store.save_message("C1", "U1", "user", "hello", thread_ts=thread_ts)
+        await store.save_message("C2", "U1", "user", "hello", thread_ts="1.0")
+        return await store.delete_conversation("C1")
+
+    assert asyncio.run(run())
+    assert sorted(firestore_db.docs) and all(path.startswith("threads/C2:") for path in firestore_db.docs)
+
+def test_messages_are_paged_in_write_order(new_store):
+    store = new_store()
+
+    async def run():
+        for i in range(5):
+            await store.save_message("C1", "U1", "user", f"m{i}", thread_ts=str(i % 2))
+        pages = [page async for page in store.iter_messages(page_size=2)]
+        first = pages[0]
+        rest = [page async for page in store.iter_messages(
+            after_seq=first[-1].get("seq"), after_path=first[-1].reference.path, page_size=2
+        )]
+        return pages, rest
+
+    pages, rest = asyncio.run(run())
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [doc.to_dict()["content"] for page in pages for doc in page] == [f"m{i}" for i in range(5)]
+    assert [doc.to_dict()["content"] for page in rest for doc in page] == ["m2", "m3", "m4"]
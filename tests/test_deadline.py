@@ -0,0 +1,82 @@
+# tests/test_deadline.py
+
+import asyncio
+import time
+
+import pytest
+
+from app.utils.deadline import DeadlineExceeded, deadline, remaining, running_low, within_deadline
+
+def test_no_deadline_outside_a_request():
+    assert remaining() is None
+    assert not running_low(10)
+    assert asyncio.run(within_deadline(asyncio.sleep(0, "done"), "stage")) == "done"
+
+def test_nested_deadlines_only_shorten():
+    with deadline(1.0) as outer:
+        with deadline(10.0) as inner:
+            assert inner == outer
+        with deadline(0.5) as inner:
+            assert inner < outer
+        assert remaining() == pytest.approx(1.0, abs=0.1)
+    assert remaining() is None
+
+def test_running_low():
+    with deadline(0.5):
+        assert running_low(1.0)
+        assert not running_low(0.1)
+
+def test_stage_is_cancelled_when_the_budget_runs_out():
+    cancelled = []
+
+    async def stuck():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        with deadline(0.05):
+            await within_deadline(stuck(), "generation")
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as error:
+        asyncio.run(run())
+    assert error.value.stage == "generation"
+    assert cancelled and time.monotonic() - started < 1
+
+def test_spent_budget_never_starts_the_stage():
+    started = []
+
+    async def stage():
+        started.append(True)
+
+    async def run():
+        with deadline(0):
+            await within_deadline(stage(), "retrieval")
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert started == []
+
+def test_a_stage_timing_out_on_its_own_is_not_the_deadline():
+    async def stage():
+        raise asyncio.TimeoutError()
+
+    async def run():
+        with deadline(5):
+            await within_deadline(stage(), "history")
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+
+def test_deadline_is_seen_by_tasks_of_the_request():
+    async def stage():
+        return remaining()
+
+    async def run():
+        with deadline(2):
+            return await asyncio.create_task(stage())
+
+    assert 0 < asyncio.run(run()) <= 2
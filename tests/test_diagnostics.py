@@ -0,0 +1,119 @@
+# tests/test_diagnostics.py
+
+from collections import Counter
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.diagnostics import MemoryTracer, collapse, measure_loop_lag, sample_stacks, task_summary
+
+def spin_until(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_samples_busy_threads_but_not_idle_ones():
+    stop = threading.Event()
+    busy = threading.Thread(target=spin_until, args=(stop,), name="busy")
+    idle = threading.Thread(target=stop.wait, name="idle")
+    busy.start()
+    idle.start()
+    try:
+        stacks, samples = sample_stacks(0.2, interval=0.01)
+    finally:
+        stop.set()
+        busy.join()
+        idle.join()
+    assert samples > 0
+    threads = {stack.split(";")[0] for stack in stacks}
+    assert "busy" in threads and "idle" not in threads
+    assert any("spin_until (tests/test_diagnostics.py" in stack for stack in stacks)
+
+def test_one_profile_at_a_time():
+    started = threading.Event()
+    errors = []
+
+    def profile():
+        started.set()
+        sample_stacks(0.3)
+
+    first = threading.Thread(target=profile)
+    first.start()
+    started.wait()
+    time.sleep(0.05)
+    try:
+        sample_stacks(0.01)
+    except RuntimeError as e:
+        errors.append(e)
+    first.join()
+    assert len(errors) == 1
+    # Released once the first profile finished
+    sample_stacks(0.01)
+
+def test_collapsed_stacks_are_most_sampled_first():
+    assert collapse(Counter({"main;a;b": 2, "main;a;c": 5})) == "main;a;c 5\nmain;a;b 2\n"
+
+def test_memory_diff_shows_growth_since_the_baseline():
+    async def run():
+        tracer = MemoryTracer(max_seconds=60)
+        await tracer.start()
+        try:
+            kept = [bytearray(1000) for _ in range(1000)]
+            diff = await tracer.diff(limit=5)
+            return diff, len(kept)
+        finally:
+            tracer.stop()
+
+    diff, _ = asyncio.run(run())
+    assert diff["tracing"] and diff["total_growth_bytes"] >= 1_000_000
+    assert any(
+        "test_diagnostics.py" in site["site"][0] and site["size_diff_bytes"] >= 1_000_000
+        for site in diff["top"]
+    )
+
+def test_memory_tracing_stops_itself():
+    async def run():
+        tracer = MemoryTracer(max_seconds=0.05)
+        await tracer.start()
+        await asyncio.sleep(0.1)
+        return tracer
+
+    tracer = asyncio.run(run())
+    assert not tracer.tracing
+    with pytest.raises(RuntimeError):
+        asyncio.run(tracer.diff())
+
+def test_loop_lag_counts_blocking_callbacks():
+    async def run():
+        loop = asyncio.get_running_loop()
+        # Blocks the loop for 50ms partway through the measurement
+        loop.call_later(0.02, time.sleep, 0.05)
+        return await measure_loop_lag(samples=10, interval=0.01)
+
+    lag = asyncio.run(run())
+    assert lag["samples"] == 10
+    assert lag["max_ms"] >= 30
+    assert lag["p50_ms"] <= lag["p95_ms"] <= lag["max_ms"]
+
+async def waiting(event):
+    await event.wait()
+
+def test_tasks_are_grouped_by_coroutine():
+    async def run():
+        event = asyncio.Event()
+        tasks = [asyncio.create_task(waiting(event)) for _ in range(3)]
+        other = asyncio.create_task(asyncio.sleep(10))
+        await asyncio.sleep(0)
+        summary = task_summary(stack_depth=2)
+        event.set()
+        other.cancel()
+        await asyncio.gather(*tasks, other, return_exceptions=True)
+        return summary
+
+    summary = asyncio.run(run())
+    assert summary["total"] == 4
+    top = summary["groups"][0]
+    assert (top["coroutine"], top["count"]) == ("waiting", 3)
+    assert top["example_stack"][0].startswith("waiting (")
+    assert top["example_stack"][1].startswith("wait (")
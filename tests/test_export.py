@@ -0,0 +1,97 @@
+# tests/test_export.py
+
+import asyncio
+import glob
+import gzip
+import json
+import os
+
+import pytest
+
+from app.database import export
+from app.database.conversation import ConversationStore
+from app.database.export import export_messages, load_checkpoint
+
+@pytest.fixture
+def store(firestore_db):
+    return ConversationStore()
+
+def save(store, *contents, thread_ts="1.0"):
+    async def run():
+        for content in contents:
+            await store.save_message("C1", "U1", "user", content, thread_ts=thread_ts)
+    asyncio.run(run())
+
+def exported(out_dir):
+    rows = []
+    for path in sorted(glob.glob(os.path.join(out_dir, "*.jsonl.gz"))):
+        with gzip.open(path, "rt") as f:
+            rows.extend(json.loads(line) for line in f)
+    return rows
+
+def test_messages_are_split_into_parts(store, tmp_path):
+    save(store, *(f"m{i}" for i in range(5)))
+    out = str(tmp_path / "out")
+    assert asyncio.run(export_messages(store, out, page_size=2, part_size=2)) == 5
+    assert len(glob.glob(os.path.join(out, "messages-*.jsonl.gz"))) == 3
+    rows = exported(out)
+    assert [row["content"] for row in rows] == [f"m{i}" for i in range(5)]
+    assert rows[0]["thread_id"] == "C1:1.0" and json.loads(rows[0]["metadata"]) == {}
+    checkpoint = load_checkpoint(out)
+    assert checkpoint["parts"] == 3 and checkpoint["exported"] == 5
+    assert checkpoint["after_path"] == rows[-1]["path"]
+
+def test_rerun_exports_only_new_messages(store, tmp_path):
+    out = str(tmp_path / "out")
+    save(store, "first", "second")
+    asyncio.run(export_messages(store, out))
+    assert asyncio.run(export_messages(store, out)) == 0
+    save(store, "third", thread_ts="2.0")
+    assert asyncio.run(export_messages(store, out)) == 1
+    assert [row["content"] for row in exported(out)] == ["first", "second", "third"]
+
+def test_late_commits_within_the_overlap_are_exported(store, firestore_db, tmp_path):
+    out = str(tmp_path / "out")
+    save(store, "first", "second")
+    asyncio.run(export_messages(store, out))
+    # Committed after the export, with a seq assigned before "second"
+    seq = load_checkpoint(out)["after_seq"] - 1
+    firestore_db.docs[f"threads/C1:2.0/messages/{seq:020d}-late"] = {
+        "channel_id": "C1", "content": "late", "seq": seq
+    }
+    assert asyncio.run(export_messages(store, out, overlap=60)) == 1
+    assert [row["content"] for row in exported(out)][-1] == "late"
+
+def test_checkpoint_failure_is_not_masked(store, tmp_path, monkeypatch):
+    save(store, "first")
+    out = str(tmp_path / "out")
+
+    def fail(out_dir, checkpoint):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(export, "save_checkpoint", fail)
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(export_messages(store, out))
+
+def test_fetch_failure_leaves_no_partial_part(store, tmp_path, monkeypatch):
+    save(store, "first", "second", "third")
+    out = str(tmp_path / "out")
+
+    async def failing_pages(*args):
+        yield (await asyncio.to_thread(store.db.collection_group("messages").order_by("seq").limit(1).get))
+        raise ConnectionError("unavailable")
+
+    monkeypatch.setattr(store, "iter_messages", failing_pages)
+    with pytest.raises(ConnectionError):
+        asyncio.run(export_messages(store, out))
+    assert os.listdir(out) == []
+
+def test_parquet_export(store, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    save(store, "first", "second")
+    out = str(tmp_path / "out")
+    asyncio.run(export_messages(store, out, file_format="parquet"))
+    table = pq.read_table(glob.glob(os.path.join(out, "*.parquet"))[0])
+    assert table.column("content").to_pylist() == ["first", "second"]
+    with pytest.raises(ValueError):
+        asyncio.run(export_messages(store, out))
@@ -0,0 +1,149 @@
+# tests/test_faq.py
+
+from datetime import datetime, timezone
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.database import PermissionIndex
+from app.retrieval import faq, faq_job
+from app.retrieval.faq import (
+    FAQ_COLLECTION,
+    FAQEntry,
+    FAQIndex,
+    frequent_clusters,
+    normalize_rows,
+    spherical_kmeans
+)
+from app.retrieval.rag_engine import RAGEngine
+
+def entry(entry_id="a", version=3, generated_at=1_000_000.0, workspace_id=None):
+    return FAQEntry(entry_id, "question", "answer", "context", "gpt", "shared", workspace_id, version, generated_at)
+
+def test_kmeans_separates_directions():
+    rng = np.random.default_rng(0)
+    x = rng.normal([10, 0, 0], 0.5, size=(20, 3))
+    y = rng.normal([0, 10, 0], 0.5, size=(30, 3))
+    vectors = normalize_rows(np.vstack([x, y]))
+    centroids, labels, sims = spherical_kmeans(vectors, np.ones(50), k=2)
+    assert len(set(labels[:20])) == 1 and len(set(labels[20:])) == 1
+    assert labels[0] != labels[20]
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0, rtol=1e-5)
+    assert sims.min() > 0.9
+
+def test_k_is_capped_at_the_number_of_questions():
+    centroids, labels, _ = spherical_kmeans(normalize_rows(np.eye(3)), np.ones(3), k=10)
+    assert centroids.shape == (3, 3)
+    assert sorted(labels) == [0, 1, 2]
+
+def test_frequent_clusters_count_only_matching_askings():
+    centroids = np.eye(3, dtype=np.float32)
+    labels = np.array([0, 0, 0, 1, 1, 2])
+    sims = np.array([0.99, 0.95, 0.5, 0.99, 0.98, 0.99])
+    weights = np.array([1.0, 4.0, 100.0, 2.0, 2.0, 1.0])
+    clusters = frequent_clusters(centroids, labels, sims, weights, threshold=0.9, top=5, min_count=2)
+    # The question far from cluster 0's centroid doesn't count towards it
+    assert [(cluster.count, cluster.members) for cluster in clusters] == [(5, [1, 0]), (4, [3, 4])]
+    assert len(frequent_clusters(centroids, labels, sims, weights, threshold=0.9, top=1, min_count=1)) == 1
+
+def test_entries_expire_with_the_index_version_or_age(clock, monkeypatch):
+    monkeypatch.setattr(faq.settings, "FAQ_MAX_AGE_SECONDS", 100)
+    current = entry(generated_at=clock.now)
+    assert not current.expired(3)
+    assert current.expired(4)
+    assert current.expired(None)
+    clock.now += 101
+    assert current.expired(3)
+
+def test_entries_read_stored_timestamps():
+    stored = FAQEntry.from_dict("a", {
+        "question": "q", "index_version": 2, "generated_at": datetime(2024, 1, 1, tzinfo=timezone.utc)
+    })
+    assert (stored.index_version, stored.generated_at) == (2, 1704067200.0)
+
+def test_index_matches_the_nearest_centroid_above_the_threshold():
+    index = FAQIndex(threshold=0.9, refresh_interval=0)
+    index.load([(entry("x"), [1.0, 0.0]), (entry("y"), [0.0, 2.0]), (entry("empty"), [])])
+    assert len(index) == 2
+    found, score = index.match([0.1, 3.0])
+    assert found.id == "y" and score == pytest.approx(3 / np.sqrt(9.01))
+    assert index.match([1.0, 1.0]) is None
+    # Embeddings of another model never match
+    assert index.match([1.0, 0.0, 0.0]) is None
+
+def test_index_loads_only_approved_answers(firestore_db):
+    answers = firestore_db.collection(FAQ_COLLECTION)
+    answers.document("a").set({"question": "approved", "centroid": [1.0, 0.0], "approved": True})
+    answers.document("b").set({"question": "review", "centroid": [0.0, 1.0], "approved": False})
+    index = FAQIndex(refresh_interval=0)
+    assert asyncio.run(index.refresh()) == 1
+    assert index.match([1.0, 0.0])[0].question == "approved"
+
+class FakeMessages:
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def iter_messages(self):
+        yield [FakeMessage(kind, content) for kind, content in self.messages]
+
+class FakeMessage:
+    def __init__(self, kind, content):
+        self.data = {"message_type": kind, "content": content}
+
+    def to_dict(self):
+        return self.data
+
+def test_questions_are_counted_by_normalized_text():
+    store = FakeMessages([
+        ("user", "How do I reset my password?"),
+        ("assistant", "How do I reset my password?"),
+        ("user", "how do I  reset my PASSWORD?"),
+        ("user", "thanks"),
+        ("user", "Where is the holiday calendar?")
+    ])
+    questions = asyncio.run(faq_job.collect_questions(store, min_words=3, max_questions=10))
+    assert questions == [("How do I reset my password?", 2), ("Where is the holiday calendar?", 1)]
+
+def test_entry_ids_are_stable_per_workspace():
+    assert faq_job.entry_id("Reset  PASSWORD") == faq_job.entry_id("reset password")
+    assert faq_job.entry_id("reset password", "T1") != faq_job.entry_id("reset password")
+
+class FakeDependency:
+    async def call(self, factory):
+        return await factory()
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        return [1.0, 0.0]
+
+class VersionedVectorStore:
+    def __init__(self, version):
+        self.version = version
+        self.embedding_dependency = FakeDependency()
+        self.embeddings = FakeEmbeddings()
+
+    async def index_version(self, namespace):
+        return self.version
+
+def faq_engine(version, workspace_id=None, permission_index=None):
+    engine = RAGEngine.__new__(RAGEngine)
+    engine.faq_index = FAQIndex(threshold=0.9, refresh_interval=0)
+    engine.faq_index.load([(entry(workspace_id=workspace_id, generated_at=1_000_000.0), [1.0, 0.0])])
+    engine.vector_store = VersionedVectorStore(version)
+    engine.permission_index = permission_index
+    return engine
+
+def test_current_answers_are_served(clock):
+    answer = asyncio.run(faq_engine(3)._faq_answer("question", "U1"))
+    assert (answer["response"], answer["faq_id"]) == ("answer", "a")
+
+def test_answers_of_an_older_index_version_are_not_served(clock):
+    assert asyncio.run(faq_engine(4)._faq_answer("question", "U1")) is None
+
+def test_answers_of_another_workspace_are_not_served(clock):
+    index = PermissionIndex(refresh_interval=0)
+    index.load([{"slack_id": "U1", "workspace_id": "T1"}, {"slack_id": "U2", "workspace_id": "T2"}])
+    assert asyncio.run(faq_engine(3, "T1", index)._faq_answer("question", "U1")) is not None
+    assert asyncio.run(faq_engine(3, "T1", index)._faq_answer("question", "U2")) is None
+    assert asyncio.run(faq_engine(3, "T1", index)._faq_answer("question", None)) is None
@@ -0,0 +1,128 @@
+# tests/test_helpers.py
+
+import random
+
+import pytest
+
+from app.utils.helpers import (
+    SLACK_MESSAGE_TEXT_LIMIT,
+    chunk_message,
+    format_slack_message,
+    iter_message_chunks,
+    slack_reply_chunks
+)
+
+def random_markdown(rng: random.Random) -> str:
+    """Prose, list items with continuations, fences and blank lines"""
+    def words(count: int) -> str:
+        return " ".join("".join(rng.choice("wxyz") for _ in range(rng.randint(1, 25))) for _ in range(count))
+
+    lines = []
+    for _ in range(rng.randint(1, 30)):
+        kind = rng.random()
+        if kind < 0.15:
+            lines.append("```")
+        elif kind < 0.35:
+            lines.append(f"- item {words(rng.randint(1, 5))}")
+        elif kind < 0.5:
+            lines.append(f"   continuation {words(rng.randint(1, 5))}")
+        elif kind < 0.6:
+            lines.append("")
+        else:
+            lines.append(words(rng.randint(1, 8)))
+    return "\n".join(lines)
+
+def visible(text: str) -> str:
+    return "".join(text.replace("```", "").split())
+
+def test_short_message_is_one_chunk():
+    assert chunk_message("hello", 100) == ["hello"]
+
+def test_blank_message_has_no_chunks():
+    assert chunk_message("", 100) == []
+    assert chunk_message("  \n ", 100) == []
+
+def test_chunks_respect_the_limit():
+    chunks = chunk_message("word " * 200, 100)
+    assert len(chunks) > 1
+    assert all(0 < len(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == ["word"] * 200
+
+def test_long_line_is_split():
+    chunks = chunk_message("x" * 250, 100)
+    assert "".join(chunks) == "x" * 250
+    assert all(len(chunk) <= 100 for chunk in chunks)
+
+def test_trailing_blank_lines_make_no_empty_chunk():
+    assert chunk_message("a\n" * 5 + "\n" * 50, 12) == ["a\na\na\na", "a"]
+
+def test_list_item_moves_with_its_continuation():
+    text = "intro " * 6 + "\n- item one\n   continued\n- item two"
+    chunks = chunk_message(text, 40)
+    assert "- item one\n   continued" in chunks[1]
+
+def test_list_item_that_no_longer_fits_is_sent_alone():
+    text = (
+        "ww wwwwwwwww wwwwwwwww wwwwwwwwww wwwwwwwwwwww wwwww\n"
+        "- item xxxxxxxxxxxxxxxxx\n"
+        "   continuation yyyyyyyyyyyyy"
+    )
+    chunks = chunk_message(text, 50)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert visible("".join(chunks)) == visible(text)
+
+def test_code_fence_is_closed_and_reopened_across_chunks():
+    text = "```\n" + "\n".join(f"line {i}" for i in range(30)) + "\n```"
+    chunks = chunk_message(text, 60)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 60
+        assert chunk.startswith("```\n") and chunk.endswith("\n```")
+
+def test_prefix_and_suffix_count_towards_the_limit():
+    chunks = chunk_message("word " * 100, 60, chunk_prefix="> ", chunk_suffix=" …")
+    assert all(len(chunk) <= 60 and chunk.startswith("> ") for chunk in chunks)
+
+def test_limit_too_small_for_prefix():
+    with pytest.raises(ValueError):
+        chunk_message("word " * 100, 10, chunk_prefix="x" * 8)
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_chunks_fit_and_keep_the_text(seed):
+    rng = random.Random(seed)
+    text = random_markdown(rng)
+    max_length = rng.randint(20, 120)
+    chunks = chunk_message(text, max_length)
+    assert all(len(chunk) <= max_length for chunk in chunks)
+    assert visible("".join(chunks)) == visible(text)
+    if len(text) > max_length:
+        # Blank runs and bare fences are never sent on their own
+        assert all(visible(chunk) for chunk in chunks)
+
+def test_stream_is_chunked_like_text():
+    rng = random.Random(0)
+    text = "\n\n".join(random_markdown(rng) for _ in range(20))
+    fragments = (text[i:i + 7] for i in range(0, len(text), 7))
+    assert list(iter_message_chunks(fragments, 200)) == chunk_message(text, 200)
+
+def test_format_converts_markdown():
+    assert format_slack_message("**bold** and __two words__") == "*bold* and *two words*"
+    assert format_slack_message("*italic* text") == "_italic_ text"
+    assert format_slack_message("~~gone~~") == "~gone~"
+    assert format_slack_message("# Title") == "*Title*"
+    assert format_slack_message("[docs](https://example.com)") == "<https://example.com|docs>"
+    assert format_slack_message("hi <@U123ABC>") == "hi @U123ABC"
+
+def test_format_keeps_identifiers():
+    assert format_slack_message("call __init__ or my__var") == "call __init__ or my__var"
+    assert format_slack_message("2*3*4 and a**b") == "2*3*4 and a**b"
+
+def test_format_leaves_code_alone():
+    assert format_slack_message("`**not bold**`") == "`**not bold**`"
+    assert format_slack_message("```python\nx = **y**\n```") == "```\nx = **y**\n```"
+
+def test_reply_chunks_are_formatted_and_fit_a_message():
+    chunks = slack_reply_chunks("**Answer**\n" + "word " * 20000)
+    assert chunks[0].startswith("*Answer*")
+    assert len(chunks) > 1
+    assert all(len(chunk) <= SLACK_MESSAGE_TEXT_LIMIT for chunk in chunks)
@@ -0,0 +1,188 @@
+# tests/test_ingest.py
+
+from datetime import datetime
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from app.ingest import pipeline
+from app.ingest.parsers import _READ_BYTES, file_type_for, parse_docx, parse_html, parse_text
+from app.ingest.pipeline import index_file
+from app.ingest.pool import SEGMENT_CHARS, STREAM_SEGMENTS, DocumentParser, ParseError
+from app.models import DocumentMetadata, ProcessingStatus
+
+def test_file_types():
+    assert file_type_for("notes/README.MD") == "text"
+    assert file_type_for("page.htm") == "html"
+    assert file_type_for("image.png") is None
+
+def test_text_is_decoded_across_read_boundaries(monkeypatch):
+    from app.ingest import parsers
+    monkeypatch.setattr(parsers, "_READ_BYTES", 3)
+    text = "héllo wörld ✓"
+    assert "".join(parse_text(text.encode("utf-8"), {})) == text
+
+def test_html_keeps_visible_text_and_the_title():
+    info = {}
+    html = b"<html><head><title> Handbook </title><style>p {}</style></head>" \
+        b"<body><h1>Leave</h1><p>Ask your manager.</p><script>track()</script></body></html>"
+    text = "".join(parse_html(html, info))
+    assert info["title"] == "Handbook"
+    assert "Leave" in text and "Ask your manager." in text
+    assert "track" not in text and "p {}" not in text
+
+def test_docx_paragraphs_and_title():
+    word = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        archive.writestr("docProps/core.xml", (
+            '<cp:coreProperties xmlns:cp="cp" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            "<dc:title>Policy</dc:title></cp:coreProperties>"
+        ))
+        archive.writestr("word/document.xml", (
+            f'<w:document xmlns:w="{word}"><w:body>'
+            "<w:p><w:r><w:t>First </w:t></w:r><w:r><w:t>paragraph</w:t></w:r></w:p>"
+            "<w:p/><w:p><w:r><w:t>Second</w:t></w:r></w:p>"
+            "</w:body></w:document>"
+        ))
+    info = {}
+    assert list(parse_docx(buf.getvalue(), info)) == ["First paragraph\n", "Second\n"]
+    assert info["title"] == "Policy"
+
+def document(title="doc.txt"):
+    now = datetime.utcnow()
+    return DocumentMetadata(
+        id="doc", title=title, source=f"/tmp/{title}", file_type="text", file_size=0,
+        created_at=now, updated_at=now, processed_at=None, status=ProcessingStatus.PROCESSING,
+        chunk_count=None, embedding_model=None, error=None, user_id=None, workspace_id="T1",
+        permissions={"public": True}
+    )
+
+class FakeStream:
+    """Parse stream yielding segments, then raising `error` if set"""
+
+    def __init__(self, segments, error=None):
+        self.metadata = document()
+        self.segments = segments
+        self.error = error
+        self.closed = False
+
+    async def __aiter__(self):
+        for segment in self.segments:
+            yield segment
+        if self.error:
+            self.metadata.update_status(ProcessingStatus.FAILED, str(self.error))
+            raise self.error
+
+    def close(self):
+        self.closed = True
+
+class FakeParser:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def parse(self, path, **document):
+        return self.stream
+
+class FakeStore:
+    """Vector store holding IDs, with chunks of an earlier, longer version"""
+
+    def __init__(self, existing=10):
+        self.ids = {f"doc#{i}" for i in range(existing)}
+        self.metadatas = {}
+
+    async def add_texts(self, texts, metadatas, ids, namespace=None):
+        self.ids.update(ids)
+        self.metadatas.update(zip(ids, metadatas))
+        return ids
+
+    async def list_ids(self, prefix, namespace=None):
+        return sorted(vector_id for vector_id in self.ids if vector_id.startswith(prefix))
+
+    async def delete(self, ids, namespace=None):
+        self.ids.difference_update(ids)
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(pipeline.settings, "CHUNK_SIZE", 20)
+    monkeypatch.setattr(pipeline.settings, "CHUNK_OVERLAP", 0)
+    monkeypatch.setattr(pipeline.settings, "INGEST_BATCH_CHUNKS", 2)
+
+WORDS = " ".join(f"word{i:03d}" for i in range(40))
+
+def test_reindexing_a_shorter_file_deletes_leftover_chunks(small_batches):
+    store = FakeStore()
+    stream = FakeStream([WORDS[:100]])
+    metadata = asyncio.run(index_file(FakeParser(stream), store, "doc.txt"))
+    assert metadata.status == ProcessingStatus.INDEXED
+    assert store.ids == {f"doc#{i}" for i in range(metadata.chunk_count)}
+    assert store.metadatas["doc#0"]["chunk"] == 0 and store.metadatas["doc#0"]["workspace_id"] == "T1"
+    assert stream.closed
+
+def test_failure_after_a_flush_leaves_no_mix_of_versions(small_batches):
+    store = FakeStore(existing=50)
+    stream = FakeStream([WORDS], error=ParseError("worker died"))
+    metadata = asyncio.run(index_file(FakeParser(stream), store, "doc.txt"))
+    assert metadata.status == ProcessingStatus.FAILED and metadata.error == "worker died"
+    assert 0 < metadata.chunk_count < 50
+    assert store.ids == {f"doc#{i}" for i in range(metadata.chunk_count)}
+    assert stream.closed
+
+def test_failure_before_any_flush_keeps_the_earlier_version(small_batches):
+    store = FakeStore()
+    stream = FakeStream([], error=ParseError("corrupt file"))
+    metadata = asyncio.run(index_file(FakeParser(stream), store, "doc.txt"))
+    assert metadata.status == ProcessingStatus.FAILED
+    assert store.ids == {f"doc#{i}" for i in range(10)}
+
+def test_pool_streams_files_and_titles(tmp_path):
+    html = tmp_path / "page.html"
+    html.write_text("<title>Page</title><p>" + "x" * (2 * SEGMENT_CHARS) + "</p>")
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+
+    async def run():
+        async with DocumentParser(workers=1, timeout=30, memory_mb=0) as parser:
+            page = parser.parse(str(html), workspace_id="T1")
+            text = "".join([segment async for segment in page])
+            nothing = [segment async for segment in parser.parse(str(empty))]
+            return page.metadata, text, nothing
+
+    metadata, text, nothing = asyncio.run(run())
+    assert metadata.title == "Page" and metadata.status == ProcessingStatus.COMPLETED
+    assert text.count("x") == 2 * SEGMENT_CHARS
+    assert nothing == []
+
+def test_unsupported_files_are_rejected(tmp_path):
+    async def run():
+        async with DocumentParser(workers=1) as parser:
+            parser.parse(str(tmp_path / "image.png"))
+
+    with pytest.raises(ParseError):
+        asyncio.run(run())
+
+def test_a_slow_reader_holds_back_only_its_own_file(tmp_path):
+    # Text files are read a megabyte at a time, one segment per read
+    size = (STREAM_SEGMENTS + 8) * _READ_BYTES
+    big = tmp_path / "big.txt"
+    big.write_text("y" * size)
+    small = tmp_path / "small.txt"
+    small.write_text("z" * (3 * SEGMENT_CHARS))
+
+    async def run():
+        async with DocumentParser(workers=2, timeout=30, memory_mb=0) as parser:
+            slow = parser.parse(str(big))
+            await asyncio.sleep(1)
+            # Nobody reads the big file; its worker pauses instead of
+            # filling memory or stalling the other file's text
+            text = "".join([segment async for segment in parser.parse(str(small))])
+            buffered = slow._segments.qsize()
+            read = sum([len(segment) async for segment in slow])
+            return text, buffered, read
+
+    text, buffered, read = asyncio.run(asyncio.wait_for(run(), timeout=20))
+    assert len(text) == 3 * SEGMENT_CHARS
+    assert buffered <= STREAM_SEGMENTS
+    assert read == size
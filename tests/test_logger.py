@@ -0,0 +1,85 @@
+# tests/test_logger.py
+
+import json
+import logging
+import queue
+import sys
+import time
+
+import pytest
+
+from app.utils.logger import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    bind_request_context,
+    request_id_var
+)
+
+@pytest.fixture
+def monotonic(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+def record(msg: str, *args, level: int = logging.ERROR, name: str = "app.test") -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+def test_json_lines_carry_context_and_extras():
+    item = record("Error loading %s", "doc-1")
+    item.request_id = "req-1"
+    item.document_id = "doc-1"
+    payload = json.loads(JsonFormatter().format(item))
+    assert payload["message"] == "Error loading doc-1"
+    assert payload["level"] == "ERROR" and payload["logger"] == "app.test"
+    assert payload["request_id"] == "req-1" and payload["trace_id"] is None
+    assert payload["document_id"] == "doc-1"
+    assert payload["timestamp"].endswith("Z")
+
+def test_json_includes_the_exception():
+    try:
+        raise ValueError("bad input")
+    except ValueError:
+        item = logging.LogRecord("app.test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+    payload = json.loads(JsonFormatter().format(item))
+    assert "ValueError: bad input" in payload["exception"]
+
+def test_repeated_errors_are_capped_per_template(monotonic):
+    limiter = RateLimitFilter(limit=2, interval=60)
+    passed = [limiter.filter(record("Error loading %s", f"doc-{i}")) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    # Another template has its own allowance
+    assert limiter.filter(record("Error saving %s", "doc-1"))
+
+def test_next_window_reports_suppressed_errors(monotonic):
+    limiter = RateLimitFilter(limit=1, interval=60)
+    for i in range(4):
+        limiter.filter(record("Error loading %s", i))
+    monotonic[0] += 60
+    item = record("Error loading %s", 5)
+    assert limiter.filter(item)
+    assert item.suppressed == 3
+
+def test_lower_levels_are_never_capped(monotonic):
+    limiter = RateLimitFilter(limit=1, interval=60)
+    assert all(limiter.filter(record("Slow call", level=logging.WARNING)) for _ in range(10))
+
+def test_queue_handler_resolves_message_and_context_on_the_caller():
+    log_queue: queue.Queue = queue.Queue()
+    handler = NonBlockingQueueHandler(log_queue)
+    token = request_id_var.set(None)
+    try:
+        bind_request_context(request_id="req-42")
+        handler.handle(record("Answered in %.1fs", 1.25))
+    finally:
+        request_id_var.reset(token)
+    queued = log_queue.get_nowait()
+    assert (queued.msg, queued.args) == ("Answered in 1.2s", None)
+    assert queued.request_id == "req-42"
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    for i in range(5):
+        handler.handle(record("message %s", i))
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
@@ -0,0 +1,58 @@
+# tests/test_migrate.py
+
+from datetime import datetime, timedelta, timezone
+
+from app.database.migrate import migrate
+
+def seed(db):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        ("a", "C1", "1.0", "U1", "question"),
+        ("b", "C1", "1.0", "bot", "answer"),
+        ("c", "C1", None, "U2", "hello"),
+        ("d", None, None, "U3", "no channel")
+    ]
+    for i, (doc_id, channel_id, thread_ts, user_id, content) in enumerate(rows):
+        db.docs[f"conversations/{doc_id}"] = {
+            "channel_id": channel_id,
+            "thread_ts": thread_ts,
+            "user_id": user_id,
+            "content": content,
+            "timestamp": start + timedelta(minutes=i)
+        }
+
+def messages(db, thread_id):
+    prefix = f"threads/{thread_id}/messages/"
+    return [db.docs[path]["content"] for path in sorted(db.docs) if path.startswith(prefix)]
+
+def test_documents_move_into_their_threads(firestore_db):
+    seed(firestore_db)
+    assert migrate(firestore_db, page_size=2) == 3
+    assert messages(firestore_db, "C1:1.0") == ["question", "answer"]
+    assert messages(firestore_db, "C1:main") == ["hello"]
+    thread = firestore_db.docs["threads/C1:1.0"]
+    assert thread["message_count"] == 2
+    assert thread["participants"] == ["U1", "bot"]
+    assert thread["last_message_at"] == datetime(2024, 1, 1, 0, 1, tzinfo=timezone.utc)
+    # Sources stay unless asked to delete them
+    assert "conversations/a" in firestore_db.docs
+
+def test_rerunning_is_idempotent(firestore_db):
+    seed(firestore_db)
+    migrate(firestore_db)
+    before = dict(firestore_db.docs)
+    migrate(firestore_db)
+    assert firestore_db.docs == before
+
+def test_dry_run_writes_nothing(firestore_db):
+    seed(firestore_db)
+    assert migrate(firestore_db, dry_run=True) == 3
+    assert not [path for path in firestore_db.docs if path.startswith("threads/")]
+
+def test_delete_source_and_resume(firestore_db):
+    seed(firestore_db)
+    assert migrate(firestore_db, delete_source=True, start_after="a") == 2
+    assert messages(firestore_db, "C1:1.0") == ["answer"]
+    assert sorted(path for path in firestore_db.docs if path.startswith("conversations/")) == [
+        "conversations/a", "conversations/d"
+    ]
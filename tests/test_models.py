@@ -0,0 +1,61 @@
+# tests/test_models.py
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models import MessageRecord, MessageType
+
+def test_record_from_dict():
+    record = MessageRecord.from_dict({
+        "id": "m1",
+        "channel_id": "C1",
+        "user_id": "U1",
+        "thread_ts": "1700000000.000100",
+        "message_type": MessageType.ASSISTANT.value,
+        "content": "hi",
+        "timestamp": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "metadata": {"source": "slack"}
+    })
+    assert record.id == "m1"
+    assert record.thread_ts == "1700000000.000100"
+    assert record.message_type == MessageType.ASSISTANT.value
+    assert record.timestamp == datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+    assert record.metadata == {"source": "slack"}
+
+def test_record_from_dict_defaults():
+    record = MessageRecord.from_dict({})
+    assert (record.id, record.channel_id, record.user_id, record.content) == ("", "", "", "")
+    assert record.thread_ts is None
+    assert record.message_type == MessageType.USER.value
+    assert record.timestamp == 0.0
+    assert record.metadata == {}
+
+def test_record_from_dict_timestamps():
+    assert MessageRecord.from_dict({"timestamp": "1700000000.5"}).timestamp == 1700000000.5
+    assert MessageRecord.from_dict({"timestamp": 12}).timestamp == 12.0
+    assert MessageRecord.from_dict({"timestamp": "not a time"}).timestamp == 0.0
+
+def test_record_from_event():
+    record = MessageRecord.from_event({
+        "ts": "1700000000.000200", "channel": "C1", "user": "U1", "text": "hello", "thread_ts": "1.0"
+    })
+    assert (record.id, record.channel_id, record.user_id, record.thread_ts) == ("1700000000.000200", "C1", "U1", "1.0")
+    assert record.message_type == MessageType.USER.value
+    assert record.timestamp == 1700000000.0002
+
+def test_record_is_immutable_and_shares_no_metadata():
+    first, second = MessageRecord.from_dict({}), MessageRecord.from_dict({})
+    assert first.metadata is second.metadata
+    with pytest.raises(TypeError):
+        first.metadata["key"] = "value"
+    with pytest.raises(AttributeError):
+        first.content = "changed"
+
+def test_record_round_trips_through_the_model():
+    record = MessageRecord.from_dict({
+        "id": "m1", "channel_id": "C1", "user_id": "U1", "content": "hi",
+        "timestamp": 1700000000.0, "metadata": {"k": "v"}
+    })
+    assert MessageRecord.from_model(record.to_model()) == record
+    assert record.to_dict()["metadata"] == {"k": "v"}
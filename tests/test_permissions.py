@@ -0,0 +1,79 @@
+# tests/test_permissions.py
+
+import asyncio
+
+import pytest
+
+from app.database import PermissionIndex
+from app.retrieval import rag_engine
+from app.retrieval.rag_engine import RAGEngine
+
+@pytest.fixture
+def index():
+    index = PermissionIndex(refresh_interval=0)
+    index.load([
+        {"slack_id": "U1", "workspace_id": "T1", "groups": ["eng"]},
+        {"slack_id": "U2", "groups": ["eng"]},
+        {"workspace_id": "T1"}
+    ])
+    return index
+
+def test_users_read_public_documents_of_their_workspace(index):
+    access = index.access_for("U1")
+    assert access.workspace_id == "T1"
+    assert access.principals == {"public", "user:U1", "group:eng"}
+    assert index.filter_for("U1") == {
+        "acl": {"$in": ["group:eng", "public", "user:U1"]},
+        "workspace_id": {"$eq": "T1"}
+    }
+
+def test_users_without_a_workspace_never_read_public_documents(index):
+    access = index.access_for("U2")
+    assert access.workspace_id is None
+    assert "public" not in access.principals
+    assert index.filter_for("U2") == {"acl": {"$in": ["group:eng", "user:U2"]}}
+
+def test_unknown_users_only_read_what_is_shared_with_them(index):
+    assert index.filter_for("U9") == {"acl": {"$in": ["user:U9"]}}
+
+def test_filters_are_rebuilt_after_a_reload(index):
+    assert "workspace_id" not in index.filter_for("U2")
+    index.load([{"slack_id": "U2", "workspace_id": "T2"}])
+    assert index.filter_for("U2")["workspace_id"] == {"$eq": "T2"}
+
+class RecordingVectorStore:
+    def __init__(self):
+        self.calls = []
+
+    async def get_relevant_results(self, question, **kwargs):
+        self.calls.append(kwargs)
+        return [{"content": "found"}]
+
+def engine(permission_index):
+    """Engine with only what retrieval needs; the real one connects to Pinecone"""
+    engine = RAGEngine.__new__(RAGEngine)
+    engine.permission_index = permission_index
+    engine.vector_store = RecordingVectorStore()
+    return engine
+
+@pytest.fixture
+def namespaces(monkeypatch):
+    monkeypatch.setattr(rag_engine.settings, "RETRIEVAL_NAMESPACES", ["{user_id}", "{workspace_id}", "{shared}"])
+    monkeypatch.setattr(rag_engine.settings, "SHARED_NAMESPACE", "shared")
+
+def test_every_other_namespace_is_filtered(index, namespaces):
+    searches = engine(index)._retrieval_searches("U1")
+    assert [(search.namespace, search.filter) for search in searches] == [
+        ("U1", None), ("T1", index.filter_for("U1")), ("shared", index.filter_for("U1"))
+    ]
+
+def test_anonymous_requests_skip_filtered_namespaces(index, namespaces):
+    rag = engine(index)
+    assert rag._retrieval_searches(None) == []
+    assert asyncio.run(rag.retrieve("question", None, max_chunks=3, adaptive=False)) == []
+    # No unfiltered fallback search was made
+    assert rag.vector_store.calls == []
+
+def test_without_acl_filtering_namespaces_are_unfiltered(namespaces):
+    searches = engine(None)._retrieval_searches(None)
+    assert [(search.namespace, search.filter) for search in searches] == [("shared", None)]
@@ -0,0 +1,130 @@
+# tests/test_resilience.py
+
+import asyncio
+import time
+
+import pytest
+
+from app.utils.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, Dependency
+
+@pytest.fixture
+def monotonic(monkeypatch):
+    """Monotonic clock the tests move forward by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+@pytest.fixture
+def breaker(monotonic):
+    return CircuitBreaker("test", failure_rate=0.5, min_calls=4, window=10, cooldown=30)
+
+def fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record(False)
+
+def test_stays_closed_below_min_calls(breaker):
+    fail(breaker, 3)
+    assert breaker.state == CLOSED
+
+def test_stays_closed_below_failure_rate(breaker):
+    for success in (True, True, True, False, True, False):
+        assert breaker.allow()
+        breaker.record(success)
+    assert breaker.state == CLOSED
+
+def test_opens_at_failure_rate(breaker):
+    for success in (True, False, True, False):
+        breaker.allow()
+        breaker.record(success)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+def test_half_open_after_cooldown_lets_one_probe(breaker, monotonic):
+    fail(breaker, 4)
+    monotonic[0] += 29
+    assert not breaker.allow()
+    monotonic[0] += 1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+def test_successful_probe_closes(breaker, monotonic):
+    fail(breaker, 4)
+    monotonic[0] += 30
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    # Failures before the circuit opened no longer count
+    fail(breaker, 3)
+    assert breaker.state == CLOSED
+
+def test_failed_probe_reopens(breaker, monotonic):
+    fail(breaker, 4)
+    monotonic[0] += 30
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    monotonic[0] += 29
+    assert not breaker.allow()
+
+def test_cancelled_probe_is_released(breaker, monotonic):
+    fail(breaker, 4)
+    monotonic[0] += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+def calls(results):
+    """Request factory returning (delay, value) pairs in turn; values that are exceptions are raised"""
+    made = []
+
+    async def factory():
+        delay, value = results[len(made)]
+        made.append(value)
+        await asyncio.sleep(delay)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    return factory, made
+
+def test_slow_calls_are_hedged():
+    dependency = Dependency("test", hedge=True)
+    for _ in range(20):
+        dependency.latency.add(0.001)
+    factory, made = calls([(1.0, "slow"), (0.0, "fast")])
+    started = time.monotonic()
+    assert asyncio.run(dependency.call(factory)) == "fast"
+    assert made == ["slow", "fast"]
+    # The minimum hedge delay applies, not the 1 ms quantile
+    assert 0.05 <= time.monotonic() - started < 0.5
+
+def test_no_hedge_without_enough_samples():
+    dependency = Dependency("test", hedge=True)
+    factory, made = calls([(0.1, "only")])
+    assert asyncio.run(dependency.call(factory)) == "only"
+    assert made == ["only"]
+
+def test_a_failed_hedge_waits_for_the_original():
+    dependency = Dependency("test", hedge=True)
+    for _ in range(20):
+        dependency.latency.add(0.001)
+    factory, _ = calls([(0.1, "original"), (0.0, RuntimeError("hedge failed"))])
+    assert asyncio.run(dependency.call(factory)) == "original"
+
+def test_open_circuit_rejects_calls():
+    dependency = Dependency("test", hedge=False)
+    dependency.breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=2, window=10, cooldown=30)
+    factory, made = calls([(0.0, RuntimeError("down"))] * 2)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await dependency.call(factory)
+        with pytest.raises(CircuitOpenError):
+            await dependency.call(factory)
+
+    asyncio.run(run())
+    assert len(made) == 2
@@ -0,0 +1,41 @@
+# tests/test_retention.py
+
+from datetime import datetime, timedelta, timezone
+import asyncio
+
+import pytest
+
+from app.database import conversation
+from app.database.conversation import ConversationStore
+from app.database.retention import expire_conversations
+
+@pytest.fixture
+def store(firestore_db):
+    store = ConversationStore()
+
+    async def seed():
+        for thread_ts in ("1.0", "2.0"):
+            for i in range(3):
+                await store.save_message("C1", "U1", "user", f"m{i}", thread_ts=thread_ts)
+
+    asyncio.run(seed())
+    # The first thread has been idle for 100 days
+    firestore_db.docs["threads/C1:1.0"]["last_message_at"] = datetime.now(timezone.utc) - timedelta(days=100)
+    return store
+
+def test_idle_threads_are_deleted_with_their_messages(store, firestore_db):
+    assert asyncio.run(expire_conversations(store, retention_days=90)) == 4
+    assert not [path for path in firestore_db.docs if path.startswith("threads/C1:1.0")]
+    assert "threads/C1:2.0" in firestore_db.docs
+    assert len(asyncio.run(store.get_conversation_history("C1", "2.0"))) == 3
+
+def test_retention_is_disabled_by_default(store, firestore_db):
+    before = dict(firestore_db.docs)
+    assert asyncio.run(expire_conversations(store, retention_days=0)) == 0
+    assert firestore_db.docs == before
+
+def test_deletes_are_batched(store, firestore_db, monkeypatch):
+    monkeypatch.setattr(conversation.settings, "DELETE_BATCH_SIZE", 2)
+    commits = firestore_db.commits
+    asyncio.run(expire_conversations(store, retention_days=90))
+    assert firestore_db.commits - commits == 2
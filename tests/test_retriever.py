@@ -0,0 +1,152 @@
+# tests/test_retriever.py
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.database.embeddings import BatchingEmbeddings
+from app.database.local_index import LocalVectorIndex, quantize_binary, quantize_int8, truncate_embeddings
+from app.database.vector_store import adaptive_cutoff
+
+def test_cutoff_keeps_min_when_few_results():
+    assert adaptive_cutoff([0.9, 0.8], min_k=3, max_k=8, relevance_target=0.9, min_gap=0.1) == (2, "min")
+
+def test_cutoff_stops_at_a_gap():
+    scores = [0.9, 0.88, 0.86, 0.4, 0.38, 0.36]
+    assert adaptive_cutoff(scores, min_k=1, max_k=6, relevance_target=1.0, min_gap=0.2) == (3, "gap")
+
+def test_cutoff_ignores_small_gaps():
+    scores = [0.9, 0.85, 0.8, 0.75, 0.7]
+    assert adaptive_cutoff(scores, min_k=1, max_k=8, relevance_target=1.0, min_gap=0.2) == (5, "exhausted")
+
+def test_cutoff_stops_at_max():
+    scores = [0.9, 0.85, 0.8, 0.75, 0.7]
+    assert adaptive_cutoff(scores, min_k=1, max_k=3, relevance_target=1.0, min_gap=0.2) == (3, "max")
+
+def test_cutoff_stops_at_relevance_target():
+    scores = [1.0, 0.5, 0.25, 0.125, 0.0625]
+    assert adaptive_cutoff(scores, min_k=1, max_k=5, relevance_target=0.75, min_gap=1.0) == (2, "target")
+
+def test_cutoff_never_goes_below_min():
+    scores = [0.9, 0.1, 0.09, 0.08]
+    assert adaptive_cutoff(scores, min_k=2, max_k=4, relevance_target=0.5, min_gap=0.5)[0] >= 2
+
+def test_truncate_renormalizes():
+    vectors = truncate_embeddings(np.array([[3.0, 4.0, 12.0]]), 2)
+    np.testing.assert_allclose(vectors, [[0.6, 0.8]], rtol=1e-6)
+
+def test_quantize_int8_round_trip():
+    vectors = truncate_embeddings(np.random.default_rng(0).normal(size=(8, 32)))
+    codes, scales = quantize_int8(vectors)
+    assert codes.dtype == np.int8 and codes.shape == vectors.shape
+    np.testing.assert_allclose(codes * scales[:, None], vectors, atol=scales.max())
+
+def test_quantize_binary_packs_sign_bits():
+    codes = quantize_binary(np.array([[1.0, -1.0, 0.5, -0.5, 1.0, 1.0, -1.0, -1.0, 1.0]]))
+    assert codes.dtype == np.uint8 and codes.shape == (1, 2)
+    assert codes[0, 0] == 0b10101100 and codes[0, 1] == 0b10000000
+
+def test_index_rejects_unknown_precision():
+    with pytest.raises(ValueError):
+        LocalVectorIndex(precision="float16")
+
+@pytest.mark.parametrize("precision", ["float32", "int8", "binary"])
+def test_quantized_search_is_rescored(precision, tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(500, 64)).astype(np.float32)
+    index = LocalVectorIndex(
+        precision=precision,
+        rescore_factor=10,
+        full_precision_path=str(tmp_path / "vectors.npy")
+    )
+    index.add([f"doc-{i}" for i in range(len(vectors))], vectors, [{"i": i} for i in range(len(vectors))])
+
+    query = vectors[42] + rng.normal(scale=0.1, size=64)
+    exact = truncate_embeddings(vectors) @ truncate_embeddings(query)
+    results = index.search(query, k=5)
+    assert results[0]["id"] == "doc-42"
+    assert results[0]["metadata"] == {"i": 42}
+    # Rescored results carry full-precision cosine scores, best first
+    for result in results:
+        assert result["score"] == pytest.approx(exact[int(result["id"][4:])], abs=1e-5)
+    assert [result["score"] for result in results] == sorted((r["score"] for r in results), reverse=True)
+
+def test_quantized_codes_are_smaller(tmp_path):
+    vectors = np.random.default_rng(2).normal(size=(256, 128))
+    sizes = {}
+    for precision in ("float32", "int8", "binary"):
+        # Rescoring vectors are memory-mapped, so only the codes are resident
+        index = LocalVectorIndex(precision=precision, full_precision_path=str(tmp_path / f"{precision}.npy"))
+        index.add([str(i) for i in range(len(vectors))], vectors)
+        sizes[precision] = index.memory_bytes()
+    assert sizes["float32"] == 256 * 128 * 4
+    # int8 codes plus one float32 scale per row
+    assert sizes["int8"] == 256 * 128 + 256 * 4
+    assert sizes["binary"] == 256 * 128 // 8
+
+def test_resident_rescoring_vectors_are_counted():
+    vectors = np.random.default_rng(3).normal(size=(256, 128))
+    index = LocalVectorIndex(precision="binary")
+    index.add([str(i) for i in range(len(vectors))], vectors)
+    assert index.memory_bytes() == 256 * 128 // 8 + 256 * 128 * 4
+
+class CountingEmbeddings:
+    """Fake embedder recording every batch it is sent"""
+
+    def __init__(self, delay: float = 0.01, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.batches = []
+
+    async def aembed_documents(self, texts):
+        self.batches.append(list(texts))
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+
+def test_concurrent_queries_share_a_batch():
+    async def run():
+        inner = CountingEmbeddings()
+        embeddings = BatchingEmbeddings(inner, max_batch=16, window_ms=5, max_in_flight=1)
+        texts = [f"question {i}" for i in range(10)]
+        vectors = await asyncio.gather(*(embeddings.aembed_query(text) for text in texts))
+        return inner, texts, vectors
+
+    inner, texts, vectors = asyncio.run(run())
+    # The first query goes out alone; the rest wait for it and go together
+    assert inner.batches == [texts[:1], texts[1:]]
+    assert vectors == [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+
+def test_identical_queries_are_embedded_once():
+    async def run():
+        inner = CountingEmbeddings()
+        embeddings = BatchingEmbeddings(inner, max_batch=16, window_ms=5, max_in_flight=1)
+        texts = ["first", "same", "same", "same"]
+        return inner, await asyncio.gather(*(embeddings.aembed_query(text) for text in texts))
+
+    inner, vectors = asyncio.run(run())
+    assert inner.batches == [["first"], ["same"]]
+    assert vectors[1] == vectors[2] == vectors[3]
+
+def test_batches_are_capped():
+    async def run():
+        inner = CountingEmbeddings()
+        embeddings = BatchingEmbeddings(inner, max_batch=4, window_ms=5, max_in_flight=1)
+        await asyncio.gather(*(embeddings.aembed_query(f"q{i}") for i in range(11)))
+        return inner
+
+    assert [len(batch) for batch in asyncio.run(run()).batches] == [1, 4, 4, 2]
+
+def test_errors_reach_every_waiter():
+    async def run():
+        inner = CountingEmbeddings(error=RuntimeError("rate limited"))
+        embeddings = BatchingEmbeddings(inner, max_batch=16, window_ms=5, max_in_flight=1)
+        return await asyncio.gather(
+            *(embeddings.aembed_query(f"q{i}") for i in range(5)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,150 @@
+# tests/test_tasks.py
+
+import asyncio
+
+import pytest
+
+from app.tasks.queue import DEAD, LEASED, READY, TaskQueue
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return TaskQueue(str(tmp_path / "tasks.sqlite3"), visibility_timeout=30, max_attempts=3, retry_backoff=10)
+
+def test_lease_and_ack(queue):
+    task_id = queue.enqueue_sync("ingest", {"document": "d1"})
+    task = queue.lease_sync("ingest")
+    assert (task.id, task.payload, task.attempts) == (task_id, {"document": "d1"}, 1)
+    assert queue.depth_sync("ingest") == {READY: 0, LEASED: 1, DEAD: 0}
+    assert queue.lease_sync("ingest") is None
+    assert queue.ack_sync(task)
+    assert queue.depth_sync("ingest") == {READY: 0, LEASED: 0, DEAD: 0}
+
+def test_queues_are_separate(queue):
+    queue.enqueue_sync("ingest", {})
+    assert queue.lease_sync("replies") is None
+
+def test_delayed_task_waits(queue, clock):
+    queue.enqueue_sync("ingest", {}, delay=5)
+    assert queue.lease_sync("ingest") is None
+    clock.now += 5
+    assert queue.lease_sync("ingest") is not None
+
+def test_expired_lease_is_handed_out_again(queue, clock):
+    queue.enqueue_sync("ingest", {})
+    first = queue.lease_sync("ingest")
+    clock.now += 31
+    second = queue.lease_sync("ingest")
+    assert second.id == first.id and second.attempts == 2
+    # The stalled worker lost its lease
+    assert not queue.ack_sync(first)
+    assert not queue.extend_sync(first)
+    assert queue.ack_sync(second)
+
+def test_extend_keeps_the_lease(queue, clock):
+    queue.enqueue_sync("ingest", {})
+    task = queue.lease_sync("ingest")
+    clock.now += 20
+    assert queue.extend_sync(task)
+    clock.now += 20
+    assert queue.lease_sync("ingest") is None
+
+def test_failures_back_off_exponentially(queue, clock):
+    queue.enqueue_sync("ingest", {})
+    task = queue.lease_sync("ingest")
+    assert queue.fail_sync(task, "timeout") == READY
+    clock.now += 9
+    assert queue.lease_sync("ingest") is None
+    clock.now += 1
+    task = queue.lease_sync("ingest")
+    assert task.attempts == 2
+
+    assert queue.fail_sync(task, "timeout") == READY
+    clock.now += 19
+    assert queue.lease_sync("ingest") is None
+    clock.now += 1
+    assert queue.lease_sync("ingest").attempts == 3
+
+def test_last_failure_dead_letters(queue, clock):
+    task_id = queue.enqueue_sync("ingest", {"document": "d1"})
+    for attempt in range(3):
+        task = queue.lease_sync("ingest")
+        status = queue.fail_sync(task, f"error {attempt}")
+        clock.now += 60
+    assert status == DEAD
+    assert queue.lease_sync("ingest") is None
+
+    [dead] = queue.dead_letters_sync("ingest")
+    assert (dead["id"], dead["payload"], dead["attempts"], dead["last_error"]) == (
+        task_id, {"document": "d1"}, 3, "error 2"
+    )
+
+def test_expired_last_lease_dead_letters(queue, clock):
+    queue.enqueue_sync("ingest", {})
+    for _ in range(3):
+        assert queue.lease_sync("ingest") is not None
+        clock.now += 31
+    assert queue.lease_sync("ingest") is None
+    [dead] = queue.dead_letters_sync("ingest")
+    assert dead["last_error"] == "lease expired"
+
+def test_requeue_gives_fresh_attempts(queue, clock):
+    task_id = queue.enqueue_sync("ingest", {})
+    for _ in range(3):
+        queue.fail_sync(queue.lease_sync("ingest"), "error")
+        clock.now += 60
+    assert queue.requeue_sync([task_id]) == 1
+    assert queue.dead_letters_sync("ingest") == []
+    assert queue.lease_sync("ingest").attempts == 1
+
+def test_update_saves_the_payload_while_leased(queue, clock):
+    queue.enqueue_sync("ingest", {"document": "d1"})
+    task = queue.lease_sync("ingest")
+    task.payload["posted"] = 2
+    assert queue.update_sync(task)
+    queue.fail_sync(task, "error")
+    # A lost lease can't overwrite the next attempt's progress
+    assert not queue.update_sync(task)
+    clock.now += 60
+    assert queue.lease_sync("ingest").payload == {"document": "d1", "posted": 2}
+
+class FakeCommandHandler:
+    def __init__(self, reply):
+        self.reply = reply
+        self.answered = 0
+
+    async def answer(self, command_data, started_at):
+        self.answered += 1
+        return self.reply
+
+class FlakySlackClient:
+    """Records the posted texts; fails the post numbered `fail_at`"""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.calls = 0
+        self.posted = []
+
+    async def chat_postMessage(self, channel, text, thread_ts=None):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise ConnectionError("slack unavailable")
+        self.posted.append(text)
+
+def test_retried_reply_resumes_after_the_posted_messages(queue, clock, monkeypatch):
+    from app import worker as worker_module
+    from app.slack.handlers.command import ASK_QUEUE
+
+    monkeypatch.setattr(worker_module, "slack_reply_chunks", lambda text: text.split("|"))
+    handler = FakeCommandHandler("one|two|three")
+    client = FlakySlackClient(fail_at=2)
+    worker = worker_module.AnswerWorker(queue=queue, command_handler=handler, client=client)
+    queue.enqueue_sync(ASK_QUEUE, {"channel_id": "C1"})
+
+    asyncio.run(worker._process(queue.lease_sync(ASK_QUEUE)))
+    assert client.posted == ["one"]
+    clock.now += 60
+    asyncio.run(worker._process(queue.lease_sync(ASK_QUEUE)))
+    assert client.posted == ["one", "two", "three"]
+    # The retry posts the saved reply instead of answering again
+    assert handler.answered == 1
+    assert queue.depth_sync(ASK_QUEUE) == {READY: 0, LEASED: 0, DEAD: 0}
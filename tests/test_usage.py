@@ -0,0 +1,118 @@
+# tests/test_usage.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils import usage
+from app.utils.usage import UNATTRIBUTED, UsageTracker, count_tokens, usage_cost
+
+PRICES = {"gpt": {"prompt": 2.0, "cached": 0.5, "completion": 8.0}, "embed": {"embedding": 0.1}}
+
+@pytest.fixture
+def prices(monkeypatch):
+    monkeypatch.setattr(usage.settings, "MODEL_PRICES", PRICES)
+
+def test_usage_is_attributed_to_the_request():
+    tracker = UsageTracker(flush_interval=0)
+    with tracker.track("U1", "C1") as scope:
+        scope.model = "gpt"
+        tracker.record("gpt", prompt_tokens=100, completion_tokens=20)
+        tracker.record("embed", embedding_tokens=7)
+    tracker.record("embed", embedding_tokens=3)
+
+    rows = {(row["user_id"], row["channel_id"], row["model"]): row for row in tracker.pending()}
+    assert set(rows) == {("U1", "C1", "gpt"), ("U1", "C1", "embed"), (UNATTRIBUTED, UNATTRIBUTED, "embed")}
+    request = rows["U1", "C1", "gpt"]
+    assert (request["requests"], request["prompt_tokens"], request["completion_tokens"]) == (1, 100, 20)
+    assert request["wall_seconds"] >= 0
+    assert rows["U1", "C1", "embed"]["requests"] == 0
+
+def test_cost_follows_model_prices(prices):
+    assert usage_cost("gpt", {"prompt_tokens": 1_000_000, "cached_tokens": 400_000, "completion_tokens": 500_000}) == (
+        pytest.approx(0.6 * 2.0 + 0.4 * 0.5 + 0.5 * 8.0)
+    )
+    assert usage_cost("embed", {"embedding_tokens": 2_000_000}) == pytest.approx(0.2)
+    assert usage_cost("unknown", {"prompt_tokens": 1_000_000}) == 0.0
+
+def test_tokens_are_estimated_until_the_encoding_loads(monkeypatch):
+    monkeypatch.setattr(usage, "_encoding", None)
+    # As if another call had already started loading it
+    loading = threading.Lock()
+    loading.acquire()
+    monkeypatch.setattr(usage, "_encoding_loading", loading)
+    assert count_tokens("x" * 10) == 3
+
+def test_flushes_add_to_the_stored_totals(firestore_db):
+    tracker = UsageTracker(flush_interval=0)
+
+    async def run():
+        tracker.record("gpt", prompt_tokens=10)
+        assert await tracker.flush() == 1
+        tracker.record("gpt", prompt_tokens=5)
+        assert await tracker.flush() == 1
+        return await tracker.flush()
+
+    assert asyncio.run(run()) == 0
+    [stored] = firestore_db.docs.values()
+    assert (stored["model"], stored["prompt_tokens"]) == ("gpt", 15)
+    # Zero totals aren't written
+    assert "completion_tokens" not in stored
+
+def test_failed_flushes_keep_the_totals(firestore_db):
+    tracker = UsageTracker(flush_interval=0)
+    tracker.record("gpt", prompt_tokens=10)
+    firestore_db.fail_commits = 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(tracker.flush())
+    tracker.record("gpt", prompt_tokens=5)
+    assert [row["prompt_tokens"] for row in tracker.pending()] == [15]
+    asyncio.run(tracker.flush())
+    assert [doc["prompt_tokens"] for doc in firestore_db.docs.values()] == [15]
+
+def test_a_cancelled_flush_doesnt_count_a_written_batch_twice(firestore_db, monkeypatch):
+    batch = firestore_db.batch
+
+    def slow_batch():
+        fake = batch()
+        commit = fake.commit
+
+        def slow_commit():
+            time.sleep(0.1)
+            commit()
+
+        fake.commit = slow_commit
+        return fake
+
+    monkeypatch.setattr(firestore_db, "batch", slow_batch)
+    tracker = UsageTracker(flush_interval=0)
+    tracker.record("gpt", prompt_tokens=10)
+
+    async def run():
+        flush = asyncio.create_task(tracker.flush())
+        await asyncio.sleep(0.02)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+
+    asyncio.run(run())
+    assert tracker.pending() == []
+    assert [doc["prompt_tokens"] for doc in firestore_db.docs.values()] == [10]
+
+def test_query_groups_stored_and_pending_usage(firestore_db, prices):
+    tracker = UsageTracker(flush_interval=0)
+    with tracker.track("U1", "C1") as scope:
+        scope.model = "gpt"
+        tracker.record("gpt", prompt_tokens=1_000_000)
+    asyncio.run(tracker.flush())
+    with tracker.track("U2", "C1") as scope:
+        scope.model = "gpt"
+        tracker.record("gpt", completion_tokens=1_000_000)
+
+    by_channel = asyncio.run(tracker.query("0000", group_by=("channel_id", "model")))
+    assert [(row["channel_id"], row["requests"], row["cost_usd"]) for row in by_channel] == [("C1", 2, 10.0)]
+    by_user = asyncio.run(tracker.query("0000", group_by=("user_id", "model")))
+    assert [(row["user_id"], row["cost_usd"]) for row in by_user] == [("U2", 8.0), ("U1", 2.0)]
+    assert asyncio.run(tracker.query("9999")) == []
@@ -0,0 +1,62 @@
+# tests/test_user_settings.py
+
+import asyncio
+
+import pydantic
+import pytest
+
+from app.cache import SharedCache
+from app.database import user_settings
+from app.database.user_settings import UserSettingsStore
+from app.models import UserSettings
+
+@pytest.fixture
+def store(firestore_db, tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"), max_bytes=10_000_000)
+    monkeypatch.setattr(user_settings, "get_shared_cache", lambda: cache)
+    return UserSettingsStore()
+
+def test_unknown_users_get_defaults(store):
+    assert asyncio.run(store.get("U1")) == UserSettings()
+    assert asyncio.run(store.get(None)) == UserSettings()
+
+def test_stored_settings_are_validated_and_cached(store, firestore_db):
+    firestore_db.docs["user_settings/U1"] = {"max_context_length": 3, "unknown": "dropped"}
+
+    async def run():
+        first = await store.get("U1")
+        reads = firestore_db.reads
+        second = await store.get("U1")
+        return first, second, firestore_db.reads - reads
+
+    first, second, reads = asyncio.run(run())
+    assert first.max_context_length == 3 and first == second
+    assert reads == 0
+
+def test_defaults_are_cached_too(store, firestore_db):
+    asyncio.run(store.get("U1"))
+    reads = firestore_db.reads
+    asyncio.run(store.get("U1"))
+    assert firestore_db.reads == reads
+
+def test_updates_write_only_the_changes(store, firestore_db):
+    async def run():
+        await store.get("U1")
+        updated = await store.update("U1", response_temperature=0.2)
+        return updated, await store.get("U1")
+
+    updated, after = asyncio.run(run())
+    assert updated.response_temperature == 0.2 and after == updated
+    assert firestore_db.docs["user_settings/U1"] == {"response_temperature": 0.2}
+
+def test_invalid_updates_are_rejected(store, firestore_db):
+    with pytest.raises(pydantic.ValidationError):
+        asyncio.run(store.update("U1", max_context_length=100))
+    assert "user_settings/U1" not in firestore_db.docs
+
+def test_unavailable_firestore_falls_back_to_defaults(store, monkeypatch):
+    async def broken(user_id):
+        raise ConnectionError("unavailable")
+
+    monkeypatch.setattr(store, "_load", broken)
+    assert asyncio.run(store.get("U1")) == UserSettings()
@@ -0,0 +1,109 @@
+# tests/test_vector_store.py
+
+import asyncio
+import time
+
+import pytest
+
+from app.cache import SharedCache
+from app.database import NamespaceSearch, VectorStore
+from app.database import vector_store as vector_store_module
+from tests.fakes import FakeEmbeddings, FakeVectorStore
+
+@pytest.fixture
+def new_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store_module.settings, "NAMESPACE_THRESHOLDS", {})
+
+    def build(matches, delay=0.0):
+        embeddings = FakeEmbeddings()
+        fake = FakeVectorStore(matches, delay=delay)
+        cache = SharedCache(str(tmp_path / "cache.sqlite3"), max_bytes=10_000_000)
+        return VectorStore(embeddings=embeddings, vector_store=fake, cache=cache), embeddings, fake
+    return build
+
+MATCHES = {
+    "U1": [("my notes", 0.9), ("old notes", 0.6)],
+    "shared": [("handbook", 0.95), ("policy", 0.8), ("my notes", 0.75)]
+}
+
+def contents(results):
+    return [result["content"] for result in results]
+
+def test_namespaces_are_merged_by_normalized_score(new_store):
+    store, embeddings, _ = new_store(MATCHES)
+    searches = [NamespaceSearch("U1", threshold=0.5), NamespaceSearch("shared", threshold=0.7)]
+    results = asyncio.run(store.multi_namespace_search("question", searches, k=3))
+    # 0.95 and 0.8 above a 0.7 floor rescale to 0.83 and 0.33; 0.9 above 0.5 to 0.8
+    assert contents(results) == ["handbook", "my notes", "policy"]
+    assert [result["namespace"] for result in results] == ["shared", "U1", "shared"]
+    assert results[0]["normalized_score"] == pytest.approx(0.25 / 0.3)
+    # One embedding for every namespace
+    assert embeddings.queries == ["question"]
+
+def test_chunks_in_several_namespaces_appear_once(new_store):
+    store, _, _ = new_store(MATCHES)
+    searches = [NamespaceSearch("U1", threshold=0.5), NamespaceSearch("shared", threshold=0.7)]
+    results = asyncio.run(store.multi_namespace_search("question", searches, k=5))
+    assert contents(results) == ["handbook", "my notes", "policy", "old notes"]
+
+def test_quotas_and_weights(new_store):
+    store, _, fake = new_store(MATCHES)
+    searches = [
+        NamespaceSearch("U1", threshold=0.5, weight=2.0),
+        NamespaceSearch("shared", threshold=0.7, quota=1)
+    ]
+    results = asyncio.run(store.multi_namespace_search("question", searches, k=5))
+    assert contents(results) == ["my notes", "handbook", "old notes"]
+    assert {search["namespace"]: search["k"] for search in fake.searches} == {"U1": 5, "shared": 1}
+
+def test_filters_are_pushed_down_per_namespace(new_store):
+    store, _, fake = new_store(MATCHES)
+    acl = {"acl": {"$in": ["user:U1"]}}
+    asyncio.run(store.multi_namespace_search(
+        "question", [NamespaceSearch("U1"), NamespaceSearch("shared", filter=acl)], k=2
+    ))
+    assert {search["namespace"]: search["filter"] for search in fake.searches} == {"U1": None, "shared": acl}
+
+def test_a_failing_namespace_is_skipped(new_store):
+    store, _, fake = new_store(MATCHES)
+    fake.failing.add("U1")
+    results = asyncio.run(store.multi_namespace_search(
+        "question", [NamespaceSearch("U1"), NamespaceSearch("shared")], k=3
+    ))
+    assert contents(results) == ["handbook", "policy", "my notes"]
+
+def test_all_namespaces_failing_raises(new_store):
+    store, _, fake = new_store(MATCHES)
+    fake.failing.update({"U1", "shared"})
+    with pytest.raises(ConnectionError):
+        asyncio.run(store.multi_namespace_search(
+            "question", [NamespaceSearch("U1"), NamespaceSearch("shared")], k=3
+        ))
+
+def test_namespaces_are_searched_concurrently(new_store):
+    store, _, _ = new_store(MATCHES, delay=0.1)
+    searches = [NamespaceSearch(namespace) for namespace in ("U1", "shared", "other", "more")]
+    started = time.perf_counter()
+    asyncio.run(store.multi_namespace_search("question", searches, k=3))
+    assert time.perf_counter() - started < 0.3
+
+def test_cached_results_skip_the_embedding(new_store):
+    store, embeddings, fake = new_store(MATCHES)
+    searches = [NamespaceSearch("U1"), NamespaceSearch("shared")]
+
+    async def run():
+        first = await store.multi_namespace_search("question", searches, k=3)
+        second = await store.multi_namespace_search("Question ", searches, k=3)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert embeddings.queries == ["question"] and len(fake.searches) == 2
+
+def test_adaptive_search_stops_at_a_score_cliff(new_store, monkeypatch):
+    monkeypatch.setattr(vector_store_module.settings, "CONTEXT_RELEVANCE_TARGET", 1.0)
+    store, _, fake = new_store({None: [("a", 0.95), ("b", 0.93), ("c", 0.72), ("d", 0.71)]})
+    results = asyncio.run(store.similarity_search("question", k=3, threshold=0.7, adaptive=True))
+    assert contents(results) == ["a", "b"]
+    # One candidate past k shows whether there is a cliff after the last
+    assert fake.searches[0]["k"] == 4
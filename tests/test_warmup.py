@@ -0,0 +1,60 @@
+# tests/test_warmup.py
+
+import asyncio
+
+from app.utils import Warmup
+
+def flaky(failures: int):
+    """Step failing its first calls"""
+    calls = []
+
+    async def step():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ConnectionError("unreachable")
+        return {"calls": len(calls)}
+
+    return step, calls
+
+def test_optional_failures_dont_keep_the_service_unready():
+    warmup = Warmup(step_timeout=1)
+    step, calls = flaky(failures=5)
+    warmup.add_step("cache", step)
+    asyncio.run(warmup.run())
+    report = warmup.report()
+    assert report["ready"] and len(calls) == 1
+    assert report["steps"]["cache"]["state"] == "failed"
+    assert report["steps"]["cache"]["error"] == "unreachable"
+
+def test_required_steps_are_retried_until_they_succeed():
+    warmup = Warmup(step_timeout=1, retry_interval=0.01)
+    step, calls = flaky(failures=2)
+    other, other_calls = flaky(failures=0)
+    warmup.add_step("vector_store", step, required=True)
+    warmup.add_step("slack", other)
+    asyncio.run(warmup.run())
+    report = warmup.report()
+    assert report["ready"]
+    assert report["steps"]["vector_store"]["state"] == "done"
+    assert report["steps"]["vector_store"]["attempts"] == 3
+    # Steps that succeeded aren't run again
+    assert len(other_calls) == 1
+
+def test_not_ready_while_a_required_step_fails():
+    async def run():
+        warmup = Warmup(step_timeout=0.01, retry_interval=0.01)
+
+        async def hang():
+            await asyncio.sleep(1)
+
+        warmup.add_step("llm", hang, required=True)
+        task = asyncio.create_task(warmup.run())
+        await asyncio.sleep(0.1)
+        report = warmup.report()
+        task.cancel()
+        return report
+
+    report = asyncio.run(run())
+    assert not report["ready"]
+    assert report["steps"]["llm"]["state"] in ("timeout", "running")
+    assert report["steps"]["llm"]["attempts"] > 1